@@ -452,6 +452,1924 @@ mai.action({ name: 'my_action', execute: async (ctx) => { await ctx.send('action
         fail('JsBridgeLoader', e)
         traceback.print_exc()
 
+# ─── 8b. 共享宿主：组件内存限制 ─────────────────────────────────────────────
+section('8b. mai_js_bridge — shared 模式的内存限制')
+if not HAS_NODE:
+    skip('shared 模式内存限制', 'Node.js 不可用')
+else:
+    try:
+        import asyncio
+        from mai_js_bridge import JsBridgeLoader, configure_host_manager
+
+        configure_host_manager(max_processes=1)   # 两个插件落在同一宿主进程
+        mem_dir = os.path.join(tmpdir, 'shared_mem')
+        os.makedirs(mem_dir, exist_ok=True)
+        big_js = os.path.join(mem_dir, 'big.js')
+        small_js = os.path.join(mem_dir, 'small.js')
+        with open(big_js, 'w', encoding='utf-8') as f:
+            f.write("""
+let hold = null;
+mai.command({ name: 'grow', pattern: /^!grow$/, execute: async (ctx) => {
+  hold = new Array(6 * 1024 * 1024).fill(1.5);
+  await ctx.send(String(process.pid));
+}});
+""")
+        with open(small_js, 'w', encoding='utf-8') as f:
+            f.write("""
+mai.command({ name: 'tiny', pattern: /^!tiny$/, maxMemoryMb: 16, execute: async (ctx) => {
+  await ctx.send(String(process.pid));
+}});
+""")
+
+        async def _shared_memory():
+            big = JsBridgeLoader(big_js, plugin_name='big', exec_mode='shared', registration_parser='regex')
+            small = JsBridgeLoader(small_js, plugin_name='small', exec_mode='shared', registration_parser='regex')
+            try:
+                ctx = {'stream_id': 's1', 'matched_groups': [], 'action_data': {}}
+                r1 = await big._execute('grow', {**ctx, 'plugin_name': 'big'})
+                r2 = await small._execute('tiny', {**ctx, 'plugin_name': 'small'})
+                r3 = await big._execute('grow', {**ctx, 'plugin_name': 'big'})
+                return r1, r2, r3, small.stats()
+            finally:
+                await big.close()
+                await small.close()
+
+        r1, r2, r3, small_stats = asyncio.run(_shared_memory())
+        pids = {r['messages'][0]['content'] for r in (r1, r2, r3)}
+        assert not r2.get('memory_exceeded'), r2
+        assert small_stats['memory_exceeded'] == 0, small_stats
+        assert len(pids) == 1, f'宿主进程被替换：{pids}'
+        ok('shared 模式：组件 maxMemoryMb 不会因其他插件的内存淘汰共享宿主')
+    except Exception as e:
+        fail('shared 模式内存限制', e)
+        traceback.print_exc()
+
+# ─── 8c. 共享宿主：执行超时的影响范围 ───────────────────────────────────────
+section('8c. mai_js_bridge — shared 模式的执行超时')
+if not HAS_NODE:
+    skip('shared 模式执行超时', 'Node.js 不可用')
+else:
+    try:
+        import asyncio
+        from mai_js_bridge import JsBridgeLoader, configure_host_manager, get_host_manager
+
+        configure_host_manager(max_processes=1)
+        hang_dir = os.path.join(tmpdir, 'shared_hang')
+        os.makedirs(hang_dir, exist_ok=True)
+        loop_js = os.path.join(hang_dir, 'loop.js')
+        slow_js = os.path.join(hang_dir, 'slow.js')
+        with open(loop_js, 'w', encoding='utf-8') as f:
+            f.write("""
+mai.command({ name: 'spin', pattern: /^!spin$/, timeout: 500, execute: async (ctx) => { while (true) {} } });
+""")
+        with open(slow_js, 'w', encoding='utf-8') as f:
+            f.write("""
+mai.command({ name: 'wait', pattern: /^!wait$/, execute: async (ctx) => {
+  await new Promise((resolve) => setTimeout(resolve, 1500));
+  await ctx.send('done');
+}});
+""")
+
+        async def _shared_hang():
+            spin = JsBridgeLoader(loop_js, plugin_name='spin', exec_mode='shared', registration_parser='regex')
+            slow = JsBridgeLoader(slow_js, plugin_name='slow', exec_mode='shared', registration_parser='regex')
+            ctx = {'stream_id': 's1', 'matched_groups': [], 'action_data': {}}
+            try:
+                await slow.warm()
+                first = slow._execute('wait', {**ctx, 'plugin_name': 'slow'})
+                await asyncio.sleep(0.2)
+                spun, waited = await asyncio.gather(spin._execute('spin', {**ctx, 'plugin_name': 'spin'}), first)
+                host_stats = get_host_manager().stats()
+                # 超时过的插件已在独立进程中运行，再次失控不影响其他插件
+                again = await asyncio.gather(
+                    spin._execute('spin', {**ctx, 'plugin_name': 'spin'}),
+                    slow._execute('wait', {**ctx, 'plugin_name': 'slow'}),
+                )
+                return spun, waited, again, host_stats, spin.stats(), slow.stats()
+            finally:
+                await spin.close()
+                await slow.close()
+
+        spun, waited, again, host_stats, spin_stats, slow_stats = asyncio.run(_shared_hang())
+        assert not spun['success'] and spin_stats['timeouts'] == 2, spin_stats
+        assert not waited['success'] and '中止' in waited['log'], waited
+        assert slow_stats['aborted'] == 1 and slow_stats['crashes'] == 0, slow_stats
+        ok('shared 模式：其他插件超时连带中止的执行计入 aborted，不计为崩溃')
+        assert host_stats['isolated'] == 1, host_stats
+        assert again[1]['success'] and again[1]['messages'][0]['content'] == 'done', again[1]
+        ok('shared 模式：超时过的插件移到独立宿主进程，之后不再影响其他插件')
+    except Exception as e:
+        fail('shared 模式执行超时', e)
+        traceback.print_exc()
+
+# ─── 8d. 准入控制与溢出策略 ─────────────────────────────────────────────────
+section('8d. mai_js_bridge — AdmissionController')
+try:
+    import asyncio
+    from mai_js_bridge.admission import AdmissionController, AdmissionRejected
+
+    async def _coalesce():
+        ac = AdmissionController('coalesce', stream_concurrency=1, stream_queue=1)
+        gate = asyncio.Event()
+        calls = []
+
+        def job(tag):
+            async def factory():
+                calls.append(tag)
+                await gate.wait()
+                return tag
+            return factory
+
+        first = asyncio.ensure_future(ac.run('s1', 'sign', 'k', job('a')))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(ac.run('s1', 'sign', 'k', job('b')))    # 队列未满：照常排队
+        await asyncio.sleep(0)
+        merged = asyncio.ensure_future(ac.run('s1', 'sign', 'k', job('c')))    # 队列已满：与 a 合并
+        await asyncio.sleep(0)
+        try:
+            await ac.run('s1', 'sign', None, job('d'))                          # 不可合并：拒绝
+            rejected = False
+        except AdmissionRejected:
+            rejected = True
+        gate.set()
+        return await asyncio.gather(first, queued, merged), calls, rejected, ac.stats()
+
+    outcomes, calls, rejected, ac_stats = asyncio.run(_coalesce())
+    assert outcomes == ['a', 'b', 'a'] and calls == ['a', 'b'], (outcomes, calls)
+    ok('coalesce：队列未满时相同请求照常执行，只在溢出时合并')
+    assert rejected and ac_stats['coalesced'] == 1 and ac_stats['rejected'] == 1, ac_stats
+    ok('coalesce：request_key 为 None（有副作用的组件）溢出时被拒绝而不是合并')
+except Exception as e:
+    fail('AdmissionController coalesce', e)
+    traceback.print_exc()
+
+try:
+    import asyncio
+    from mai_js_bridge.admission import AdmissionController, AdmissionRejected
+
+    async def _policy(policy):
+        ac = AdmissionController(policy, stream_concurrency=1, stream_queue=1, component_queue=3)
+        gate = asyncio.Event()
+        order = []
+
+        async def submit(stream_id, component, tag):
+            async def factory():
+                order.append(tag)
+                await gate.wait()
+                return tag
+            try:
+                return await ac.run(stream_id, component, None, factory)
+            except AdmissionRejected:
+                return f'-{tag}'
+
+        tasks = []
+        for stream_id, component, tag in [('s1', 'c', 'a'), ('s1', 'c', 'b'), ('s1', 'c', 'c'),
+                                          ('s2', 'd', 'x'), ('s2', 'c', 'y'), ('s3', 'c', 'z')]:
+            tasks.append(asyncio.ensure_future(submit(stream_id, component, tag)))
+            await asyncio.sleep(0)
+        running = list(order)
+        gate.set()
+        return await asyncio.gather(*tasks), running, order, ac.stats()
+
+    outcomes, running, order, ac_stats = asyncio.run(_policy('drop_newest'))
+    assert running == ['a', 'x'], running       # 每个聊天流同时只执行一个请求
+    assert outcomes == ['a', 'b', '-c', 'x', 'y', '-z'], outcomes
+    assert order == ['a', 'x', 'b', 'y'] and ac_stats['rejected'] == 2 and ac_stats['queued'] == 0, (order, ac_stats)
+    ok('drop_newest：聊天流队列或组件排队已满时拒绝新请求，其余按顺序执行')
+
+    outcomes, running, order, ac_stats = asyncio.run(_policy('drop_oldest'))
+    # c 挤掉 s1 队列中的 b；z 超出组件 c 的排队上限，挤掉组件队列中等待最久的 c
+    assert outcomes == ['a', '-b', '-c', 'x', 'y', 'z'], outcomes
+    assert order == ['a', 'x', 'z', 'y'], order
+    assert ac_stats['evicted'] == 2 and ac_stats['rejected'] == 0, ac_stats
+    ok('drop_oldest：挤掉同一队列（聊天流或组件）中等待最久的请求，新请求入队')
+
+    async def _cancelled():
+        ac = AdmissionController('drop_newest', stream_concurrency=1, stream_queue=2)
+        gate = asyncio.Event()
+
+        async def factory():
+            await gate.wait()
+            return 'done'
+
+        first = asyncio.ensure_future(ac.run('s1', 'c', None, factory))
+        waiting = asyncio.ensure_future(ac.run('s1', 'c', None, factory))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.sleep(0)
+        queued = ac.stats()['queued']
+        gate.set()
+        return await first, queued, await ac.run('s1', 'c', None, factory)
+
+    assert asyncio.run(_cancelled()) == ('done', 0, 'done')
+    ok('等待中被取消的请求撤出队列，不占用名额')
+    try:
+        AdmissionController('drop_all')
+        raise AssertionError('未知策略应被拒绝')
+    except ValueError:
+        pass
+    ok('AdmissionController：拒绝未知的溢出策略')
+except Exception as e:
+    fail('AdmissionController 溢出策略', e)
+    traceback.print_exc()
+
+# ─── 8e. Node.js 导出注册信息：固定回复的判定 ──────────────────────────────
+section('8e. mai_js_bridge — mai.reply() 固定回复判定')
+if not HAS_NODE:
+    skip('mai.reply() 固定回复判定', 'Node.js 不可用')
+else:
+    try:
+        import asyncio
+        from mai_js_bridge import JsBridgeLoader
+        from mai_js_bridge.bridge import _describe_js_registrations
+
+        reply_js = os.path.join(tmpdir, 'replies.js')
+        with open(reply_js, 'w', encoding='utf-8') as f:
+            f.write("""
+mai.reply('/ping', 'Pong!');
+mai.reply('/ver', 'ver=' + process.env.MAI_TEST_BOTVER, 'ver');
+mai.reply('/tpl', `t=${1 + 1}`, 'tpl');
+""")
+        with open(reply_js, encoding='utf-8') as f:
+            reply_src = f.read()
+        os.environ['MAI_TEST_BOTVER'] = '1'
+        described = {c['name']: c for c in _describe_js_registrations(reply_js, reply_src)['commands']}
+        assert described['auto_reply_0'].get('_is_simple_reply') is True, described['auto_reply_0']
+        ok('describe：字面量文本的 mai.reply() 由 Python 直接回复')
+        assert not described['ver'].get('_is_simple_reply'), described['ver']
+        assert not described['tpl'].get('_is_simple_reply'), described['tpl']
+        ok('describe：拼接 / 模板字符串文本的 mai.reply() 保留在 JS 执行路径')
+
+        os.environ['MAI_TEST_BOTVER'] = '2'    # 相当于以新的环境变量重启
+        async def _ver():
+            loader = JsBridgeLoader(reply_js, plugin_name='replies')
+            try:
+                regs = {c['name']: c for c in loader._load_registrations()['commands']}
+                result = await loader._execute('ver', {'stream_id': 's1', 'plugin_name': 'replies',
+                                                       'matched_groups': [], 'action_data': {}})
+                return regs['ver'], result
+            finally:
+                await loader.close()
+        ver_info, ver = asyncio.run(_ver())
+        assert not ver_info.get('_is_simple_reply'), ver_info
+        assert ver['messages'][0]['content'] == 'ver=2', ver
+        ok('describe：需要求值的回复文本不会被缓存的注册信息固定下来')
+    except Exception as e:
+        fail('mai.reply() 固定回复判定', e)
+        traceback.print_exc()
+
+# ─── 8f. 注册信息磁盘缓存 ───────────────────────────────────────────────────
+section('8f. mai_js_bridge — RegistrationCache')
+try:
+    from pathlib import Path
+    from mai_js_bridge import JsBridgeLoader
+    from mai_js_bridge import registration_cache as reg_cache_mod
+    from mai_js_bridge.registration_cache import RegistrationCache, content_digest
+
+    cache_path = Path(tmpdir) / 'reg_cache' / 'registrations.json'
+    regs = {'commands': [{'name': 'a', 'pattern': '^a$'}], 'actions': []}
+    rc = RegistrationCache(cache_path)
+    rc.put('/p/plugin.js', (1, 10), 'd1', 'node', regs)
+    rc2 = RegistrationCache(cache_path)     # 重新从磁盘读取
+    assert rc2.get('/p/plugin.js', (1, 10), 'node') == regs
+    ok('RegistrationCache：stat 相同时命中（从磁盘读取）')
+    assert rc2.get('/p/plugin.js', (2, 10), 'node') is None
+    assert rc2.get('/p/plugin.js', (2, 10), 'node', 'd1') == regs
+    assert rc2.get('/p/plugin.js', (2, 10), 'node') == regs    # stat 已更新
+    ok('RegistrationCache：stat 变化但内容哈希相同时命中并更新 stat')
+    assert rc2.get('/p/plugin.js', (3, 11), 'node', 'd2') is None
+    assert rc2.get('/p/plugin.js', (1, 10), 'regex') is None
+    ok('RegistrationCache：内容或解析方式不同时失效')
+
+    # 插件在 Node.js 中加载失败 → 退回正则；下次启动应直接命中缓存，不再启动 Node.js
+    broken_js = os.path.join(tmpdir, 'broken.js')
+    with open(broken_js, 'w', encoding='utf-8') as f:
+        f.write("mai.reply('/b', 'b', 'b_cmd');\nthrow new Error('boom');\n")
+    saved_cache = reg_cache_mod._registration_cache
+    reg_cache_mod._registration_cache = RegistrationCache(Path(tmpdir) / 'reg_cache2' / 'registrations.json')
+    try:
+        first = JsBridgeLoader(broken_js, plugin_name='broken')._load_registrations()
+        second = JsBridgeLoader(broken_js, plugin_name='broken')._load_registrations()
+        shared_cache = reg_cache_mod._registration_cache
+        assert [c['name'] for c in first['commands']] == ['b_cmd'] and second == first, (first, second)
+        assert shared_cache.misses == 1 and shared_cache.hits == 1, (shared_cache.misses, shared_cache.hits)
+        ok('RegistrationCache：退回正则解析的结果以请求的解析方式缓存，重启后直接命中')
+    finally:
+        reg_cache_mod._registration_cache = saved_cache
+except Exception as e:
+    fail('RegistrationCache', e)
+    traceback.print_exc()
+
+# ─── 8g. 命令正则：分别注册与合并分发一致 ───────────────────────────────────
+section('8g. mai_js_bridge — 命令正则与合并分发')
+try:
+    import re
+    from mai_js_bridge import JsBridgeLoader
+    from mai_js_bridge.bridge import _SubMatch, _combine_command_patterns
+
+    class _FakeCommand:
+        @classmethod
+        def get_command_info(cls):
+            return cls.command_name
+
+    cmd_infos = [
+        {'name': 'ping', 'pattern': '^/ping$', 'pattern_flags': 'i'},
+        {'name': 'echo', 'pattern': '^/echo (\\w+) (\\d+)$'},
+        {'name': 'pong', 'pattern': '^/pong$', 'pattern_flags': 'g'},
+    ]
+    flag_loader = JsBridgeLoader(os.path.join(tmpdir, 'flags.js'), plugin_name='flags')
+    separate = {info['name']: flag_loader._make_command_class(info, _FakeCommand) for info in cmd_infos}
+    dispatch, leftovers = flag_loader._make_dispatch_command_class(cmd_infos, _FakeCommand)
+    assert leftovers == [] and dispatch is not None, leftovers
+    for text, expected in [('/PING', 'ping'), ('/ping', 'ping'), ('/pong', 'pong'),
+                           ('/PONG', None), ('/echo hi 42', 'echo'), ('/ECHO hi 42', None)]:
+        hits = [n for n, cls in separate.items() if re.match(cls.command_pattern, text)]
+        assert hits == ([expected] if expected else []), (text, hits)
+        m = re.match(dispatch.command_pattern, text)
+        assert bool(m) == bool(expected), (text, m)
+    ok('分别注册的命令同样应用 i 标志，与合并分发匹配相同的消息')
+
+    combined, index, _ = _combine_command_patterns(cmd_infos)
+    assert [index[re.match(combined, t).lastgroup][0]['name'] for t in ('/PING', '/pong', '/echo a 1')] \
+        == ['ping', 'pong', 'echo']
+    m = re.match(combined, '/echo hi 42')
+    info, base, count = index[m.lastgroup]
+    sub = _SubMatch(m, base, count)
+    assert (sub.group(0), sub.group(1), sub.group(2), sub.groups()) == ('/echo hi 42', 'hi', '42', ('hi', '42'))
+    try:
+        sub.group(3)
+        raise AssertionError('group(3) 应越界')
+    except IndexError:
+        pass
+    ok('_combine_command_patterns / _SubMatch：命中分支查表，捕获组按命令自身的正则编号')
+except Exception as e:
+    fail('命令正则与合并分发', e)
+    traceback.print_exc()
+
+# ─── 8h. isolated 模式：ctx.cache 不跨执行保留 ─────────────────────────────
+section('8h. mai_js_bridge — isolated 模式的 ctx.cache')
+if not HAS_NODE:
+    skip('isolated 模式的 ctx.cache', 'Node.js 不可用')
+else:
+    try:
+        import asyncio
+        from mai_js_bridge import JsBridgeLoader
+
+        counter_js = os.path.join(tmpdir, 'counter.js')
+        with open(counter_js, 'w', encoding='utf-8') as f:
+            f.write("""
+mai.command({ name: 'count', pattern: '^/count$', async execute(ctx) {
+  const n = ctx.cache.get('n', 0) + 1;
+  ctx.cache.set('n', n);
+  const cached = await ctx.cache.remember('r', 60000, () => n);
+  await ctx.send(`${n}/${cached}`);
+}});
+""")
+
+        async def _counts(exec_mode):
+            loader = JsBridgeLoader(counter_js, plugin_name=f'counter_{exec_mode}', exec_mode=exec_mode, pool_size=1)
+            try:
+                out = []
+                for _ in range(3):
+                    result = await loader._execute('count', {'stream_id': 's1', 'plugin_name': 'counter',
+                                                             'matched_groups': [], 'action_data': {}})
+                    out.append(result['messages'][0]['content'])
+                return out
+            finally:
+                await loader.close()
+
+        assert asyncio.run(_counts('pool')) == ['1/1', '2/1', '3/1']
+        ok('pool 模式：ctx.cache 在同一工作进程内跨执行保留')
+        isolated_counts = asyncio.run(_counts('isolated'))
+        assert isolated_counts == ['1/1', '1/1', '1/1'], isolated_counts
+        ok('isolated 模式：每次执行拿到空的 ctx.cache，调用间不共享状态')
+    except Exception as e:
+        fail('isolated 模式的 ctx.cache', e)
+        traceback.print_exc()
+
+# ─── 8i. 定时任务：Scheduler 与调度器的启动 ─────────────────────────────────
+section('8i. mai_js_bridge — Scheduler')
+try:
+    import asyncio
+    from mai_js_bridge.scheduler import Scheduler
+
+    async def _overlap():
+        fired = []
+
+        async def run(name):
+            fired.append(name)
+            await asyncio.sleep(0.25)
+            return name == 'ok'
+
+        sched = Scheduler(run, label='t')
+        sched.add('ok', 0.1)
+        sched.add('bad', 0.1, immediate=False)
+        sched.start()
+        await asyncio.sleep(0.65)
+        await sched.stop()
+        return fired, sched.stats(), sched.started
+
+    fired, sched_stats, started = asyncio.run(_overlap())
+    assert fired[0] == 'ok' and not started, (fired, started)
+    assert sched_stats['ok']['runs'] == 2 and sched_stats['ok']['skipped'] >= 2, sched_stats
+    assert sched_stats['bad']['failures'] == sched_stats['bad']['runs'] >= 1, sched_stats
+    assert not sched_stats['ok']['running'] and not sched_stats['bad']['running'], sched_stats
+    ok('Scheduler：上一次运行未结束时跳过触发，失败计数，stop() 取消进行中的运行')
+    try:
+        Scheduler(run=None).add('zero', 0)
+        raise AssertionError('every=0 应被拒绝')
+    except ValueError:
+        pass
+    ok('Scheduler：拒绝非正数的间隔')
+except Exception as e:
+    fail('Scheduler', e)
+    traceback.print_exc()
+
+if not HAS_NODE:
+    skip('调度器在 ON_START 时启动', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, enum
+        from mai_js_bridge import JsBridgeLoader
+
+        ticker_js = os.path.join(tmpdir, 'ticker.js')
+        with open(ticker_js, 'w', encoding='utf-8') as f:
+            f.write("mai.schedule({ name: 'tick', every: '1s', execute: async () => {} });\n")
+
+        class _FakeEventType(enum.Enum):
+            ON_START = 'on_start'
+            ON_MESSAGE = 'on_message'
+
+        class _FakeEventHandler:
+            pass
+
+        ticker = JsBridgeLoader(ticker_js, plugin_name='ticker')
+        ticker._ensure_scheduler()              # 不在事件循环中（相当于同步调用 get_components()）
+        assert ticker._scheduler is None
+        starter = ticker._make_schedule_start_class(_FakeEventHandler, _FakeEventType)
+        assert starter.event_type is _FakeEventType.ON_START
+
+        async def _on_start():
+            try:
+                assert await starter().execute(None) == (True, True, None, None, None)
+                await asyncio.sleep(0.5)
+                return ticker.stats()['schedules']
+            finally:
+                await ticker.close()
+
+        tick_stats = asyncio.run(_on_start())
+        assert tick_stats['tick']['runs'] == 1 and tick_stats['tick']['failures'] == 0, tick_stats
+        ok('只有定时任务的插件：不在事件循环中加载时由 ON_START 处理器启动调度器')
+    except Exception as e:
+        fail('调度器在 ON_START 时启动', e)
+        traceback.print_exc()
+
+    try:
+        import asyncio
+        from mai_js_bridge import JsBridgeLoader, configure_host_manager
+        from mai_js_bridge.worker_pool import JsWorker
+
+        host = configure_host_manager(max_processes=2, max_concurrency=1)
+        sweep_js = os.path.join(tmpdir, 'sweep.js')
+        with open(sweep_js, 'w', encoding='utf-8') as f:
+            f.write("mai.schedule({ name: 'sweep', every: '1h', immediate: false, "
+                    "execute: async () => { await new Promise((r) => setTimeout(r, 200)); } });\n")
+
+        inflight = [0, 0]       # 当前、最大
+        saved_execute = JsWorker.execute
+
+        async def _counting_execute(self, *args, **kwargs):
+            inflight[0] += 1
+            inflight[1] = max(inflight)
+            try:
+                return await saved_execute(self, *args, **kwargs)
+            finally:
+                inflight[0] -= 1
+
+        async def _shared_sweep():
+            sweep = JsBridgeLoader(sweep_js, plugin_name='sweep', exec_mode='shared', registration_parser='regex')
+            try:
+                ready = await sweep.warm()
+                return ready, await sweep._run_schedule('sweep'), sweep.stats()['schedules']
+            finally:
+                await sweep.close()
+
+        JsWorker.execute = _counting_execute
+        try:
+            ready, swept, sweep_stats = asyncio.run(_shared_sweep())
+        finally:
+            JsWorker.execute = saved_execute
+            configure_host_manager()
+        assert ready == 2 and swept, (ready, swept)
+        assert inflight[1] == 1, inflight
+        ok('shared 模式：定时任务在每个宿主进程中运行，同样受共享宿主的全局并发上限约束')
+    except Exception as e:
+        fail('shared 模式定时任务的并发上限', e)
+        traceback.print_exc()
+
+# ─── 8j. 结果缓存 ───────────────────────────────────────────────────────────
+section('8j. mai_js_bridge — ResultCache')
+try:
+    import time
+    from mai_js_bridge.result_cache import ResultCache
+
+    assert ResultCache.make_key({'matched_groups': ['1'], 'action_data': {'b': 2, 'a': 1}, 'stream_id': 's1'}) \
+        == ResultCache.make_key({'matched_groups': ['1'], 'action_data': {'a': 1, 'b': 2}, 'stream_id': 's2'})
+    assert ResultCache.make_key({'matched_groups': ['1']}) != ResultCache.make_key({'matched_groups': ['2']})
+    ok('ResultCache.make_key：只取捕获组与 Action 参数，与键顺序、聊天流无关')
+
+    rc = ResultCache(max_entries=2)
+    rc.put('a', {'v': 1})
+    rc.put('b', {'v': 2})
+    assert rc.get('a') == {'v': 1}      # a 变为最近使用
+    rc.put('c', {'v': 3})
+    assert rc.get('b') is None and rc.get('a') == {'v': 1} and len(rc) == 2
+    assert (rc.hits, rc.misses) == (2, 1), (rc.hits, rc.misses)
+    ok('ResultCache：超出容量时淘汰最久未使用的条目，统计命中与未命中')
+
+    rc = ResultCache(ttl=0.05)
+    rc.put('k', {'v': 1})
+    assert rc.get('k') == {'v': 1}
+    time.sleep(0.08)
+    assert rc.get('k') is None and len(rc) == 0
+    ok('ResultCache：过期条目不再返回并被移除')
+except Exception as e:
+    fail('ResultCache', e)
+    traceback.print_exc()
+
+if not HAS_NODE:
+    skip('声明 cache 的组件', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, logging
+        from mai_js_bridge import JsBridgeLoader, JsContext
+
+        memo_js = os.path.join(tmpdir, 'memo.js')
+        with open(memo_js, 'w', encoding='utf-8') as f:
+            f.write("""
+let calls = 0;
+mai.command({ name: 'double', pattern: '^/double (\\d+)$', cache: { ttl: 60000 }, async execute(ctx) {
+  calls += 1;
+  await ctx.send(`${ctx.match(1) * 2} (#${calls})`);
+}});
+""")
+
+        class _SendApi:
+            def __init__(self):
+                self.sent = []
+
+            async def text_to_stream(self, text, stream_id):
+                self.sent.append((stream_id, text))
+
+        async def _memo():
+            loader = JsBridgeLoader(memo_js, plugin_name='memo', pool_size=1)
+            send_api = _SendApi()
+            info = loader._load_registrations()['commands'][0]
+            cache = loader._result_cache(info)
+            try:
+                for stream_id, n in [('s1', '21'), ('s2', '21'), ('s1', '5')]:
+                    context = {'stream_id': stream_id, 'plugin_name': 'memo', 'matched_groups': [n], 'action_data': {}}
+                    js_ctx = JsContext(stream_id=stream_id, plugin_name='memo', loop=asyncio.get_running_loop(),
+                                       send_api=send_api, config_getter=lambda k, d=None: d,
+                                       logger=logging.getLogger('mai_js_bridge'))
+                    await loader._run_component('double', context, js_ctx, send_api, cache)
+                return send_api.sent, loader.stats()['executions'], cache
+            finally:
+                await loader.close()
+
+        sent, executions, memo_cache = asyncio.run(_memo())
+        assert sent == [('s1', '42 (#1)'), ('s2', '42 (#1)'), ('s1', '10 (#2)')], sent
+        assert executions == 2 and memo_cache.hits == 1, (executions, memo_cache.hits)
+        ok('声明 cache 的组件：相同输入直接重放缓存的消息，不再执行 JS')
+    except Exception as e:
+        fail('声明 cache 的组件', e)
+        traceback.print_exc()
+
+    try:
+        import asyncio, logging
+        from mai_js_bridge import JsBridgeLoader, JsContext
+
+        versioned_js = os.path.join(tmpdir, 'versioned.js')
+
+        def _write_versioned(version):
+            with open(versioned_js, 'w', encoding='utf-8') as f:
+                f.write("mai.command({ name: 'c', pattern: '^!c (\\\\d+)$', cache: { ttl: 60000 }, "
+                        "execute(ctx) { ctx.send('%s:' + ctx.match(1)); } });\n" % version)
+
+        async def _edited():
+            _write_versioned('v1')
+            loader = JsBridgeLoader(versioned_js, plugin_name='versioned', pool_size=1)
+            send_api = _SendApi()
+            cache = loader._result_cache(loader._load_registrations()['commands'][0])
+            context = {'stream_id': 's1', 'plugin_name': 'versioned', 'matched_groups': ['5'], 'action_data': {}}
+            js_ctx = JsContext(stream_id='s1', plugin_name='versioned', loop=asyncio.get_running_loop(),
+                               send_api=send_api, config_getter=lambda k, d=None: d,
+                               logger=logging.getLogger('mai_js_bridge'))
+            try:
+                await loader._run_component('c', dict(context), js_ctx, send_api, cache)
+                _write_versioned('v2-edited')
+                loader._last_reload_check = 0.0         # 跳过 stat 节流
+                await loader._run_component('c', dict(context), js_ctx, send_api, cache)
+                return [text for _, text in send_api.sent]
+            finally:
+                await loader.close()
+
+        sent = asyncio.run(_edited())
+        assert sent == ['v1:5', 'v2-edited:5'], sent
+        ok('声明 cache 的组件：plugin.js 修改后相同输入不再重放旧版本的缓存')
+    except Exception as e:
+        fail('缓存与热重载', e)
+        traceback.print_exc()
+
+# ─── 8k. ctx.store：KvStore ─────────────────────────────────────────────────
+section('8k. mai_js_bridge — KvStore')
+try:
+    import asyncio
+    from pathlib import Path
+    from mai_js_bridge import kv_store as kv_store_mod
+    from mai_js_bridge.kv_store import KvStore
+
+    store_path = Path(tmpdir) / 'store' / 'js_store.db'
+
+    async def _kv():
+        store = KvStore(store_path)
+        store.set('p', 'a', {'n': 1})
+        store.set('p', 'b', 2)
+        store.set('q', 'a', 'other')
+        value = await store.get('p', 'a')
+        value['n'] = 99                                   # 修改返回值不影响存储的内容
+        visible = (await store.get('p', 'a'), await store.get('p', 'missing', 'dflt'))
+        on_disk_before = store._db_get('p', 'a')
+        counts = await asyncio.gather(*(store.incr('p', 'hits') for _ in range(50)))
+        try:
+            await store.incr('p', 'a')
+            incr_error = None
+        except TypeError as e:
+            incr_error = e
+        store.delete('p', 'b')
+        keys = await store.keys('p')
+        await asyncio.sleep(kv_store_mod.FLUSH_DELAY + 0.3)   # 后台批量写回
+        flushed = store.stats()
+        store.set('p', 'late', True)
+        await store.flush()
+        return visible, on_disk_before, sorted(counts), incr_error, keys, flushed, store.stats()
+
+    visible, on_disk_before, counts, incr_error, keys, flushed, final = asyncio.run(_kv())
+    assert visible == ({'n': 1}, 'dflt') and on_disk_before is None, (visible, on_disk_before)
+    ok('KvStore：写入立即对读取可见，返回值是副本，写回前不访问数据库')
+    assert counts == list(range(1, 51)) and isinstance(incr_error, TypeError), (counts[-1], incr_error)
+    ok('KvStore.incr：并发累加不丢失，非数字的值拒绝累加')
+    assert keys == ['a', 'hits'], keys
+    ok('KvStore.keys：合并尚未写回的写入与删除，按命名空间隔离')
+    assert flushed['flushes'] == 1 and flushed['pending'] == 0, flushed
+    assert final['flushes'] == 2 and final['pending'] == 0, final
+
+    async def _reopen():
+        store = KvStore(store_path)
+        return [await store.get('p', k) for k in ('a', 'b', 'hits', 'late')] + [await store.get('q', 'a')]
+
+    assert asyncio.run(_reopen()) == [{'n': 1}, None, 50, True, 'other']
+    ok('KvStore：延迟后批量写回（write-behind），flush() 立即写回，重新打开后数据仍在')
+except Exception as e:
+    fail('KvStore', e)
+    traceback.print_exc()
+
+if not HAS_NODE:
+    skip('ctx.store', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, logging
+        from pathlib import Path
+        from mai_js_bridge import JsBridgeLoader, JsContext
+        from mai_js_bridge import kv_store as kv_store_mod
+        from mai_js_bridge.kv_store import KvStore
+
+        signin_js = os.path.join(tmpdir, 'signin.js')
+        with open(signin_js, 'w', encoding='utf-8') as f:
+            f.write("""
+mai.command({ name: 'signin', pattern: '^/signin$', async execute(ctx) {
+  const days = await ctx.store.incr('days');
+  await ctx.store.set('last', { days });
+  await ctx.send(`${days} ${JSON.stringify(await ctx.store.get('last'))}`);
+}});
+""")
+        saved_store = kv_store_mod._kv_store
+        kv_store_mod._kv_store = KvStore(Path(tmpdir) / 'store2' / 'js_store.db')
+
+        async def _signin():
+            loader = JsBridgeLoader(signin_js, plugin_name='signin', pool_size=1)
+            js_ctx = JsContext(stream_id='s1', plugin_name='signin', loop=asyncio.get_running_loop(),
+                               send_api=None, config_getter=lambda k, d=None: d,
+                               logger=logging.getLogger('mai_js_bridge'))
+            try:
+                out = []
+                for _ in range(2):
+                    result = await loader._execute('signin', {'stream_id': 's1', 'plugin_name': 'signin',
+                                                              'matched_groups': [], 'action_data': {}},
+                                                   on_rpc=js_ctx.call)
+                    out.append(result['messages'][0]['content'])
+                return out
+            finally:
+                await loader.close()
+
+        try:
+            signin_out = asyncio.run(_signin())
+            signin_stats = kv_store_mod._kv_store.stats()
+        finally:
+            kv_store_mod._kv_store = saved_store
+        assert signin_out == ['1 {"days":1}', '2 {"days":2}'], signin_out
+        assert signin_stats['pending'] == 0, signin_stats
+        ok('ctx.store：JS 侧 incr / set / get 经宿主调用读写，loader.close() 时写回')
+    except Exception as e:
+        fail('ctx.store', e)
+        traceback.print_exc()
+
+# ─── 8l. mai.reply()：固定文本在 Python 中回复 ──────────────────────────────
+section('8l. mai_js_bridge — _static_js_string')
+try:
+    from mai_js_bridge.bridge import _static_js_string
+
+    literals = {
+        "'Pong!'": 'Pong!',
+        '"say \\"hi\\""': 'say "hi"',
+        "'it\\'s'": "it's",
+        "'a\\nb\\tc'": 'a\nb\tc',
+        "'\\u4f60\\u597d\\x21'": '你好!',
+        "'\\u{1F600}'": '\U0001F600',
+        "'C:\\\\dir'": 'C:\\dir',
+        "'line\\\ncont'": 'linecont',
+        "''": '',
+    }
+    for literal, expected in literals.items():
+        assert _static_js_string(literal) == expected, (literal, _static_js_string(literal))
+    ok('_static_js_string：解码引号、转义、\\u / \\x / \\u{} 与续行')
+    for literal in ["'a' + b", "'a', 'b'", "`t`", "'abc", "'a\\'", "'\\u{110000}'", "x"]:
+        assert _static_js_string(literal) is None, literal
+    ok('_static_js_string：拼接、模板字符串、截断或非法的字面量返回 None')
+
+    if HAS_NODE:
+        # 与 Node.js 对同一字面量求值的结果一致
+        script = 'console.log(JSON.stringify([' + ', '.join(literals) + ']))'
+        evaluated = json.loads(subprocess.run(['node', '-e', script], capture_output=True, text=True,
+                                              encoding='utf-8', timeout=30).stdout)
+        assert evaluated == list(literals.values()), evaluated
+        ok('_static_js_string：解码结果与 Node.js 求值一致')
+except Exception as e:
+    fail('_static_js_string', e)
+    traceback.print_exc()
+
+try:
+    import asyncio
+    from mai_js_bridge import JsBridgeLoader
+    from mai_js_bridge.bridge import _RELOAD_CHECK_INTERVAL
+
+    hello_js = os.path.join(tmpdir, 'hello.js')
+    with open(hello_js, 'w', encoding='utf-8') as f:
+        f.write("mai.reply('/hello', '你好\\n世界', 'hello');\n")
+    hello = JsBridgeLoader(hello_js, plugin_name='hello', registration_parser='regex')
+    hello_info = hello._load_registrations()['commands'][0]
+    assert hello_info['_is_simple_reply'] and hello_info['_reply_text'] == '你好\n世界', hello_info
+    assert asyncio.run(hello._current_reply_text('hello', '')) == '你好\n世界'
+    stat = os.stat(hello_js)
+    with open(hello_js, 'w', encoding='utf-8') as f:
+        f.write("mai.reply('/hello', 'hi again', 'hello');\n")
+    os.utime(hello_js, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    hello._last_reload_check -= _RELOAD_CHECK_INTERVAL     # 跳过检查节流
+    assert asyncio.run(hello._current_reply_text('hello', '')) == 'hi again'
+    assert hello._pool is None and hello.stats()['executions'] == 0
+    ok('mai.reply()：固定文本由 Python 回复，不启动 Node.js；修改 plugin.js 后使用新文本')
+except Exception as e:
+    fail('mai.reply() 固定回复', e)
+    traceback.print_exc()
+
+if HAS_NODE:
+    try:
+        import asyncio, time
+        from mai_js_bridge import JsBridgeLoader
+
+        slow_js = os.path.join(tmpdir, 'slow_top.js')
+
+        def _write_slow(text):
+            # 顶层代码忙等 400ms：--describe 加载插件时同样要执行
+            with open(slow_js, 'w', encoding='utf-8') as f:
+                f.write("const until = Date.now() + 400; while (Date.now() < until) {}\n"
+                        "mai.reply('/slow', '%s', 'slow');\n" % text)
+
+        _write_slow('v1')
+        slow = JsBridgeLoader(slow_js, plugin_name='slow')
+        assert slow._load_registrations()['commands'][0]['_reply_text'] == 'v1'
+
+        async def _reload_while_ticking():
+            gaps = []
+
+            async def tick():
+                last = time.monotonic()
+                for _ in range(40):
+                    await asyncio.sleep(0.02)
+                    now = time.monotonic()
+                    gaps.append(now - last)
+                    last = now
+
+            _write_slow('v2-reloaded')
+            slow._last_reload_check = 0.0           # 跳过检查节流
+            ticker = asyncio.ensure_future(tick())
+            text = await slow._current_reply_text('slow', '')
+            await ticker
+            return text, max(gaps)
+
+        text, max_gap = asyncio.run(_reload_while_ticking())
+        assert text == 'v2-reloaded', text
+        assert max_gap < 0.2, max_gap
+        ok('热重载：Node.js 导出注册信息在异步子进程中运行，不阻塞事件循环')
+    except Exception as e:
+        fail('热重载不阻塞事件循环', e)
+        traceback.print_exc()
+
+# ─── 8m. 延迟与吞吐指标 ─────────────────────────────────────────────────────
+section('8m. mai_js_bridge — Histogram / BridgeMetrics')
+try:
+    from mai_js_bridge.metrics import BYTE_BOUNDS, BridgeMetrics, Histogram
+
+    hist = Histogram((1, 10, 100))
+    for value in (0.5, 1, 1.01, 10, 99, 100, 100.5, 5000):
+        hist.observe(value)
+    assert hist.buckets == [2, 2, 2, 2], hist.buckets
+    snap = hist.snapshot()
+    assert snap['buckets'] == {'<=1': 2, '<=10': 2, '<=100': 2, '>100': 2}, snap['buckets']
+    assert snap['count'] == 8 and snap['max'] == 5000 and snap['mean'] == 664.001, snap
+    assert (snap['p50'], snap['p99']) == (99, 5000), snap
+    ok('Histogram：值等于上界时计入该桶，超过最大上界计入溢出桶；快照含均值与分位数')
+
+    empty = Histogram().snapshot()
+    assert empty['count'] == 0 and empty['mean'] is None and empty['p50'] is None and empty['buckets'] == {}
+    sparse = Histogram((1, 2, 5))
+    sparse.observe(3)
+    assert sparse.snapshot()['buckets'] == {'<=5': 1}
+    ok('Histogram：没有样本时均值与分位数为 None，快照省略空桶')
+
+    metrics = BridgeMetrics()
+    metrics.observe('execute_ms', 3, 'cmd')
+    metrics.observe('execute_ms', 7)
+    metrics.observe('payload_bytes', 300, 'cmd')
+    metrics.count_call('cmd', True)
+    metrics.count_call('cmd', False)
+    metrics.count_call('other', True)
+    snap = metrics.snapshot()
+    assert snap['timings']['execute_ms']['count'] == 2
+    assert snap['components']['cmd']['execute_ms']['count'] == 1
+    assert snap['components']['cmd']['payload_bytes']['buckets'] == {f'<={BYTE_BOUNDS[1]:g}': 1}
+    assert (snap['components']['cmd']['calls'], snap['components']['cmd']['failures']) == (2, 1)
+    assert snap['components']['other'] == {'calls': 1, 'failures': 0}
+    ok('BridgeMetrics：全局与每个组件各自归集，*_bytes 指标按字节桶统计')
+except Exception as e:
+    fail('Histogram / BridgeMetrics', e)
+    traceback.print_exc()
+
+if not HAS_NODE:
+    skip('loader.stats() 指标', 'Node.js 不可用')
+else:
+    try:
+        import asyncio
+        from mai_js_bridge import JsBridgeLoader
+
+        timed_js = os.path.join(tmpdir, 'timed.js')
+        with open(timed_js, 'w', encoding='utf-8') as f:
+            f.write("mai.command({ name: 'hi', pattern: '^/hi$', async execute(ctx) { await ctx.send('hi'); } });\n")
+
+        async def _timed():
+            loader = JsBridgeLoader(timed_js, plugin_name='timed', pool_size=1)
+            try:
+                for _ in range(3):
+                    await loader._execute('hi', {'stream_id': 's1', 'plugin_name': 'timed',
+                                                 'matched_groups': [], 'action_data': {}})
+                return loader.stats()
+            finally:
+                await loader.close()
+
+        timed_stats = asyncio.run(_timed())
+        for name in ('execute_ms', 'roundtrip_ms', 'payload_bytes'):
+            assert timed_stats['timings'][name]['count'] == 3, (name, timed_stats['timings'].get(name))
+            assert timed_stats['components']['hi'][name]['count'] == 3, name
+        assert timed_stats['timings']['spawn_ms']['count'] == 1, timed_stats['timings'].get('spawn_ms')
+        assert timed_stats['components']['hi']['calls'] == 3
+        ok('loader.stats()：每次执行记录执行耗时、往返耗时与字节数，常驻进程只计一次启动')
+    except Exception as e:
+        fail('loader.stats() 指标', e)
+        traceback.print_exc()
+
+# ─── 8n. mai.event() 的 Python 侧预过滤 ─────────────────────────────────────
+section('8n. mai_js_bridge — _EventFilter / _keyword_trie_pattern')
+try:
+    import random, re
+    from mai_js_bridge.bridge import _EventFilter, _keyword_trie_pattern
+
+    assert _keyword_trie_pattern(['早安', '早上好']) == '早(?:上好|安)', _keyword_trie_pattern(['早安', '早上好'])
+    trie = re.compile(_keyword_trie_pattern(['早', '早上好', 'a.b']))
+    assert trie.search('大家早上好').group(0) == '早上好' and trie.search('早啊').group(0) == '早'
+    assert trie.search('axb') is None and trie.search('a.b').group(0) == 'a.b'
+    ok('_keyword_trie_pattern：按前缀树合并关键词，取最长的关键词，元字符按字面匹配')
+
+    rng = random.Random(20240601)
+    for _ in range(300):
+        words = {''.join(rng.choice('ab早.') for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 6))}
+        text = ''.join(rng.choice('ab早.x') for _ in range(rng.randint(0, 12)))
+        naive = re.search('|'.join(re.escape(w) for w in sorted(words, key=len, reverse=True)), text)
+        found = re.search(_keyword_trie_pattern(words), text)
+        assert (found and (found.start(), found.group(0))) == (naive and (naive.start(), naive.group(0))), (words, text)
+    ok('_keyword_trie_pattern：与逐个关键词（长的优先）匹配的结果一致')
+
+    event_filter = _EventFilter({'keywords': ['Hello', '早安', ''], 'streams': ['s1', 's2']})
+    assert event_filter.match('s1', 'oh HELLO there') == ('HELLO', None)
+    assert event_filter.match('s3', 'hello') is None
+    assert event_filter.match('s2', 'nothing here') is None
+    ok('_EventFilter：关键词不区分大小写，返回消息中的原文；不在 streams 中的聊天流直接放行')
+
+    regex_filter = _EventFilter({'regex': '^roll (\\d+)$', 'regex_flags': 'ig', 'keywords': ['dice']})
+    keyword, matched = regex_filter.match(None, 'ROLL 20')
+    assert keyword is None and matched.group(1) == '20'
+    keyword, matched = regex_filter.match(None, 'dice')
+    assert keyword == 'dice' and matched is None
+    assert regex_filter.match(None, 'roll dice 20') == ('dice', None)
+    assert _EventFilter({}).match('s1', 'anything') is None
+    ok('_EventFilter：正则应用 i 标志（忽略 g），关键词与正则任一命中即进入 JS')
+    try:
+        _EventFilter({'regex': '(?<name>x)'})
+        raise AssertionError('JS 命名分组语法应无法编译')
+    except re.error:
+        pass
+    ok('_EventFilter：Python 无法编译的正则抛出 re.error（该事件不注册）')
+except Exception as e:
+    fail('_EventFilter / _keyword_trie_pattern', e)
+    traceback.print_exc()
+
+# ─── 8o. ctx.fetch()：连接复用、响应缓存与合并 ─────────────────────────────
+section('8o. mai_js_bridge — ctx.fetch()')
+if not HAS_NODE:
+    skip('ctx.fetch()', 'Node.js 不可用')
+else:
+    FETCH_TEST = r"""
+const http = require('http');
+const { createContext } = require(process.argv[2]);
+
+function check(name, cond, msg) {
+  if (!cond) process.stderr.write(`FAIL: ${name}: ${msg}\n`);
+  else process.stderr.write(`PASS: ${name}\n`);
+}
+
+async function run() {
+  const hits = {};
+  const sockets = new Set();
+  let otherBase = null;
+  const redirects = { '/see-other': [303, '/landing'], '/stay': [307, '/landing'], '/away': [302, null] };
+  const handler = (req, res) => {
+    sockets.add(req.socket);
+    hits[req.url] = (hits[req.url] || 0) + 1;
+    if (redirects[req.url]) {
+      const [status, location] = redirects[req.url];
+      res.writeHead(status, { Location: location || `${otherBase}/landing` });
+      res.end();
+      return;
+    }
+    let body = '';
+    req.on('data', (c) => { body += c; });
+    req.on('end', () => setTimeout(() => {
+      res.setHeader('Content-Type', 'application/json');
+      res.statusCode = req.url === '/missing' ? 404 : 200;
+      res.end(JSON.stringify({ url: req.url, n: hits[req.url], method: req.method, body,
+                               type: req.headers['content-type'] || null,
+                               length: req.headers['content-length'] || null,
+                               auth: req.headers.authorization || null, cookie: req.headers.cookie || null }));
+    }, 30));
+  };
+  const server = http.createServer(handler);
+  const otherServer = http.createServer(handler);
+  await new Promise((r) => server.listen(0, '127.0.0.1', r));
+  await new Promise((r) => otherServer.listen(0, '127.0.0.1', r));
+  const base = `http://127.0.0.1:${server.address().port}`;
+  otherBase = `http://127.0.0.1:${otherServer.address().port}`;
+  const ctx = (plugin) => createContext({ plugin_name: plugin });
+
+  const c1 = ctx('p1');
+  const a = await (await c1.fetch(`${base}/cached`, { cacheTtl: 60000 })).json();
+  const b = await (await c1.fetch(`${base}/cached`, { cacheTtl: 60000 })).json();
+  const s1 = c1._getFetchStats();
+  check('ctx.fetch cacheTtl：有效期内相同请求直接返回缓存', a.n === 1 && b.n === 1 && hits['/cached'] === 1, JSON.stringify([a, b]));
+  check('ctx.fetch 统计：requests / cached', s1.requests === 1 && s1.cached === 1, JSON.stringify(s1));
+  const other = await (await ctx('p2').fetch(`${base}/cached`, { cacheTtl: 60000 })).json();
+  check('ctx.fetch 缓存按插件隔离', other.n === 2, JSON.stringify(other));
+
+  const c2 = ctx('p1');
+  const [x, y] = await Promise.all([c2.fetch(`${base}/same`), c2.fetch(`${base}/same`)]);
+  const [xj, yj] = [await x.json(), await y.json()];
+  check('ctx.fetch 合并同时发出的相同 GET', hits['/same'] === 1 && xj.n === 1 && yj.n === 1 && c2._getFetchStats().coalesced === 1,
+        JSON.stringify([hits['/same'], c2._getFetchStats()]));
+  await Promise.all([c2.fetch(`${base}/nc`, { coalesce: false }), c2.fetch(`${base}/nc`, { coalesce: false })]);
+  check('ctx.fetch coalesce:false 时各自请求', hits['/nc'] === 2, hits['/nc']);
+
+  const c3 = ctx('p1');
+  const [p, q] = await Promise.all([
+    c3.fetch(`${base}/post`, { method: 'POST', body: { k: 1 }, cacheTtl: 60000 }),
+    c3.fetch(`${base}/post`, { method: 'POST', body: { k: 1 }, cacheTtl: 60000 }),
+  ]);
+  const pj = await p.json();
+  await q.json();
+  check('ctx.fetch POST 不缓存、不合并，对象 body 按 JSON 发送',
+        hits['/post'] === 2 && pj.body === '{"k":1}' && pj.type === 'application/json', JSON.stringify(pj));
+
+  const missing = await c3.fetch(`${base}/missing`, { cacheTtl: 60000 });
+  await c3.fetch(`${base}/missing`, { cacheTtl: 60000 });
+  check('ctx.fetch 非 2xx 响应不缓存', !missing.ok && missing.status === 404 && hits['/missing'] === 2, hits['/missing']);
+
+  const before = sockets.size;
+  const c4 = ctx('p3');
+  for (let i = 0; i < 3; i++) await (await c4.fetch(`${base}/seq${i}`)).text();
+  check('ctx.fetch 顺序请求复用 keep-alive 连接', sockets.size - before <= 1 && c4._getFetchStats().reused >= 2,
+        JSON.stringify([sockets.size - before, c4._getFetchStats()]));
+
+  let timedOut = false;
+  try { await ctx('p1').fetch(`${base}/cached?slow`, { timeout: 5 }); } catch (err) { timedOut = true; }
+  check('ctx.fetch 超时抛出异常', timedOut, 'no error');
+  check('ctx.fetch 未调用时统计为 null', ctx('p1')._getFetchStats() === null, 'not null');
+
+  const c5 = ctx('p4');
+  const seeOther = await (await c5.fetch(`${base}/see-other`, { method: 'POST', body: { a: 1 }, timeout: 2000 })).json();
+  check('ctx.fetch 303 重定向改为 GET，不再声明请求体',
+        seeOther.method === 'GET' && seeOther.body === '' && seeOther.length === null && seeOther.type === null,
+        JSON.stringify(seeOther));
+  const creds = { Authorization: 'Bearer t', Cookie: 'sid=1' };
+  const stay = await (await c5.fetch(`${base}/stay`, { headers: creds, timeout: 2000 })).json();
+  check('ctx.fetch 同源重定向保留凭据', stay.auth === 'Bearer t' && stay.cookie === 'sid=1', JSON.stringify(stay));
+  const away = await (await c5.fetch(`${base}/away`, { headers: creds, timeout: 2000 })).json();
+  check('ctx.fetch 跨源重定向不转发 Authorization / Cookie', away.auth === null && away.cookie === null && away.n >= 1,
+        JSON.stringify(away));
+
+  server.close();
+  otherServer.close();
+  for (const sock of sockets) sock.destroy();
+  process.exit(0);
+}
+
+run().catch(err => { process.stderr.write('UNCAUGHT: '+err+'\n'); process.exit(1); });
+"""
+    fetch_test_file = os.path.join(tmpdir, 'fetch_test.js')
+    with open(fetch_test_file, 'w', encoding='utf-8') as f:
+        f.write(FETCH_TEST)
+    r = subprocess.run(['node', fetch_test_file, SDK], capture_output=True, text=True,
+                       encoding='utf-8', errors='replace', timeout=60)
+    for line in r.stderr.splitlines():
+        if line.startswith('PASS:'):
+            ok(line[6:].strip())
+        elif line.startswith('FAIL:'):
+            fail(line[6:].strip())
+        elif line.startswith('UNCAUGHT:'):
+            fail('ctx.fetch() 未捕获异常', line)
+    if r.returncode != 0 and not any(l.startswith(('PASS:', 'FAIL:')) for l in r.stderr.splitlines()):
+        fail('ctx.fetch() 整体', f'rc={r.returncode}\n{r.stderr[:300]}')
+
+# ─── 8p. Node.js 导出注册信息 ───────────────────────────────────────────────
+section('8p. mai_js_bridge — describe（Node.js 导出注册信息）')
+if not HAS_NODE:
+    skip('describe', 'Node.js 不可用')
+else:
+    try:
+        from mai_js_bridge.bridge import _describe_js_registrations, _parse_js_registrations
+
+        described_js = os.path.join(tmpdir, 'described.js')
+        with open(described_js, 'w', encoding='utf-8') as f:
+            f.write(r"""
+// mai.command('/commented', () => {});
+const PREFIX = '/w';
+mai.command(new RegExp(`^${PREFIX}eather (\\S+)$`, 'i'), async () => {});
+mai.command({ name: 'cfg', description: 'nested', pattern: /^\/cfg$/, timeout: 2000, maxMemoryMb: 64,
+  cache: { ttl: 1000 }, meta: { deep: { x: 1 } }, execute: async () => {} });
+mai.command({ pattern: '^/anon$', execute: async () => {} });
+mai.action({ name: 'act', description: 'an action', parameters: { city: '城市' }, execute: async () => {} });
+mai.event({ name: 'greet', keywords: ['早安'], regex: /^hi$/i, intercept: true, execute: async () => {} });
+mai.schedule({ name: 'tick', every: '5m', jitter: 100, execute: async () => {} });
+['a', 'b'].forEach((n) => mai.reply(`/${n}`, n.toUpperCase(), `gen_${n}`));
+""")
+        with open(described_js, encoding='utf-8') as f:
+            described_src = f.read()
+        regs = _describe_js_registrations(described_js, described_src)
+        commands = {c['name']: c for c in regs['commands']}
+        assert sorted(commands) == ['auto_cmd_0', 'cfg', 'gen_a', 'gen_b'], sorted(commands)
+        ok('describe：导出运行时注册的全部命令，忽略注释中的代码与未命名的对象配置')
+        weather = commands['auto_cmd_0']
+        assert weather['pattern'] == '^\\/weather (\\S+)$' and weather['pattern_flags'] == 'i', weather
+        assert commands['gen_a']['_reply_text'] == 'A' and not commands['gen_a'].get('_is_simple_reply')
+        ok('describe：求值模板字符串拼出的正则与循环注册的 mai.reply()')
+        cfg = commands['cfg']
+        assert (cfg['timeout_ms'], cfg['max_memory_mb'], cfg['cache']) == (2000, 64, {'ttl_ms': 1000, 'max_entries': 256}), cfg
+        assert regs['actions'][0]['parameters'] == {'city': '城市'}
+        assert regs['events'][0] == {'name': 'greet', 'keywords': ['早安'], 'regex': '^hi$', 'regex_flags': 'i', 'intercept': True}
+        assert regs['schedules'][0]['every_ms'] == 300000 and regs['schedules'][0]['jitter_ms'] == 100
+        ok('describe：限制、缓存、Action 参数、事件与定时任务字段按 Python 侧的格式导出')
+        regex_names = [c['name'] for c in _parse_js_registrations(described_src)['commands']]
+        assert 'gen_a' not in regex_names, regex_names
+        ok('describe：覆盖正则解析无法识别的写法')
+
+        broken_js = os.path.join(tmpdir, 'describe_broken.js')
+        with open(broken_js, 'w', encoding='utf-8') as f:
+            f.write("mai.reply('/x', 'x');\nthrow new Error('boom');\n")
+        with open(broken_js, encoding='utf-8') as f:
+            assert _describe_js_registrations(broken_js, f.read()) is None
+        ok('describe：插件加载失败时返回 None（由调用方退回正则解析）')
+    except Exception as e:
+        fail('describe', e)
+        traceback.print_exc()
+
+# ─── 8q. 常驻工作进程池 ─────────────────────────────────────────────────────
+section('8q. mai_js_bridge — 常驻工作进程池')
+if not HAS_NODE:
+    skip('常驻工作进程池', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, time
+        from mai_js_bridge import JsBridgeLoader
+
+        pooled_js = os.path.join(tmpdir, 'pooled.js')
+        with open(pooled_js, 'w', encoding='utf-8') as f:
+            f.write("""
+let n = 0;
+mai.command({ name: 'count', pattern: '^/c$', async execute(ctx) { n += 1; await ctx.send(`${process.pid}:${n}`); } });
+mai.command({ name: 'crash', pattern: '^/x$', async execute() { process.exit(3); } });
+mai.command({ name: 'slow', pattern: '^/s$', async execute(ctx) {
+  await new Promise((r) => setTimeout(r, 300));
+  await ctx.send(String(process.pid));
+}});
+""")
+
+        def _pool_ctx(stream_id='s1'):
+            return {'stream_id': stream_id, 'plugin_name': 'pooled', 'matched_groups': [], 'action_data': {}}
+
+        async def _pooled():
+            loader = JsBridgeLoader(pooled_js, plugin_name='pooled', pool_size=1)
+            try:
+                first = [(await loader._execute('count', _pool_ctx()))['messages'][0]['content'] for _ in range(3)]
+                crashed = await loader._execute('crash', _pool_ctx())
+                after = (await loader._execute('count', _pool_ctx()))['messages'][0]['content']
+                return first, crashed, after, loader.stats()
+            finally:
+                await loader.close()
+
+        first, crashed, after, pool_stats = asyncio.run(_pooled())
+        pids = {item.split(':')[0] for item in first}
+        assert len(pids) == 1 and [item.split(':')[1] for item in first] == ['1', '2', '3'], first
+        ok('pool：同一工作进程处理后续调用，JS 全局变量跨调用保留')
+        assert not crashed['success'] and pool_stats['crashes'] == 1, (crashed, pool_stats['crashes'])
+        assert after.split(':')[0] not in pids and after.endswith(':1'), after
+        ok('pool：工作进程退出时本次调用失败并计入 crashes，下一次调用由新进程处理')
+
+        async def _parallel():
+            loader = JsBridgeLoader(pooled_js, plugin_name='pooled', pool_size=2, routing='least_loaded')
+            try:
+                await loader.warm()
+                started = time.monotonic()
+                results = await asyncio.gather(*(loader._execute('slow', _pool_ctx(f's{i}')) for i in range(2)))
+                return [r['messages'][0]['content'] for r in results], time.monotonic() - started
+            finally:
+                await loader.close()
+
+        parallel_pids, elapsed = asyncio.run(_parallel())
+        assert len(set(parallel_pids)) == 2 and elapsed < 0.55, (parallel_pids, elapsed)
+        ok('pool：多个工作进程并行执行')
+    except Exception as e:
+        fail('常驻工作进程池', e)
+        traceback.print_exc()
+
+    try:
+        import asyncio, time
+        from mai_js_bridge import JsBridgeLoader
+
+        async def _warmed():
+            loader = JsBridgeLoader(pooled_js, plugin_name='pooled', pool_size=2, prewarm=True)
+            spawn_loader = JsBridgeLoader(pooled_js, plugin_name='pooled', exec_mode='spawn')
+            try:
+                loader._schedule_warm()                 # get_components() 在事件循环中调用时的行为
+                ready = await loader._warm_task
+                pids = {w.pid for w in loader._pool.workers}
+                spawns = loader.stats()['timings']['spawn_ms']['count']
+                started = time.monotonic()
+                result = await loader._execute('count', _pool_ctx())
+                first_call = time.monotonic() - started
+                return ready, pids, spawns, result, first_call, loader.stats(), await spawn_loader.warm()
+            finally:
+                await loader.close()
+                await spawn_loader.close()
+
+        ready, pids, spawns, result, first_call, warm_stats, spawn_ready = asyncio.run(_warmed())
+        assert ready == 2 and len(pids) == 2 and spawns == 2, (ready, pids, spawns)
+        ok('prewarm：后台启动全部工作进程并通过健康检查')
+        assert result['messages'][0]['content'].split(':')[0] in {str(p) for p in pids}, result
+        assert warm_stats['timings']['spawn_ms']['count'] == 2 and first_call < 0.5, (warm_stats['timings']['spawn_ms'], first_call)
+        ok('prewarm：第一次调用直接使用预热好的进程，不再等待 Node.js 启动')
+        assert spawn_ready == 0
+        ok('prewarm：spawn 模式无需预热（返回 0）')
+    except Exception as e:
+        fail('预热', e)
+        traceback.print_exc()
+
+# ─── 8r. spawn 模式：异步子进程 ─────────────────────────────────────────────
+section('8r. mai_js_bridge — spawn 模式')
+if not HAS_NODE:
+    skip('spawn 模式', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, time
+        from mai_js_bridge import JsBridgeLoader
+
+        spawned_js = os.path.join(tmpdir, 'spawned.js')
+        with open(spawned_js, 'w', encoding='utf-8') as f:
+            f.write("""
+let n = 0;
+mai.command({ name: 'wait', pattern: '^/w$', async execute(ctx) {
+  n += 1;
+  await new Promise((r) => setTimeout(r, 300));
+  await ctx.send(`${process.pid}:${n}`);
+}});
+""")
+
+        async def _spawned():
+            loader = JsBridgeLoader(spawned_js, plugin_name='spawned', exec_mode='spawn')
+            ticks = 0
+            done = False
+
+            async def ticker():
+                nonlocal ticks
+                while not done:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            tick_task = asyncio.ensure_future(ticker())
+            try:
+                started = time.monotonic()
+                results = await asyncio.gather(*(
+                    loader._execute('wait', {'stream_id': f's{i}', 'plugin_name': 'spawned',
+                                             'matched_groups': [], 'action_data': {}})
+                    for i in range(3)
+                ))
+                elapsed = time.monotonic() - started
+            finally:
+                done = True
+                await tick_task
+                await loader.close()
+            return [r['messages'][0]['content'] for r in results], elapsed, ticks, loader.stats()
+
+        spawned_out, elapsed, ticks, spawn_stats = asyncio.run(_spawned())
+        assert len({item.split(':')[0] for item in spawned_out}) == 3, spawned_out
+        assert all(item.endswith(':1') for item in spawned_out), spawned_out
+        ok('spawn：每次执行启动新进程，JS 全局变量不跨调用保留')
+        assert elapsed < 0.3 * 3 and ticks >= 20, (elapsed, ticks)
+        ok('spawn：子进程异步读写，多次执行并发进行，执行期间事件循环不被阻塞')
+        assert spawn_stats['timings']['spawn_ms']['count'] == 3, spawn_stats['timings'].get('spawn_ms')
+        ok('spawn：每次执行记录进程启动耗时（spawn_ms）')
+    except Exception as e:
+        fail('spawn 模式', e)
+        traceback.print_exc()
+
+# ─── 8s. spawn 模式：上下文经 stdin 传入固定的 runner ──────────────────────
+section('8s. mai_js_bridge — spawn 模式的上下文传递')
+if not HAS_NODE:
+    skip('spawn 模式的上下文传递', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, hashlib
+        from mai_js_bridge import JsBridgeLoader
+
+        echo_js = os.path.join(tmpdir, 'echo_ctx.js')
+        with open(echo_js, 'w', encoding='utf-8') as f:
+            f.write("""
+const crypto = require('crypto');
+mai.action({ name: 'echo', description: 'echo', async execute(ctx) {
+  const text = ctx.param('text');
+  await ctx.send(`${text.length} ${crypto.createHash('sha256').update(text).digest('hex')}`);
+  await ctx.send(ctx.param('tricky'));
+}});
+""")
+        tricky = '引号 \' " ` ${x} \\\\ </script>   😀\n第二行'
+        big = ('麦麦' * 50000) + tricky
+        spawn_tmp = tempfile.mkdtemp(prefix='mai_spawn_tmp_')
+        saved_tempdir = tempfile.tempdir
+        tempfile.tempdir = spawn_tmp
+
+        async def _echo():
+            loader = JsBridgeLoader(echo_js, plugin_name='echo_ctx', exec_mode='spawn')
+            try:
+                return await loader._execute('echo', {'stream_id': 's1', 'plugin_name': 'echo_ctx', 'matched_groups': [],
+                                                      'action_data': {'text': big, 'tricky': tricky}})
+            finally:
+                await loader.close()
+
+        try:
+            echoed = asyncio.run(_echo())
+        finally:
+            tempfile.tempdir = saved_tempdir
+        expected = f"{len(big.encode('utf-16-le')) // 2} {hashlib.sha256(big.encode('utf-8')).hexdigest()}"
+        assert echoed['success'] and echoed['messages'][0]['content'] == expected, echoed['messages'][:1]
+        assert echoed['messages'][1]['content'] == tricky
+        ok('spawn：上下文（含 100KB 以上文本、引号、换行与 emoji）经 stdin 原样传入')
+        assert os.listdir(spawn_tmp) == [], os.listdir(spawn_tmp)
+        ok('spawn：不再为每次执行生成临时脚本文件')
+    except Exception as e:
+        fail('spawn 模式的上下文传递', e)
+        traceback.print_exc()
+
+# ─── 8t. 消息流式发送 ───────────────────────────────────────────────────────
+section('8t. mai_js_bridge — 消息流式发送')
+if not HAS_NODE:
+    skip('消息流式发送', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, time
+        from mai_js_bridge import JsBridgeLoader
+
+        stream_js = os.path.join(tmpdir, 'streamed.js')
+        with open(stream_js, 'w', encoding='utf-8') as f:
+            f.write("""
+mai.command({ name: 'steps', pattern: '^/steps$', async execute(ctx) {
+  await ctx.send('正在查询…');
+  await new Promise((r) => setTimeout(r, 400));
+  await ctx.sendImage(Buffer.from('img'));
+  await ctx.send('完成');
+}});
+""")
+
+        async def _streamed(exec_mode):
+            loader = JsBridgeLoader(stream_js, plugin_name='streamed', exec_mode=exec_mode, pool_size=1)
+            arrivals = []
+            try:
+                await loader.warm()
+
+                async def on_message(msg):
+                    arrivals.append((msg['type'], time.monotonic()))
+
+                started = time.monotonic()
+                result = await loader._execute('steps', {'stream_id': 's1', 'plugin_name': 'streamed',
+                                                         'matched_groups': [], 'action_data': {}},
+                                               on_message=on_message)
+                finished = time.monotonic()
+            finally:
+                await loader.close()
+            return result, [(kind, at - started) for kind, at in arrivals], finished - started
+
+        for exec_mode in ('pool', 'spawn'):
+            result, arrivals, total = asyncio.run(_streamed(exec_mode))
+            assert result['success'] and result['messages'] == [], result
+            assert [kind for kind, _ in arrivals] == ['text', 'image', 'text'], arrivals
+            assert total - arrivals[0][1] >= 0.3, (exec_mode, arrivals, total)
+            ok(f'{exec_mode}：消息在产生时逐条回调（先于执行结束），结果中不再重复')
+    except Exception as e:
+        fail('消息流式发送', e)
+        traceback.print_exc()
+
+    try:
+        import asyncio, logging
+        from mai_js_bridge import JsBridgeLoader, JsContext
+
+        burst_js = os.path.join(tmpdir, 'burst.js')
+        with open(burst_js, 'w', encoding='utf-8') as f:
+            f.write("""
+mai.command({ name: 'burst', pattern: '^/burst$', timeout: 500, async execute(ctx) {
+  for (let i = 1; i <= 5; i++) await ctx.send(`第 ${i} 条`);
+}});
+""")
+
+        class _SlowSendApi:
+            def __init__(self):
+                self.sent = []
+
+            async def text_to_stream(self, text, stream_id):
+                await asyncio.sleep(0.2)            # 5 条共 1 秒，超过组件的 500ms 超时
+                self.sent.append(text)
+
+        async def _slow_backend():
+            loader = JsBridgeLoader(burst_js, plugin_name='burst', pool_size=1)
+            send_api = _SlowSendApi()
+            js_ctx = JsContext(stream_id='s1', plugin_name='burst', loop=asyncio.get_running_loop(),
+                               send_api=send_api, config_getter=lambda k, d=None: d,
+                               logger=logging.getLogger('mai_js_bridge'))
+            try:
+                await loader.warm()
+                pid = loader._pool.workers[0].pid
+                result = await loader._run_component('burst', {'stream_id': 's1', 'plugin_name': 'burst',
+                                                               'matched_groups': [], 'action_data': {}},
+                                                     js_ctx, send_api)
+                return result, send_api.sent, loader.stats(), pid, [w.pid for w in loader._pool.workers]
+            finally:
+                await loader.close()
+
+        result, sent, burst_stats, pid, pids = asyncio.run(_slow_backend())
+        assert result['success'], result
+        assert sent == [f'第 {i} 条' for i in range(1, 6)], sent
+        assert burst_stats['timeouts'] == 0 and pids == [pid], (burst_stats['timeouts'], pid, pids)
+        ok('聊天后端较慢时消息按顺序发送，发送时间不计入组件的执行超时')
+    except Exception as e:
+        fail('慢速聊天后端', e)
+        traceback.print_exc()
+
+# ─── 8u. JS → Python 宿主调用（RPC）─────────────────────────────────────────
+section('8u. mai_js_bridge — 宿主调用（RPC）')
+if not HAS_NODE:
+    skip('宿主调用（RPC）', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, logging, time
+        from mai_js_bridge import JsBridgeLoader, JsContext
+
+        rpc_js = os.path.join(tmpdir, 'rpc.js')
+        with open(rpc_js, 'w', encoding='utf-8') as f:
+            f.write("""
+mai.command({ name: 'calls', pattern: '^/calls$', async execute(ctx) {
+  const sum = await ctx.call('add', 1, 2);
+  const started = Date.now();
+  const both = await Promise.all([ctx.call('slow', 'x'), ctx.call('slow', 'y')]);
+  const parallel = Date.now() - started < 350;
+  let err = null;
+  try { await ctx.call('boom'); } catch (e) { err = e.message; }
+  await ctx.send(JSON.stringify({ sum, both, parallel, err }));
+}});
+mai.command({ name: 'denied', pattern: '^/denied$', async execute(ctx) {
+  try { await ctx.call('__init__'); } catch (e) { await ctx.send(e.message); }
+}});
+""")
+
+        async def on_rpc(method, args):
+            if method == 'add':
+                return sum(args)
+            if method == 'slow':
+                await asyncio.sleep(0.2)
+                return args[0].upper()
+            raise ValueError(f'{method} 失败')
+
+        async def _rpc():
+            loader = JsBridgeLoader(rpc_js, plugin_name='rpc', pool_size=1)
+            js_ctx = JsContext(stream_id='s1', plugin_name='rpc', loop=asyncio.get_running_loop(),
+                               send_api=None, config_getter=lambda k, d=None: d,
+                               logger=logging.getLogger('mai_js_bridge'))
+            context = {'stream_id': 's1', 'plugin_name': 'rpc', 'matched_groups': [], 'action_data': {}}
+            try:
+                calls = await loader._execute('calls', context, on_rpc=on_rpc)
+                denied = await loader._execute('denied', context, on_rpc=js_ctx.call)
+                return calls, denied
+            finally:
+                await loader.close()
+
+        calls, denied = asyncio.run(_rpc())
+        payload = json.loads(calls['messages'][0]['content'])
+        assert payload['sum'] == 3 and payload['both'] == ['X', 'Y'], payload
+        ok('RPC：JS 侧 ctx.call() 在执行中途调用 Python 并取得返回值')
+        assert payload['parallel'], payload
+        ok('RPC：同一次执行中的多个调用并发处理')
+        assert 'boom 失败' in payload['err'], payload
+        ok('RPC：Python 侧的异常在 JS 侧以 reject 抛出，执行可以继续')
+        assert '不允许调用' in denied['messages'][0]['content'], denied
+        ok('RPC：JsContext.call 只允许白名单内的宿主方法')
+    except Exception as e:
+        fail('宿主调用（RPC）', e)
+        traceback.print_exc()
+
+# ─── 8v. 常驻进程内热重载 ───────────────────────────────────────────────────
+section('8v. mai_js_bridge — 热重载')
+if not HAS_NODE:
+    skip('热重载', 'Node.js 不可用')
+else:
+    try:
+        import asyncio
+        from mai_js_bridge import JsBridgeLoader
+
+        hot_dir = os.path.join(tmpdir, 'hot')
+        os.makedirs(hot_dir, exist_ok=True)
+        hot_js = os.path.join(hot_dir, 'plugin.js')
+
+        def _write_hot(plugin_src, lib_src=None):
+            if lib_src is not None:
+                with open(os.path.join(hot_dir, 'lib.js'), 'w', encoding='utf-8') as f:
+                    f.write(lib_src)
+            mtime = os.stat(hot_js).st_mtime_ns if os.path.exists(hot_js) else None
+            with open(hot_js, 'w', encoding='utf-8') as f:
+                f.write(plugin_src)
+            if mtime is not None:   # 保证 mtime 变化（文件系统时间精度有限）
+                os.utime(hot_js, ns=(mtime + 10**9, mtime + 10**9))
+
+        hot_src = """
+const lib = require('./lib');
+mai.command({ name: 'ver', pattern: '^/ver$', async execute(ctx) {
+  await ctx.send(`%s ${lib.tag} ${process.pid}`);
+}});
+"""
+        _write_hot(hot_src % 'v1', "module.exports = { tag: 'lib1' };")
+
+        async def _hot():
+            loader = JsBridgeLoader(hot_js, plugin_name='hot', pool_size=1)
+            context = {'stream_id': 's1', 'plugin_name': 'hot', 'matched_groups': [], 'action_data': {}}
+            try:
+                out = [await loader._execute('ver', context)]
+                _write_hot(hot_src % 'v2', "module.exports = { tag: 'lib2' };")
+                out.append(await loader._execute('ver', context))
+                _write_hot("mai.command({ name: 'ver', execute: async (ctx) => { ctx.send('v3' }); } });")
+                out.append(await loader._execute('ver', context))
+                return out
+            finally:
+                await loader.close()
+
+        v1, v2, broken = asyncio.run(_hot())
+        text = [r['messages'][0]['content'].split() for r in (v1, v2, broken)]
+        assert text[0][:2] == ['v1', 'lib1'] and text[1][:2] == ['v2', 'lib2'], text
+        assert text[0][2] == text[1][2] and (v1['version'], v2['version']) == (1, 2), (text, v1['version'], v2['version'])
+        ok('热重载：plugin.js 修改后在同一工作进程内重新加载，插件目录内的模块一并更新')
+        assert broken['success'] and text[2][:2] == ['v2', 'lib2'] and broken['version'] == 2, (text[2], broken.get('version'))
+        ok('热重载：新代码加载失败时继续使用上一个版本')
+    except Exception as e:
+        fail('热重载', e)
+        traceback.print_exc()
+
+# ─── 8w. isolated 模式：预热进程 + 每次全新的 vm 上下文 ──────────────────────
+section('8w. mai_js_bridge — isolated 模式')
+if not HAS_NODE:
+    skip('isolated 模式', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, time
+        from mai_js_bridge import JsBridgeLoader
+
+        iso_dir = os.path.join(tmpdir, 'iso')
+        os.makedirs(iso_dir, exist_ok=True)
+        with open(os.path.join(iso_dir, 'counter.js'), 'w', encoding='utf-8') as f:
+            f.write("let hits = 0;\nmodule.exports = () => ++hits;\n")
+        iso_js = os.path.join(iso_dir, 'plugin.js')
+        with open(iso_js, 'w', encoding='utf-8') as f:
+            f.write("""
+const bump = require('./counter');
+let n = 0;
+mai.command({ name: 'probe', pattern: '^/probe$', async execute(ctx) {
+  n += 1;
+  const polluted = typeof Array.prototype.__maiLeak === 'function';
+  Array.prototype.__maiLeak = () => 1;
+  globalThis.leaked = (globalThis.leaked || 0) + 1;
+  await ctx.send(JSON.stringify({ n, lib: bump(), polluted, leaked: globalThis.leaked, pid: process.pid }));
+}});
+""")
+
+        async def _iso():
+            loader = JsBridgeLoader(iso_js, plugin_name='iso', exec_mode='isolated', pool_size=1)
+            context = {'stream_id': 's1', 'plugin_name': 'iso', 'matched_groups': [], 'action_data': {}}
+            try:
+                await loader.warm()
+                out = []
+                started = time.monotonic()
+                for _ in range(5):
+                    result = await loader._execute('probe', context)
+                    out.append(json.loads(result['messages'][0]['content']))
+                return out, (time.monotonic() - started) / 5
+            finally:
+                await loader.close()
+
+        probes, per_call = asyncio.run(_iso())
+        assert all(p == {**probes[0], 'pid': p['pid']} for p in probes), probes
+        assert probes[0]['n'] == 1 and probes[0]['lib'] == 1 and not probes[0]['polluted'] and probes[0]['leaked'] == 1, probes[0]
+        ok('isolated：每次执行在全新的 vm 上下文中运行，全局变量、内置原型与插件目录内模块的状态都不保留')
+        assert len({p['pid'] for p in probes}) == 1 and per_call < 0.1, ({p['pid'] for p in probes}, per_call)
+        ok('isolated：复用预热好的进程，不为每次执行启动 Node.js')
+    except Exception as e:
+        fail('isolated 模式', e)
+        traceback.print_exc()
+
+# ─── 8x. 超时与内存限制 ─────────────────────────────────────────────────────
+section('8x. mai_js_bridge — 超时与内存限制')
+if not HAS_NODE:
+    skip('超时与内存限制', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, time
+        from mai_js_bridge import JsBridgeLoader
+
+        limits_js = os.path.join(tmpdir, 'limits.js')
+        with open(limits_js, 'w', encoding='utf-8') as f:
+            f.write("""
+const keep = [];
+mai.command({ name: 'spin', pattern: '^/spin$', timeout: 300, async execute() { while (true) {} } });
+mai.command({ name: 'grow', pattern: '^/grow$', maxMemoryMb: 48, async execute(ctx) {
+  for (let i = 0; i < 80; i++) keep.push(new Array(131072).fill(i));
+  await ctx.send('grown');
+}});
+mai.command({ name: 'pid', pattern: '^/pid$', async execute(ctx) { await ctx.send(String(process.pid)); } });
+""")
+
+        async def _limits(exec_mode):
+            loader = JsBridgeLoader(limits_js, plugin_name='limits', exec_mode=exec_mode, pool_size=1)
+            context = {'stream_id': 's1', 'plugin_name': 'limits', 'matched_groups': [], 'action_data': {}}
+            try:
+                before = await loader._execute('pid', context)
+                started = time.monotonic()
+                spun = await loader._execute('spin', context)
+                spin_s = time.monotonic() - started
+                grown = await loader._execute('grow', context)
+                after = await loader._execute('pid', context)
+                return before, spun, spin_s, grown, after, loader.stats(), loader._heap_limit_args()
+            finally:
+                await loader.close()
+
+        pool_run = None
+        for exec_mode in ('pool', 'spawn'):
+            before, spun, spin_s, grown, after, limit_stats, heap_args = asyncio.run(_limits(exec_mode))
+            assert not spun['success'] and '超时' in spun['log'] and spin_s < 1.5, (spun, spin_s)
+            assert not grown['success'] and after['success'], (grown, after)
+            assert (limit_stats['timeouts'], limit_stats['crashes']) == (1, 1), limit_stats
+            ok(f'{exec_mode}：死循环按组件的 timeout 结束，超出 maxMemoryMb 的进程被结束，之后的调用照常执行')
+            if exec_mode == 'pool':
+                pool_run = (before, after, heap_args)
+        before, after, heap_args = pool_run
+        assert heap_args == ('--max-old-space-size=48',), heap_args
+        assert before['messages'] != after['messages'], (before, after)
+        ok('pool：常驻进程以各组件 maxMemoryMb 的最大值启动，被结束的进程由新进程替换')
+    except Exception as e:
+        fail('超时与内存限制', e)
+        traceback.print_exc()
+
+# ─── 8y. sticky 路由 ────────────────────────────────────────────────────────
+section('8y. mai_js_bridge — sticky 路由')
+try:
+    from collections import Counter
+    from mai_js_bridge.worker_pool import JsWorkerPool
+
+    pool3 = JsWorkerPool(None, 'routing', size=3)
+    pool4 = JsWorkerPool(None, 'routing', size=4)
+    keys = [f'stream-{i}' for i in range(600)]
+    slots3 = [pool3._slot_for(k) for k in keys]
+    assert slots3 == [pool3._slot_for(k) for k in keys]
+    assert min(Counter(slots3).values()) > 150, Counter(slots3)
+    ok('_slot_for：同一路由键总是映射到同一槽位，各槽位分布均匀')
+    moved = [(a, b) for a, b in zip(slots3, (pool4._slot_for(k) for k in keys)) if a != b]
+    assert moved and all(b == 3 for _, b in moved) and len(moved) < 220, (len(moved), set(moved))
+    ok('_slot_for：进程池扩容时只有分到新槽位的聊天流改变归属（rendezvous 哈希）')
+except Exception as e:
+    fail('sticky 路由哈希', e)
+    traceback.print_exc()
+
+if not HAS_NODE:
+    skip('sticky 路由', 'Node.js 不可用')
+else:
+    try:
+        import asyncio
+        from mai_js_bridge import JsBridgeLoader
+
+        sticky_js = os.path.join(tmpdir, 'sticky.js')
+        with open(sticky_js, 'w', encoding='utf-8') as f:
+            f.write("""
+mai.command({ name: 'pid', pattern: '^/pid$', async execute(ctx) {
+  await new Promise((r) => setTimeout(r, Number(ctx.match(1) || 0)));
+  await ctx.send(String(process.pid));
+}});
+mai.command({ name: 'crash', pattern: '^/crash$', async execute() { process.exit(1); } });
+""")
+
+        def _sticky_ctx(stream_id, delay=0):
+            return {'stream_id': stream_id, 'plugin_name': 'sticky', 'matched_groups': [str(delay)], 'action_data': {}}
+
+        async def _sticky():
+            loader = JsBridgeLoader(sticky_js, plugin_name='sticky', pool_size=3)
+            try:
+                await loader.warm()
+                pool = loader._pool
+                owners = {}
+                for _ in range(3):
+                    for i in range(8):
+                        result = await loader._execute('pid', _sticky_ctx(f's{i}'))
+                        owners.setdefault(f's{i}', set()).add(result['messages'][0]['content'])
+                expected = {f's{i}': {str(pool._workers[pool._slot_for(f's{i}')].pid)} for i in range(8)}
+
+                victim = 's0'
+                slot = pool._slot_for(victim)
+                await loader._execute('crash', _sticky_ctx(victim))
+                after_crash = (await loader._execute('pid', _sticky_ctx(victim)))['messages'][0]['content']
+                restarted = str(pool._workers[slot].pid)
+
+                burst = await asyncio.gather(*(loader._execute('pid', _sticky_ctx('busy', 200)) for _ in range(8)))
+                return owners, expected, after_crash, restarted, {r['messages'][0]['content'] for r in burst}, loader.stats()['steals']
+            finally:
+                await loader.close()
+
+        owners, expected, after_crash, restarted, burst_pids, steals = asyncio.run(_sticky())
+        assert owners == expected and len(set().union(*owners.values())) > 1, (owners, expected)
+        ok('sticky：同一聊天流的请求总是由同一工作进程处理，不同聊天流分散到多个进程')
+        assert after_crash == restarted, (after_crash, restarted)
+        ok('sticky：工作进程崩溃重启后仍在原槽位，聊天流的归属不变')
+        assert steals > 0 and len(burst_pids) > 1, (steals, burst_pids)
+        ok('sticky：目标进程积压时请求转给更空闲的进程，计入 steals')
+    except Exception as e:
+        fail('sticky 路由', e)
+        traceback.print_exc()
+
+# ─── 8z. 图片 / 表情的二进制帧传输 ──────────────────────────────────────────
+section('8z. mai_js_bridge — 二进制帧传输')
+if not HAS_NODE:
+    skip('二进制帧传输', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, base64, hashlib
+        from mai_js_bridge import JsBridgeLoader
+        from mai_js_bridge.bridge import _send_messages
+
+        binary_js = os.path.join(tmpdir, 'binary.js')
+        with open(binary_js, 'w', encoding='utf-8') as f:
+            f.write("""
+mai.command({ name: 'pics', pattern: '^/pics$', async execute(ctx) {
+  const size = Number(ctx.match(1));
+  const raw = Buffer.alloc(size);
+  for (let i = 0; i < size; i++) raw[i] = (i * 31 + 7) % 256;
+  await ctx.sendImage(raw);
+  await ctx.sendEmoji(raw.toString('base64'));
+  await ctx.send('\\n'.repeat(3) + '文本 ✓');
+}});
+""")
+
+        class _MediaApi:
+            def __init__(self):
+                self.sent = []
+
+            async def text_to_stream(self, text, stream_id):
+                self.sent.append(('text', text))
+
+            async def image_to_stream(self, data, stream_id):
+                self.sent.append(('image', data))
+
+            async def emoji_to_stream(self, data, stream_id):
+                self.sent.append(('emoji', data))
+
+        def _expected_b64(size):
+            return base64.b64encode(bytes((i * 31 + 7) % 256 for i in range(size))).decode('ascii')
+
+        blob_dir = tempfile.mkdtemp(prefix='mai_blob_')
+
+        async def _binary(exec_mode, size):
+            loader = JsBridgeLoader(binary_js, plugin_name='binary', exec_mode=exec_mode, pool_size=1, blob_dir=blob_dir)
+            try:
+                result = await loader._execute('pics', {'stream_id': 's1', 'plugin_name': 'binary',
+                                                        'matched_groups': [str(size)], 'action_data': {}})
+                api = _MediaApi()
+                await _send_messages(api, result['messages'], 's1')
+                return result, api.sent
+            finally:
+                await loader.close()
+
+        from mai_js_bridge import worker_pool as worker_pool_mod
+        taken = []
+        saved_take = worker_pool_mod._take_blob_file
+
+        def _counting_take(blob_file, size, blob_dir):
+            taken.append(size)
+            return saved_take(blob_file, size, blob_dir)
+
+        worker_pool_mod._take_blob_file = _counting_take
+        try:
+            runs = [(exec_mode, size, *asyncio.run(_binary(exec_mode, size)))
+                    for exec_mode, size in [('pool', 4096), ('spawn', 4096), ('pool', 3 * 1024 * 1024)]]
+        finally:
+            worker_pool_mod._take_blob_file = saved_take
+        for exec_mode, size, result, sent in runs:
+            expected = _expected_b64(size)
+            # Buffer 总是以二进制帧传输；base64 字符串 ≥64KB 时才改用二进制帧
+            kinds = [(m['type'], m.get('encoding')) for m in result['messages']]
+            emoji_encoding = 'base64' if len(expected) >= 64 * 1024 else None
+            assert kinds[:2] == [('image', 'binary'), ('emoji', emoji_encoding)], kinds
+            assert isinstance(result['messages'][0]['content'], (bytes, bytearray, memoryview))
+            assert [k for k, _ in sent] == ['image', 'emoji', 'text'], [k for k, _ in sent]
+            assert sent[0][1] == expected and sent[1][1] == expected, (exec_mode, size)
+            assert sent[2][1] == '\n\n\n文本 ✓'
+            ok(f'{exec_mode}：{size // 1024}KB 图片以原始字节传输，base64 表情不重复编码，发送时内容一致')
+        assert taken == [3 * 1024 * 1024, 4 * 1024 * 1024] and os.listdir(blob_dir) == [], (taken, os.listdir(blob_dir))
+        ok('≥1MB 的载荷经 blob_dir 中转，读取后删除中转文件')
+    except Exception as e:
+        fail('二进制帧传输', e)
+        traceback.print_exc()
+
+# ─── 8za. 按需性能分析 ──────────────────────────────────────────────────────
+section('8za. mai_js_bridge — 按需性能分析')
+try:
+    from mai_js_bridge.bridge import _parse_profile_spec
+    assert _parse_profile_spec('CPU: roll, render ') == ('cpu', frozenset({'roll', 'render'}))
+    assert _parse_profile_spec('heap') == ('heap', None) and _parse_profile_spec('') == (None, None)
+    try:
+        _parse_profile_spec('gpu')
+        raise AssertionError('未知类型应抛出 ValueError')
+    except ValueError:
+        pass
+    ok('MAI_JS_PROFILE：解析 "kind[:组件,...]"，未知类型报错')
+except Exception as e:
+    fail('性能分析参数解析', e)
+
+if not HAS_NODE:
+    skip('按需性能分析', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, json as _json
+        from mai_js_bridge import JsBridgeLoader
+        from mai_plugin_cli.commands.profile import self_times
+
+        profile_dir = tempfile.mkdtemp(prefix='mai_profile_')
+        profiled_js = os.path.join(profile_dir, 'plugin.js')
+        with open(profiled_js, 'w', encoding='utf-8') as f:
+            f.write("""
+function burnCpu(ms) {
+  const end = Date.now() + ms;
+  let x = 0;
+  while (Date.now() < end) x += Math.sqrt(x + 1);
+  return x;
+}
+mai.command({ name: 'burn', pattern: '^/burn$', execute(ctx) { burnCpu(80); ctx.send('done'); } });
+mai.command({ name: 'quiet', pattern: '^/quiet$', execute(ctx) { ctx.send('quiet'); } });
+""")
+
+        async def _profiled(profile):
+            loader = JsBridgeLoader(profiled_js, plugin_name='profiled', pool_size=1,
+                                    profile=profile, profile_components=['burn'])
+            try:
+                ctx = {'stream_id': 's1', 'plugin_name': 'profiled', 'matched_groups': [], 'action_data': {}}
+                return await loader._execute('burn', ctx), await loader._execute('quiet', ctx)
+            finally:
+                await loader.close()
+
+        burn, quiet = asyncio.run(_profiled('cpu'))
+        assert burn['success'] and burn['messages'][0]['content'] == 'done', burn
+        path = burn.get('profile')
+        assert path and path.endswith('.cpuprofile') and '.burn.' in os.path.basename(path), path
+        assert os.path.dirname(path) == profile_dir and os.path.exists(path), path
+        assert 'profile' not in quiet, quiet
+        ok('cpu：只为 profile_components 中的组件写出 .cpuprofile，文件在插件旁边')
+        with open(path, 'r', encoding='utf-8') as f:
+            times, duration = self_times(_json.load(f))
+        hot = {name: ms for (name, _), ms in times.items()}
+        assert duration > 0 and hot.get('burnCpu', 0) > 0, sorted(hot.items(), key=lambda kv: -kv[1])[:5]
+        ok('cpu：mai profile 的汇总能在采样中找到热点函数')
+
+        burn, quiet = asyncio.run(_profiled('heap'))
+        assert burn.get('profile', '').endswith('.heapsnapshot') and os.path.exists(burn['profile']), burn.get('profile')
+        assert 'profile' not in quiet
+        ok('heap：执行结束后写出堆快照')
+    except Exception as e:
+        fail('按需性能分析', e)
+        traceback.print_exc()
+
+# ─── 8zb. 插件配置推送 ──────────────────────────────────────────────────────
+section('8zb. mai_js_bridge — 插件配置推送')
+if not HAS_NODE:
+    skip('插件配置推送', 'Node.js 不可用')
+else:
+    try:
+        import asyncio, json as _json
+        from mai_js_bridge import JsBridgeLoader
+        from mai_js_bridge.worker_pool import JsWorker
+
+        config_dir = tempfile.mkdtemp(prefix='mai_config_')
+        config_js = os.path.join(config_dir, 'plugin.js')
+        config_toml = os.path.join(config_dir, 'config.toml')
+        with open(config_js, 'w', encoding='utf-8') as f:
+            f.write("""
+mai.command({ name: 'cfg', pattern: '^/cfg$', execute(ctx) {
+  const greeting = ctx.config('greeting');
+  try { greeting.text = '已修改'; } catch (err) {}
+  ctx.send(JSON.stringify({ greeting, repeat: ctx.config('greeting.repeat', 1), frozen: Object.isFrozen(greeting) }));
+}});
+""")
+        with open(config_toml, 'w', encoding='utf-8') as f:
+            f.write('[greeting]\ntext = "你好"\n')
+
+        config_frames = []
+        saved_write = JsWorker._write
+
+        async def _counting_write(self, data):
+            if data.startswith(b'{"type": "config"'):
+                config_frames.append(_json.loads(data))
+            return await saved_write(self, data)
+
+        async def _configured():
+            loader = JsBridgeLoader(config_js, plugin_name='configured', pool_size=1)
+            ctx = {'stream_id': 's1', 'plugin_name': 'configured', 'matched_groups': [], 'action_data': {}}
+            try:
+                first = [await loader._execute('cfg', ctx) for _ in range(3)]
+                with open(config_toml, 'w', encoding='utf-8') as f:
+                    f.write('[greeting]\ntext = "晚上好"\nrepeat = 2\n')
+                loader._last_config_check = 0.0         # 跳过 stat 节流
+                second = await loader._execute('cfg', ctx)
+                return first, second
+            finally:
+                await loader.close()
+
+        JsWorker._write = _counting_write
+        try:
+            first, second = asyncio.run(_configured())
+        finally:
+            JsWorker._write = saved_write
+        seen = [_json.loads(r['messages'][0]['content']) for r in first]
+        assert all(v == {'greeting': {'text': '你好'}, 'repeat': 1, 'frozen': True} for v in seen), seen
+        ok('config.toml 以 ctx.config 提供给组件，已冻结，组件修改不生效')
+        assert [frame['version'] for frame in config_frames] == [1, 2], config_frames
+        assert _json.loads(second['messages'][0]['content'])['repeat'] == 2
+        ok('同一版本的配置只推送一次，config.toml 变化后推送新版本')
+    except Exception as e:
+        fail('插件配置推送', e)
+        traceback.print_exc()
+
 # ─── 9. mai_advanced ─────────────────────────────────────────────────────────
 section('9. mai_advanced — 属性兼容性')
 
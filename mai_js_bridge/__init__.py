@@ -12,6 +12,7 @@ mai_js_bridge - MaiBot JavaScript 插件桥接器
 """
 
 from .bridge import JsBridgeLoader, JsBridgePlugin
+from .host import JsHostManager, configure_host_manager, get_host_manager
 from .js_context import JsContext
 
 # 别名：JsExecutionContext = JsContext
@@ -23,4 +24,7 @@ __all__ = [
     "JsBridgePlugin",   # JsBridgeLoader 的别名
     "JsContext",
     "JsExecutionContext",  # JsContext 的别名
+    "JsHostManager",
+    "configure_host_manager",
+    "get_host_manager",
 ]
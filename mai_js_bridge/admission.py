@@ -0,0 +1,237 @@
+"""
+AdmissionController - JS 执行的准入控制与背压
+
+刷屏时同一个聊天流可能瞬间堆积成百上千次 JS 执行。准入控制在执行前
+为每个请求排队：
+
+1. 每个聊天流同时最多执行 stream_concurrency 个请求，其余在该流的队列中等待，
+   队列长度不超过 stream_queue
+2. 每个组件排队 + 执行中的请求合计不超过 component_queue
+
+超出时按溢出策略处理：
+    drop_newest - 拒绝新请求
+    drop_oldest - 挤掉同一队列中等待最久的请求，新请求入队
+    coalesce    - 与正在排队 / 执行的相同请求（同一聊天流、同一组件、相同输入）合并，
+                  共享同一次执行的结果；没有可合并的请求时拒绝新请求
+
+合并只在队列已满时发生，且只用于调用方标明可合并（输出只取决于输入）的请求：
+不同用户发出的相同命令（如签到）各自有副作用，不能共享一次执行。
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "coalesce")
+
+
+class AdmissionRejected(Exception):
+    """请求未被准入（被拒绝或被挤出队列），消息即原因"""
+
+
+class _Waiter:
+    __slots__ = ("stream_id", "component", "future")
+
+    def __init__(self, stream_id: str, component: str, future: asyncio.Future):
+        self.stream_id = stream_id
+        self.component = component
+        self.future = future
+
+
+class _StreamState:
+    __slots__ = ("running", "waiting")
+
+    def __init__(self):
+        self.running = 0
+        self.waiting: Deque[_Waiter] = deque()
+
+
+class AdmissionController:
+    """
+    单个插件的准入控制器（只在事件循环线程中使用）。
+
+    Args:
+        policy:             溢出策略，见 OVERFLOW_POLICIES
+        stream_concurrency: 每个聊天流同时执行的请求数上限
+        stream_queue:       每个聊天流等待中的请求数上限
+        component_queue:    每个组件排队 + 执行中的请求数上限
+    """
+
+    def __init__(
+        self,
+        policy: str = "drop_newest",
+        stream_concurrency: int = 4,
+        stream_queue: int = 16,
+        component_queue: int = 64,
+    ):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的溢出策略：{policy}（可选：{', '.join(OVERFLOW_POLICIES)}）")
+        if min(stream_concurrency, component_queue) < 1 or stream_queue < 0:
+            raise ValueError("stream_concurrency / component_queue 至少为 1，stream_queue 不能为负")
+        self.policy = policy
+        self.stream_concurrency = stream_concurrency
+        self.stream_queue = stream_queue
+        self.component_queue = component_queue
+        self._streams: Dict[str, _StreamState] = {}
+        self._component_pending: Dict[str, int] = {}
+        self._component_waiting: Dict[str, Deque[_Waiter]] = {}
+        self._coalescing: Dict[Any, asyncio.Future] = {}
+        self.rejected = 0
+        self.evicted = 0
+        self.coalesced = 0
+
+    async def run(
+        self,
+        stream_id: str,
+        component: str,
+        request_key: Any,
+        factory: Callable[[], Awaitable[T]],
+    ) -> T:
+        """
+        准入后执行 factory() 并返回其结果；未被准入时抛出 AdmissionRejected。
+
+        request_key 标识"相同的请求"（coalesce 策略在队列已满时据此合并），通常是规范化后的输入；
+        为 None 表示该请求不可合并（例如有副作用的组件）。
+        """
+        key = (stream_id, component, request_key)
+        coalescible = self.policy == "coalesce" and request_key is not None
+        if coalescible and key in self._coalescing and self._is_full(stream_id, component):
+            self.coalesced += 1
+            return await asyncio.shield(self._coalescing[key])
+
+        shared: Optional[asyncio.Future] = None
+        if coalescible and key not in self._coalescing:
+            shared = asyncio.get_running_loop().create_future()
+            self._coalescing[key] = shared
+        try:
+            await self._admit(stream_id, component)
+            try:
+                result = await factory()
+            finally:
+                self._release(stream_id, component)
+        except BaseException as e:
+            if shared is not None:
+                self._coalescing.pop(key, None)
+                if not shared.done():
+                    shared.set_exception(e if isinstance(e, Exception) else AdmissionRejected("请求已取消"))
+                    shared.exception()   # 没有合并者时避免 "exception was never retrieved"
+            raise
+        if shared is not None:
+            self._coalescing.pop(key, None)
+            shared.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """rejected / evicted / coalesced 累计次数，queued 为当前等待中的请求数"""
+        return {
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+            "coalesced": self.coalesced,
+            "queued": sum(len(s.waiting) for s in self._streams.values()),
+        }
+
+    # ── 内部 ──────────────────────────────────────────────────────────────────
+
+    def _is_full(self, stream_id: str, component: str) -> bool:
+        """新请求此时是否会触发溢出（与 _admit 的判断一致）"""
+        if self._component_pending.get(component, 0) >= self.component_queue:
+            return True
+        stream = self._streams.get(stream_id)
+        if stream is None or (stream.running < self.stream_concurrency and not stream.waiting):
+            return False
+        return len(stream.waiting) >= self.stream_queue
+
+    async def _admit(self, stream_id: str, component: str) -> None:
+        if self._component_pending.get(component, 0) >= self.component_queue:
+            self._overflow(self._component_waiting.get(component), f"组件 {component} 排队已满（{self.component_queue}）")
+
+        stream = self._streams.setdefault(stream_id, _StreamState())
+        if stream.running < self.stream_concurrency and not stream.waiting:
+            stream.running += 1
+            self._component_pending[component] = self._component_pending.get(component, 0) + 1
+            return
+
+        if len(stream.waiting) >= self.stream_queue:
+            self._overflow(stream.waiting, f"聊天流排队已满（{self.stream_queue}）")
+
+        waiter = _Waiter(stream_id, component, asyncio.get_running_loop().create_future())
+        stream.waiting.append(waiter)
+        self._component_waiting.setdefault(component, deque()).append(waiter)
+        self._component_pending[component] = self._component_pending.get(component, 0) + 1
+        try:
+            await waiter.future   # _release 交接执行名额；被挤出时抛出 AdmissionRejected
+        except BaseException:
+            if not waiter.future.done() or waiter.future.cancelled():
+                # 等待中被取消：撤出队列
+                self._discard(waiter)
+            elif waiter.future.exception() is None:
+                # 名额已交接但调用方被取消：归还名额
+                self._release(stream_id, component)
+            raise
+
+    def _overflow(self, queue: Optional[Deque[_Waiter]], reason: str) -> None:
+        """队列已满：drop_oldest 挤掉等待最久的请求；否则（或无人可挤）拒绝新请求"""
+        if self.policy == "drop_oldest":
+            while queue:
+                oldest = queue[0]
+                if oldest.future.done():
+                    queue.popleft()
+                    continue
+                self._discard(oldest)
+                self.evicted += 1
+                oldest.future.set_exception(AdmissionRejected(f"{reason}，被更新的请求挤出队列"))
+                return
+        self.rejected += 1
+        raise AdmissionRejected(f"{reason}，丢弃新请求")
+
+    def _discard(self, waiter: _Waiter) -> None:
+        """把等待中的请求移出所在的聊天流与组件队列"""
+        stream = self._streams.get(waiter.stream_id)
+        if stream is not None:
+            try:
+                stream.waiting.remove(waiter)
+            except ValueError:
+                pass
+        comp_waiting = self._component_waiting.get(waiter.component)
+        if comp_waiting is not None:
+            try:
+                comp_waiting.remove(waiter)
+            except ValueError:
+                pass
+        self._decrement_component(waiter.component)
+        if stream is not None:
+            self._gc_stream(waiter.stream_id, stream)
+
+    def _release(self, stream_id: str, component: str) -> None:
+        """执行结束：把名额交给该聊天流中等待最久的请求"""
+        self._decrement_component(component)
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            return
+        while stream.waiting:
+            waiter = stream.waiting.popleft()
+            comp_waiting = self._component_waiting.get(waiter.component)
+            if comp_waiting is not None:
+                try:
+                    comp_waiting.remove(waiter)
+                except ValueError:
+                    pass
+            if not waiter.future.done():
+                waiter.future.set_result(None)   # running 数不变，名额直接交接
+                return
+        stream.running -= 1
+        self._gc_stream(stream_id, stream)
+
+    def _decrement_component(self, component: str) -> None:
+        left = self._component_pending.get(component, 0) - 1
+        if left > 0:
+            self._component_pending[component] = left
+        else:
+            self._component_pending.pop(component, None)
+            self._component_waiting.pop(component, None)
+
+    def _gc_stream(self, stream_id: str, stream: _StreamState) -> None:
+        if stream.running == 0 and not stream.waiting:
+            self._streams.pop(stream_id, None)
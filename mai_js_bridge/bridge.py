@@ -4,28 +4,105 @@ JsBridgeLoader - JS 插件加载器
 负责：
 1. 解析 JS 文件，提取 mai.command() 和 mai.action() 的注册信息
 2. 动态生成对应的 Python BaseAction / BaseCommand 类
-3. 在 execute() 时通过 Node.js 子进程执行 JS 逻辑
+3. 在 execute() 时通过 Node.js 执行 JS 逻辑（常驻进程池或每次新建进程）
 """
 
+import base64
+import copy
 import json
 import re
 import subprocess
 import sys
 import asyncio
+import functools
 import logging
 import os
-import tempfile
+import time
 from pathlib import Path
-from typing import List, Tuple, Type, Dict, Any, Optional
+from typing import FrozenSet, Iterable, List, Tuple, Type, Dict, Any, Optional
+
+try:
+    import tomllib
+except ImportError:   # Python < 3.11：只能使用组件的 plugin_config，不监视 config.toml
+    tomllib = None
+
+from .admission import AdmissionController, AdmissionRejected
+from .host import JsHostManager, get_host_manager
+from .js_context import JsContext
+from .kv_store import get_kv_store
+from .metrics import BridgeMetrics
+from .registration_cache import content_digest, get_registration_cache
+from .result_cache import DEFAULT_MAX_ENTRIES, ResultCache
+from .scheduler import Scheduler
+from .worker_pool import (
+    ROUTING_POLICIES,
+    JsWorker,
+    JsWorkerAborted,
+    JsWorkerPool,
+    JsWorkerError,
+    JsWorkerTimeout,
+    MessageHandler,
+    RpcHandler,
+    _RUNNER_PATH,
+)
 
 logger = logging.getLogger("mai_js_bridge")
 
-# JS SDK 路径
+# JS SDK 路径（运行脚本 _RUNNER_PATH 与其同目录）
 _SDK_PATH = Path(__file__).parent / "sdk" / "mai-sdk.js"
 
+# 执行模式：pool = 常驻工作进程池；shared = 多插件共享的宿主进程；
+# isolated = 预热进程 + 每次执行全新 vm 上下文；spawn = 每次执行启动新进程
+_EXEC_MODES = ("pool", "shared", "isolated", "spawn")
 
+# 检查 plugin.js 是否变化的最小间隔（秒）
+_RELOAD_CHECK_INTERVAL = 1.0
+
+# 未声明 timeout 的组件的执行超时（秒）
+_DEFAULT_TIMEOUT = 30.0
+
+# 命令的注册方式：separate = 每个 JS 命令一个 BaseCommand；
+# combined = 合并为一个分发命令，宿主每条消息只需测试一个正则
+_COMMAND_DISPATCH = ("separate", "combined")
+
+# JS 正则标志 → Python 内联标志（g / y / u / d 对匹配结果没有影响）
+_INLINE_FLAGS = {"i": "i", "m": "m", "s": "s"}
+
+# 合并后分组编号会整体偏移，含反向引用的正则不能合并
+_BACKREF_RE = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]|\(\?P=')
+
+# 注册信息的提取方式：node = 由 Node.js 实际加载插件后导出（失败或未安装 Node.js 时退回正则）；
+# regex = 只在源码上做正则匹配
+_REGISTRATION_PARSERS = ("node", "regex")
+
+# mai-runner.js --describe 的超时（秒）
+_DESCRIBE_TIMEOUT = 15.0
+
+# --describe 的结果：(插件路径, 内容 SHA-256) → 注册信息
+_describe_cache: Dict[Tuple[str, str], Dict[str, List[Dict]]] = {}
+
+# 性能分析：cpu = 单次执行的 V8 CPU profile（.cpuprofile）；heap = 执行后的堆快照（.heapsnapshot）
+_PROFILE_KINDS = ("cpu", "heap")
+
+# 未传 profile 参数时读取的环境变量，如 "cpu"、"heap"、"cpu:roll,render"（只分析列出的组件）
+_PROFILE_ENV = "MAI_JS_PROFILE"
+
+
+def _parse_profile_spec(spec: str) -> Tuple[Optional[str], Optional[FrozenSet[str]]]:
+    """解析 "kind[:组件1,组件2]"，返回 (kind, 组件集合或 None)；kind 无效时抛出 ValueError"""
+    kind, _, names = spec.strip().partition(":")
+    kind = kind.strip().lower()
+    if not kind:
+        return None, None
+    if kind not in _PROFILE_KINDS:
+        raise ValueError(f"未知的性能分析类型：{kind}（可选：{', '.join(_PROFILE_KINDS)}）")
+    components = frozenset(n.strip() for n in names.split(",") if n.strip())
+    return kind, components or None
+
+
+@functools.lru_cache(maxsize=None)
 def _has_node() -> bool:
-    """检查系统是否安装了 Node.js"""
+    """检查系统是否安装了 Node.js（结果缓存，避免每次执行都探测）"""
     try:
         result = subprocess.run(
             ["node", "--version"],
@@ -38,29 +115,15 @@ def _has_node() -> bool:
         return False
 
 
-def _parse_js_registrations(js_content: str) -> Dict[str, List[Dict]]:
+def _parse_reply_calls(js_content: str) -> List[Dict]:
     """
-    解析 JS 文件中所有 mai.reply() / mai.command() / mai.action() 注册信息。
+    解析 mai.reply(pattern, text) / mai.reply(pattern, text, name) 调用。
 
-    支持所有写法：
-      mai.reply('/ping', 'Pong!')                    → auto_reply_0
-      mai.reply('/ping', 'Pong!', 'ping_cmd')        → ping_cmd
-      mai.command(/pattern/, async (ctx) => { ... }) → auto_cmd_0
-      mai.command({ name: 'roll', ... })             → roll
-      mai.command(async (ctx) => { ... })            → auto_cmd_N (catch-all)
-      mai.action({ name: 'greet', ... })             → greet
-
-    返回格式：
-    {
-        "commands": [{"name": ..., "description": ..., "pattern": ...}],
-        "actions": [{"name": ..., "description": ..., "require": [...], ...}]
-    }
+    只有回复文本是纯字符串字面量时标记 _is_simple_reply（由 Python 直接回复）；
+    拼接、模板字符串等需要求值的文本仍在 JS 中执行。
     """
-    registrations = {"commands": [], "actions": []}
-    _auto_cmd_idx = [0]
-    _auto_reply_idx = [0]
-
-    # ── 1. mai.reply(pattern, text) 或 mai.reply(pattern, text, name) ─────────
+    replies = []
+    auto_reply_idx = 0
     for m in re.finditer(
         r'mai\.reply\s*\(\s*'
         r'(["\'/][^,]+?)'          # 第一参数：pattern（字符串/正则）
@@ -74,11 +137,14 @@ def _parse_js_registrations(js_content: str) -> Dict[str, List[Dict]]:
         reply_text  = m.group(2).strip().strip('"\'')
         explicit_name = m.group(4)
 
+        # 加载时确认回复文本是静态字符串字面量：是则由 Python 直接回复，不启动 Node.js
+        static_text = _static_js_string(m.group(2).strip())
+
         if explicit_name:
             name = explicit_name
         else:
-            name = f"auto_reply_{_auto_reply_idx[0]}"
-            _auto_reply_idx[0] += 1
+            name = f"auto_reply_{auto_reply_idx}"
+            auto_reply_idx += 1
 
         # 提取正则
         if pattern_raw.startswith('/'):
@@ -87,13 +153,59 @@ def _parse_js_registrations(js_content: str) -> Dict[str, List[Dict]]:
         else:
             pattern_str = re.escape(pattern_raw.strip('"\''))
 
-        registrations["commands"].append({
+        replies.append({
             "name": name,
             "description": f"固定回复：{reply_text[:30]}",
             "pattern": pattern_str,
-            "_reply_text": reply_text,
-            "_is_simple_reply": True,
+            "_reply_text": static_text if static_text is not None else reply_text,
+            "_is_simple_reply": static_text is not None,
         })
+    return replies
+
+
+def _mark_static_replies(commands: List[Dict], js_content: str) -> None:
+    """
+    Node.js 导出的 mai.reply() 文本是加载时求值的结果。只有源码中同名回复的文本参数是
+    纯字符串字面量、且与导出的文本一致时才标记 _is_simple_reply；否则（'ver=' + process.env.X、
+    模板字符串、循环中注册等）保留在 JS 执行路径上，不把一次求值的结果固定下来。
+    """
+    static = {
+        reply["name"]: reply["_reply_text"]
+        for reply in _parse_reply_calls(js_content)
+        if reply["_is_simple_reply"]
+    }
+    for cmd in commands:
+        if "_reply_text" in cmd and static.get(cmd["name"]) == cmd["_reply_text"]:
+            cmd["_is_simple_reply"] = True
+
+
+def _parse_js_registrations(js_content: str) -> Dict[str, List[Dict]]:
+    """
+    解析 JS 文件中所有 mai.reply() / mai.command() / mai.action() 注册信息。
+
+    支持所有写法：
+      mai.reply('/ping', 'Pong!')                    → auto_reply_0
+      mai.reply('/ping', 'Pong!', 'ping_cmd')        → ping_cmd
+      mai.command(/pattern/, async (ctx) => { ... }) → auto_cmd_0
+      mai.command({ name: 'roll', ... })             → roll
+      mai.command(async (ctx) => { ... })            → auto_cmd_N (catch-all)
+      mai.action({ name: 'greet', ... })             → greet
+      mai.event({ keywords: [...], ... })            → auto_event_0（未命名时）
+      mai.schedule({ every: '10m', ... })            → auto_schedule_0（未命名时）
+
+    返回格式：
+    {
+        "commands": [{"name": ..., "description": ..., "pattern": ...}],
+        "actions": [{"name": ..., "description": ..., "require": [...], ...}],
+        "events": [{"name": ..., "keywords": [...], "regex": ..., "streams": [...], ...}],
+        "schedules": [{"name": ..., "every_ms": ..., "jitter_ms": ..., ...}]
+    }
+    """
+    registrations = {"commands": [], "actions": [], "events": [], "schedules": []}
+    _auto_cmd_idx = [0]
+
+    # ── 1. mai.reply(pattern, text) 或 mai.reply(pattern, text, name) ─────────
+    registrations["commands"].extend(_parse_reply_calls(js_content))
 
     # ── 2. mai.command({ name: ..., ... }) 对象配置写法 ────────────────────────
     for m in re.finditer(
@@ -106,15 +218,28 @@ def _parse_js_registrations(js_content: str) -> Dict[str, List[Dict]]:
         if cmd_info.get("name"):
             registrations["commands"].append(cmd_info)
 
-    # ── 3. mai.command(pattern, fn) 简洁写法（箭头函数） ─────────────────────
+    # ── 3. mai.command(pattern, fn) 简洁写法 / mai.command(fn) catch-all 写法 ──
+    # 两种写法按源码顺序统一编号，与 SDK 中 auto_cmd_N 的命名保持一致
     # 注意：正则字面量内可能含 \/ 转义斜杠，用 (?:[^/\\]|\\.)+ 匹配
     for m in re.finditer(
-        r'mai\.command\s*\(\s*'
+        r'mai\.command\s*\(\s*(?:'
         r'(/(?:[^/\\]|\\.)+/[gimsuy]*'     # /regex/flags  支持内部 \/
         r'|"[^"]+"|\'[^\']+\')'            # 或普通字符串
-        r'\s*,\s*(?:async\s+)?\(',
+        r'\s*,\s*(?:async\s+)?\('
+        r'|(?:async\s+)?\(ctx\))',         # 或 catch-all：mai.command(async (ctx) => ...)
         js_content,
     ):
+        name = f"auto_cmd_{_auto_cmd_idx[0]}"
+        _auto_cmd_idx[0] += 1
+
+        if m.group(1) is None:
+            registrations["commands"].append({
+                "name": name,
+                "description": "catch-all 命令",
+                "pattern": r"^.*$",
+            })
+            continue
+
         pattern_raw = m.group(1).strip()
         if pattern_raw.startswith('/'):
             # 提取最后一个未转义的 / 之前的内容
@@ -123,28 +248,13 @@ def _parse_js_registrations(js_content: str) -> Dict[str, List[Dict]]:
         else:
             pattern_str = pattern_raw.strip('"\'')
 
-        name = f"auto_cmd_{_auto_cmd_idx[0]}"
-        _auto_cmd_idx[0] += 1
         registrations["commands"].append({
             "name": name,
             "description": f"命令：{pattern_str[:40]}",
             "pattern": pattern_str,
         })
 
-    # ── 4. mai.command(fn) catch-all 写法 ─────────────────────────────────────
-    for m in re.finditer(
-        r'mai\.command\s*\(\s*(?:async\s+)?\(ctx\)',
-        js_content,
-    ):
-        name = f"auto_cmd_{_auto_cmd_idx[0]}"
-        _auto_cmd_idx[0] += 1
-        registrations["commands"].append({
-            "name": name,
-            "description": "catch-all 命令",
-            "pattern": r"^.*$",
-        })
-
-    # ── 5. mai.action({ name: ..., ... }) 对象配置写法 ────────────────────────
+    # ── 4. mai.action({ name: ..., ... }) 对象配置写法 ────────────────────────
     for m in re.finditer(
         r'mai\.action\s*\(\s*\{([^}]+(?:\{[^}]*\}[^}]*)*)\}',
         js_content,
@@ -155,6 +265,39 @@ def _parse_js_registrations(js_content: str) -> Dict[str, List[Dict]]:
         if act_info.get("name"):
             registrations["actions"].append(act_info)
 
+    # ── 5. mai.event({ keywords: [...], regex: /.../, ... }) 消息监听 ──────────
+    # 与 SDK 一致：未命名的事件按源码顺序命名为 auto_event_N
+    auto_event_idx = 0
+    for m in re.finditer(
+        r'mai\.event\s*\(\s*\{([^}]+(?:\{[^}]*\}[^}]*)*)\}',
+        js_content,
+        re.DOTALL,
+    ):
+        evt_info = _extract_event_fields(m.group(1))
+        if not evt_info.get("name"):
+            evt_info["name"] = f"auto_event_{auto_event_idx}"
+            auto_event_idx += 1
+        if evt_info.get("keywords") or evt_info.get("regex"):
+            registrations["events"].append(evt_info)
+        else:
+            logger.warning(f"[JsBridge] 事件 {evt_info['name']} 没有可识别的 keywords / regex，已忽略")
+
+    # ── 6. mai.schedule({ every: '10m', ... }) 定时任务 ───────────────────────
+    auto_schedule_idx = 0
+    for m in re.finditer(
+        r'mai\.schedule\s*\(\s*\{([^}]+(?:\{[^}]*\}[^}]*)*)\}',
+        js_content,
+        re.DOTALL,
+    ):
+        sched_info = _extract_schedule_fields(m.group(1))
+        if not sched_info.get("name"):
+            sched_info["name"] = f"auto_schedule_{auto_schedule_idx}"
+            auto_schedule_idx += 1
+        if sched_info.get("every_ms") is not None and sched_info["every_ms"] >= 1000:
+            registrations["schedules"].append(sched_info)
+        else:
+            logger.warning(f"[JsBridge] 定时任务 {sched_info['name']} 没有可识别的 every（至少 1 秒），已忽略")
+
     # 去重（同名组件只保留最后一个）
     seen = {}
     for cmd in registrations["commands"]:
@@ -164,6 +307,427 @@ def _parse_js_registrations(js_content: str) -> Dict[str, List[Dict]]:
     return registrations
 
 
+class _SubMatch:
+    """
+    合并正则中某个分支的匹配结果，group(n) / groups() 的编号与该命令自己的正则一致。
+
+    base 为该分支命名分组的编号，count 为命令自身正则的分组数。
+    合并正则只从开头匹配这一个分支，整体匹配即该命令的匹配（group(0)）。
+    """
+
+    __slots__ = ("_match", "_base", "_count")
+
+    def __init__(self, match: "re.Match", base: int, count: int):
+        self._match = match
+        self._base = base
+        self._count = count
+
+    def group(self, n: int = 0) -> Optional[str]:
+        if not 0 <= n <= self._count:
+            raise IndexError("no such group")
+        return self._match.group(self._base + n if n else 0)
+
+    def groups(self) -> Tuple[Optional[str], ...]:
+        return self._match.groups()[self._base:self._base + self._count]
+
+
+# 正则元字符；前缀扫描遇到它们就停止
+_REGEX_SPECIAL = set(".^$*+?{}[]\\|()")
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """正则在最外层是否含 |（此时不能提取公共前缀）"""
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+            if pattern[i + 1:i + 2] == "]":
+                i += 1   # [] 开头的 ] 是字面量
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+def _literal_prefix(pattern: str) -> Tuple[str, int]:
+    """
+    正则开头的字面量前缀，返回 (前缀字符, 剩余部分在 pattern 中的起点)。
+
+    前缀中 "^" 表示开头锚点（只可能出现在第一位）；只识别普通字符与 \\ 转义的标点，
+    后面跟着量词的字符不算前缀。无法安全提取时返回 ("", 0)。
+    """
+    if _has_top_level_alternation(pattern):
+        return "", 0
+    chars: List[str] = []
+    ends: List[int] = []
+    i = 0
+    if pattern.startswith("^"):
+        chars.append("^")
+        i = 1
+        ends.append(i)
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            chars.append(pattern[i + 1])
+            i += 2
+        elif ch not in _REGEX_SPECIAL:
+            chars.append(ch)
+            i += 1
+        else:
+            break
+        ends.append(i)
+    if chars and chars[-1:] != ["^"] and i < len(pattern) and pattern[i] in "*+?{":
+        chars.pop()   # 量词作用于最后一个字面量
+        ends.pop()
+    return "".join(chars), (ends[-1] if ends else 0)
+
+
+def _emit_prefix_trie(branches: List[Tuple[str, str, str]], depth: int = 0) -> str:
+    """
+    把 (分支名, 字面量前缀, 分支正则剩余部分) 列表生成为前缀树形式的交替式。
+
+    只合并相邻且下一个前缀字符相同的分支：(?:xA|xB) 与 x(?:A|B) 的尝试顺序完全一致，
+    因此匹配结果与按注册顺序逐个测试相同。
+    """
+    parts: List[str] = []
+    i = 0
+    while i < len(branches):
+        name, prefix, rest = branches[i]
+        if depth >= len(prefix):
+            parts.append(f"(?P<{name}>{rest})")
+            i += 1
+            continue
+        key = prefix[depth]
+        j = i + 1
+        while j < len(branches) and depth < len(branches[j][1]) and branches[j][1][depth] == key:
+            j += 1
+        token = "^" if key == "^" and depth == 0 else re.escape(key)
+        if j - i == 1:
+            tail = "".join("^" if c == "^" and d == 0 else re.escape(c) for d, c in enumerate(prefix) if d > depth)
+            parts.append(f"{token}(?P<{name}>{tail}{rest})")
+        else:
+            parts.append(f"{token}(?:{_emit_prefix_trie(branches[i:j], depth + 1)})")
+        i = j
+    return "|".join(parts)
+
+
+def _inline_flags(flags: str) -> str:
+    """JS 正则标志中 Python 同样支持的部分（i / m / s），按字母排序"""
+    return "".join(sorted({_INLINE_FLAGS[f] for f in flags if f in _INLINE_FLAGS}))
+
+
+def _command_pattern(info: Dict) -> str:
+    """命令注册到宿主的正则：带标志时整体包在 (?i:...) 中，与合并分发中该命令的分支一致"""
+    pattern = info.get("pattern", "^$")
+    flags = _inline_flags(info.get("pattern_flags", ""))
+    return f"(?{flags}:{pattern})" if flags else pattern
+
+
+def _combine_command_patterns(
+    cmd_infos: List[Dict],
+) -> Tuple[Optional[str], Dict[str, Tuple[Dict, int, int]], List[Dict]]:
+    """
+    把多个命令的正则合并为一个正则：每个命令是一个命名分支 (?P<_jsN>...)，
+    开头的字面量前缀（如 ^/ 、^/weather）按前缀树提取公共部分，宿主只需测试一次。
+
+    返回 (合并后的正则, {分支名: (命令信息, 分支分组编号, 命令自身分组数)}, 无法合并的命令)。
+    按 match 语义从左到右尝试，与逐个测试时"先注册的命令优先"一致。
+    含命名分组、反向引用或无法编译的正则原样留给单独注册。
+    """
+    branches: List[Tuple[str, str, str]] = []
+    members: List[Tuple[str, Dict, int]] = []
+    leftovers: List[Dict] = []
+    for info in cmd_infos:
+        pattern = info.get("pattern", "^$")
+        try:
+            compiled = re.compile(pattern)
+        except re.error:
+            leftovers.append(info)
+            continue
+        if compiled.groupindex or _BACKREF_RE.search(pattern):
+            leftovers.append(info)
+            continue
+        flags = _inline_flags(info.get("pattern_flags", ""))
+        if flags:
+            # 带标志的正则（如忽略大小写）整体包在 (?i:...) 中，不提取前缀
+            prefix, rest = "", f"(?{flags}:{pattern})"
+        else:
+            prefix, start = _literal_prefix(pattern)
+            rest = f"(?:{pattern[start:]})"
+        branch = f"_js{len(members)}"
+        branches.append((branch, prefix, rest))
+        members.append((branch, info, compiled.groups))
+
+    if not members:
+        return None, {}, leftovers
+    combined = _emit_prefix_trie(branches)
+    groupindex = re.compile(combined).groupindex
+    index = {branch: (info, groupindex[branch], count) for branch, info, count in members}
+    return combined, index, leftovers
+
+
+def _keyword_trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    把关键词编译为前缀树形式的正则（如 早安、早上好 → 早(?:上好|安)）。
+
+    re 在消息的每个位置只需沿树比较一次，而不是逐个尝试所有关键词。
+    """
+    root: Dict[str, Dict] = {}
+    for word in keywords:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}   # 词尾
+
+    def emit(node: Dict) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(root)
+
+
+class _EventFilter:
+    """
+    mai.event() 的 Python 侧预过滤：聊天流、关键词（不区分大小写）、正则。
+
+    关键词合并为一个前缀树正则，每条消息只扫描一遍；只有命中时才进入 Node.js。
+    """
+
+    __slots__ = ("streams", "keywords", "regex")
+
+    def __init__(self, info: Dict):
+        """由注册信息构建；正则无法在 Python 中编译时抛出 re.error"""
+        streams = info.get("streams")
+        self.streams: Optional[FrozenSet[str]] = frozenset(map(str, streams)) if streams else None
+        words = {str(k).lower() for k in info.get("keywords") or [] if k}
+        self.keywords = re.compile(_keyword_trie_pattern(words), re.IGNORECASE) if words else None
+        self.regex = None
+        if info.get("regex"):
+            inline = "".join(_INLINE_FLAGS[f] for f in info.get("regex_flags", "") if f in _INLINE_FLAGS)
+            self.regex = re.compile(f"(?{inline}){info['regex']}" if inline else info["regex"])
+
+    def match(self, stream_id: Optional[str], text: str) -> Optional[Tuple[Optional[str], Optional["re.Match"]]]:
+        """未命中时返回 None；命中时返回 (命中的关键词, 正则的匹配结果)"""
+        if self.streams is not None and stream_id not in self.streams:
+            return None
+        keyword = None
+        if self.keywords is not None:
+            found = self.keywords.search(text)
+            keyword = found.group(0) if found else None
+        matched = self.regex.search(text) if self.regex is not None else None
+        if keyword is None and matched is None:
+            return None
+        return keyword, matched
+
+
+def _describe_js_registrations(js_file: str, js_content: str) -> Optional[Dict[str, List[Dict]]]:
+    """
+    由 Node.js 加载插件（mai-runner.js --describe），导出真实的注册信息。
+
+    与 _parse_js_registrations 返回相同的格式，但不受嵌套对象、模板字符串、注释、
+    打包产物等写法影响。结果按文件内容的哈希缓存，内容不变时不再启动 Node.js。
+    插件加载失败、超时或输出无法解析时返回 None（由调用方退回正则解析）。
+    """
+    key = (js_file, content_digest(js_content))
+    cached = _describe_cache.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    try:
+        result = subprocess.run(
+            ["node", str(_RUNNER_PATH), js_file, "--describe"],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=_DESCRIBE_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"[JsBridge] 无法由 Node.js 导出注册信息：{e}")
+        return None
+    return _read_describe_output(key, js_content, result.stdout, result.stderr, result.returncode)
+
+
+async def _describe_js_registrations_async(js_file: str, js_content: str) -> Optional[Dict[str, List[Dict]]]:
+    """
+    _describe_js_registrations 的异步版本，供事件循环中的热重载使用。
+
+    Node.js 以异步子进程运行，插件顶层代码再慢也不会阻塞事件循环。
+    """
+    key = (js_file, content_digest(js_content))
+    cached = _describe_cache.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "node", str(_RUNNER_PATH), js_file, "--describe",
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except OSError as e:
+        logger.warning(f"[JsBridge] 无法由 Node.js 导出注册信息：{e}")
+        return None
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), _DESCRIBE_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"[JsBridge] 无法由 Node.js 导出注册信息：超时（{_DESCRIBE_TIMEOUT}s）")
+        return None
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    return _read_describe_output(key, js_content, stdout, stderr, proc.returncode)
+
+
+def _read_describe_output(
+    key: Tuple[str, str], js_content: str, stdout: bytes, stderr: bytes, returncode: Optional[int],
+) -> Optional[Dict[str, List[Dict]]]:
+    """解析 --describe 的输出并写入 _describe_cache；插件加载失败或没有 describe 帧时返回 None"""
+    for line in stdout.decode("utf-8", errors="replace").splitlines():
+        try:
+            frame = json.loads(line)
+        except ValueError:
+            continue
+        if frame.get("type") == "fatal":
+            logger.warning(f"[JsBridge] 插件加载失败，无法导出注册信息：{frame.get('error')}")
+            return None
+        if frame.get("type") == "describe":
+            registrations = frame.get("registrations") or {}
+            registrations.setdefault("commands", [])
+            registrations.setdefault("actions", [])
+            for kind in ("events", "schedules"):
+                registrations.setdefault(kind, [])
+            _mark_static_replies(registrations["commands"], js_content)
+            for comp in registrations["commands"] + registrations["actions"] + registrations["events"]:
+                if comp.get("cache") and comp["cache"].get("max_entries") is None:
+                    comp["cache"]["max_entries"] = DEFAULT_MAX_ENTRIES
+            _describe_cache[key] = registrations
+            return copy.deepcopy(registrations)
+
+    message = stderr.decode("utf-8", errors="replace").strip()
+    logger.warning(f"[JsBridge] Node.js 未输出注册信息（退出码 {returncode}）：{message[-500:]}")
+    return None
+
+
+# JS 字符串转义序列
+_JS_ESCAPE_RE = re.compile(r'\\(u\{[0-9a-fA-F]+\}|u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|\r\n|[\s\S])')
+_JS_SIMPLE_ESCAPES = {
+    "n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0",
+    "\n": "", "\r\n": "", "\u2028": "", "\u2029": "",
+}
+
+
+def _static_js_string(literal: str) -> Optional[str]:
+    """
+    把 JS 字符串字面量（'...' 或 "..."）解码为 Python 字符串。
+
+    只接受首尾引号一致、内部没有未转义同种引号的纯字面量；
+    无法确认是静态文本时返回 None。
+    """
+    if len(literal) < 2 or literal[0] not in "'\"" or literal[-1] != literal[0]:
+        return None
+    quote, body = literal[0], literal[1:-1]
+    # 内部出现未转义的同种引号，或以奇数个反斜杠结尾，说明正则截取的并不是完整字面量
+    if re.search(r'(?<!\\)(?:\\\\)*' + quote, body):
+        return None
+    if (len(body) - len(body.rstrip("\\"))) % 2:
+        return None
+
+    def _unescape(m: "re.Match") -> str:
+        esc = m.group(1)
+        if esc.startswith("u{"):
+            return chr(int(esc[2:-1], 16))
+        if esc[0] in "ux" and len(esc) > 1:
+            return chr(int(esc[1:], 16))
+        return _JS_SIMPLE_ESCAPES.get(esc, esc)
+
+    try:
+        return _JS_ESCAPE_RE.sub(_unescape, body)
+    except (ValueError, OverflowError):
+        return None
+
+
+# 数组中的 JS 字符串字面量
+_JS_STRING_LITERAL_RE = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'')
+
+
+def _js_string_list(text: str) -> List[str]:
+    """数组（或单个字符串）字面量中的所有静态字符串"""
+    items = (_static_js_string(lit) for lit in _JS_STRING_LITERAL_RE.findall(text))
+    return [item for item in items if item is not None]
+
+
+def _extract_event_fields(block: str) -> Dict[str, Any]:
+    """从 mai.event() 的对象字面量文本中提取 keywords / regex / streams / intercept 等字段"""
+    fields = _extract_object_fields(block)
+    fields.pop("pattern", None)
+    fields.pop("pattern_flags", None)
+
+    for key in ("keywords", "streams"):
+        m = re.search(rf'\b{key}\s*:\s*(\[[^\]]*\]|"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')', block)
+        if m:
+            fields[key] = _js_string_list(m.group(1))
+
+    regex_m = re.search(r'\bregex\s*:\s*/((?:[^/\\\n]|\\.)+)/([gimsuy]*)', block)
+    if regex_m:
+        fields["regex"] = regex_m.group(1)
+        fields["regex_flags"] = regex_m.group(2)
+    else:
+        regex_m = re.search(r'\bregex\s*:\s*("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')', block)
+        source = _static_js_string(regex_m.group(1)) if regex_m else None
+        if source:
+            fields["regex"] = source
+
+    if re.search(r'\bintercept\s*:\s*true\b', block):
+        fields["intercept"] = True
+    fields.setdefault("keywords", [])
+    return fields
+
+
+_DURATION_UNITS = {"ms": 1, "s": 1000, "m": 60000, "h": 3600000, "d": 86400000}
+
+
+def _duration_ms(literal: str) -> Optional[float]:
+    """时长字面量（毫秒数，或 '500ms' / '30s' / '10m' / '1h' / '1d'）→ 毫秒；无法识别时返回 None"""
+    text = _static_js_string(literal) if literal[:1] in "'\"" else literal
+    m = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h|d)?\s*', text or "")
+    return float(m.group(1)) * _DURATION_UNITS[m.group(2) or "ms"] if m else None
+
+
+def _extract_schedule_fields(block: str) -> Dict[str, Any]:
+    """从 mai.schedule() 的对象字面量文本中提取 every / jitter / immediate / workers 等字段"""
+    fields = _extract_object_fields(block)
+    for key in ("pattern", "pattern_flags", "cache"):
+        fields.pop(key, None)
+
+    for key in ("every", "jitter"):
+        m = re.search(rf'\b{key}\s*:\s*(\d+(?:\.\d+)?|"[^"\n]*"|\'[^\'\n]*\')', block)
+        fields[f"{key}_ms"] = _duration_ms(m.group(1)) if m else None
+    if fields["jitter_ms"] is None:
+        fields["jitter_ms"] = 0.0
+
+    if re.search(r'\bimmediate\s*:\s*false\b', block):
+        fields["immediate"] = False
+    if re.search(r'\bworkers\s*:\s*["\']one["\']', block):
+        fields["workers"] = "one"
+    return fields
+
+
 def _extract_object_fields(block: str) -> Dict[str, Any]:
     """从 JS 对象字面量文本中提取关键字段"""
     fields = {}
@@ -200,96 +764,98 @@ def _extract_object_fields(block: str) -> Dict[str, Any]:
         items = re.findall(r'["\']([^"\']+)["\']', types_m.group(1))
         fields["types"] = items
 
+    # 资源限制：timeout 单位为毫秒（与 JS 习惯一致），maxMemoryMb 单位为 MB
+    timeout_m = re.search(r'\btimeout\s*:\s*(\d+(?:\.\d+)?)', block)
+    if timeout_m:
+        fields["timeout_ms"] = float(timeout_m.group(1))
+
+    mem_m = re.search(r'\bmaxMemoryMb\s*:\s*(\d+)', block)
+    if mem_m:
+        fields["max_memory_mb"] = int(mem_m.group(1))
+
+    # 结果缓存：cache: { ttl: 毫秒, maxEntries: 条数 } 或 cache: true
+    # （对象配置的截取在第一个 } 处可能提前结束，因此不要求 cache 对象的右花括号）
+    cache_m = re.search(r'\bcache\s*:\s*(?:\{([^}]*)|true\b)', block)
+    if cache_m:
+        cache_block = cache_m.group(1) or ""
+        ttl_m = re.search(r'\bttl\s*:\s*(\d+(?:\.\d+)?)', cache_block)
+        max_m = re.search(r'\bmaxEntries\s*:\s*(\d+)', cache_block)
+        fields["cache"] = {
+            "ttl_ms": float(ttl_m.group(1)) if ttl_m else None,
+            "max_entries": int(max_m.group(1)) if max_m else DEFAULT_MAX_ENTRIES,
+        }
+
     return fields
 
 
-def _run_js_execute(js_file: str, component_name: str, context_data: Dict) -> Dict:
+async def _run_js_execute_async(
+    js_file: str,
+    component_name: str,
+    context_data: Dict,
+    timeout: float = _DEFAULT_TIMEOUT,
+    on_message: Optional[MessageHandler] = None,
+    on_rpc: Optional[RpcHandler] = None,
+    node_args: Tuple[str, ...] = (),
+    blob_dir: Optional[str] = None,
+    profile: Optional[str] = None,
+    config: Optional[Tuple[int, str]] = None,
+) -> Dict:
     """
-    通过 Node.js 子进程执行 JS 插件的 execute 方法。
+    spawn 模式的执行：启动一个只处理单次请求的 JsWorker，
+    非阻塞地读写管道，执行期间不占用任何线程。结果附带 spawn_ms（进程启动耗时）。
 
-    Args:
-        js_file: JS 文件路径
-        component_name: 要执行的组件名称
-        context_data: 上下文数据（stream_id, action_data, matched_groups 等）
+    传入 on_message 时，JS 侧产生的每条消息会立即回调，而不是等执行结束；
+    传入 on_rpc 时，JS 侧的 ctx.call() 由它处理。
 
-    Returns:
-        执行结果字典（{success, log, messages}）
+    超时时抛出 JsWorkerTimeout；进程崩溃（包括超出 --max-old-space-size）时抛出 JsWorkerError。
     """
-    if not _has_node():
-        logger.error("[JsBridge] Node.js 未安装，无法执行 JS 插件")
-        return {"success": False, "log": "Node.js 未安装", "messages": []}
-
-    runner_script = f"""
-const path = require('path');
-const fs = require('fs');
-
-// 加载 SDK
-const sdkPath = {json.dumps(str(_SDK_PATH))};
-const sdk = require(sdkPath);
-
-// 上下文数据
-const contextData = {json.dumps(context_data)};
-
-// 创建 mai 全局对象（注册器）
-const registrations = sdk.createRegistrar();
-global.mai = registrations.mai;
-
-// 加载插件文件
-const pluginPath = {json.dumps(js_file)};
-require(pluginPath);
-
-// 执行指定组件
-const componentName = {json.dumps(component_name)};
-sdk.executeComponent(registrations, componentName, contextData)
-  .then(result => {{
-    process.stdout.write(JSON.stringify(result));
-    process.exit(0);
-  }})
-  .catch(err => {{
-    process.stdout.write(JSON.stringify({{
-      success: false,
-      log: String(err),
-      messages: []
-    }}));
-    process.exit(1);
-  }});
-"""
-
+    worker = JsWorker(js_file, context_data.get("plugin_name", ""), node_args=node_args, blob_dir=blob_dir)
     try:
-        with tempfile.NamedTemporaryFile(
-            mode="w",
-            suffix=".js",
-            delete=False,
-            encoding="utf-8",
-        ) as tf:
-            tf.write(runner_script)
-            runner_path = tf.name
-
-        result = subprocess.run(
-            ["node", runner_path],
-            capture_output=True,
-            text=True,
-            timeout=30,
-            encoding="utf-8",
+        await worker.start()
+        result = await worker.execute(
+            component_name, context_data, timeout, on_message, on_rpc, profile=profile, config=config,
         )
+        result["spawn_ms"] = worker.start_ms
+        return result
+    except JsWorkerError:
+        raise
+    except Exception as e:
+        logger.error(f"[JsBridge] 执行 JS 时出错：{e}")
+        return {"success": False, "log": str(e), "messages": []}
+    finally:
+        await worker.close()
 
-        os.unlink(runner_path)
 
-        if result.returncode != 0:
-            logger.error(f"[JsBridge] Node.js 执行失败：{result.stderr}")
-            return {"success": False, "log": result.stderr, "messages": []}
+def _blob_to_base64(content, encoding: Optional[str]) -> str:
+    """
+    二进制帧载荷 → send_api 需要的 base64 字符串。
 
-        output = result.stdout.strip()
-        if output:
-            return json.loads(output)
-        return {"success": True, "log": "", "messages": []}
+    encoding="base64" 时载荷本身就是 base64 文本，只做一次 ASCII 解码；
+    "binary" 时是原始字节（JS 侧传入 Buffer），在这里编码一次。
+    """
+    if encoding == "binary":
+        return base64.b64encode(content).decode("ascii")
+    return bytes(content).decode("ascii")
 
-    except subprocess.TimeoutExpired:
-        logger.error("[JsBridge] JS 执行超时（30s）")
-        return {"success": False, "log": "执行超时", "messages": []}
-    except Exception as e:
-        logger.error(f"[JsBridge] 执行 JS 时出错：{e}")
-        return {"success": False, "log": str(e), "messages": []}
+
+async def _send_message(send_api, msg: Dict, stream_id: str) -> None:
+    """把 JS 侧产生的一条消息转发到聊天流"""
+    msg_type = msg.get("type", "text")
+    content = msg.get("content", "")
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        content = _blob_to_base64(content, msg.get("encoding"))
+    if msg_type == "text" and content:
+        await send_api.text_to_stream(content, stream_id)
+    elif msg_type == "image" and content:
+        await send_api.image_to_stream(content, stream_id)
+    elif msg_type == "emoji" and content:
+        await send_api.emoji_to_stream(content, stream_id)
+
+
+async def _send_messages(send_api, messages: List[Dict], stream_id: str) -> None:
+    """按顺序把 JS 侧产生的消息转发到聊天流"""
+    for msg in messages:
+        await _send_message(send_api, msg, stream_id)
 
 
 class JsBridgeLoader:
@@ -298,6 +864,69 @@ class JsBridgeLoader:
 
     解析 JS 文件，生成 Python 组件类，这些类在执行时会通过 Node.js 运行 JS 代码。
 
+    执行模式（exec_mode）：
+        "pool"     - 默认。常驻工作进程池，SDK 与插件只加载一次，
+                     JS 全局变量在同一工作进程内跨调用保留
+        "shared"   - 注册到进程内唯一的 JsHostManager，与其他 shared 插件共用
+                     固定数量的 Node.js 进程，每个插件在自己的 vm 上下文中常驻；
+                     受全局与本插件两级并发限制（pool_size 不生效）
+        "isolated" - 常驻的预热进程只编译一次插件，每次执行在全新的 vm 上下文中
+                     运行插件，调用之间不共享状态（适合不可信的社区脚本）
+        "spawn"    - 每次执行启动一个新的 Node.js 进程（完全无状态）
+
+    各模式都基于 asyncio 子进程，执行期间不占用线程；
+    同一插件同时进行中的 JS 执行数受 max_concurrency 限制，超出的请求排队等待。
+
+    路由（routing，pool / isolated 模式）：
+        "sticky"       - 默认。同一 stream_id 的调用按一致性哈希固定到同一工作进程，
+                         聊天内的内存缓存保持热，消息顺序也得以保持；
+                         该进程积压时转给最空闲的进程（计入 stats() 的 steals）
+        "least_loaded" - 总是选最空闲的工作进程
+
+    图片 / 表情包：
+        载荷不经过 JSON，以原始字节跟在消息帧头之后传输（JS 侧可直接传 Buffer）；
+        指定 blob_dir（建议 tmpfs，如 /dev/shm）时，≥1MB 的载荷经由该目录下的文件中转。
+        shared 模式使用共享宿主的 blob_dir。
+
+    资源限制：
+        组件可在配置对象中声明 timeout（毫秒）与 maxMemoryMb。超时的执行由看门狗结束
+        整个工作进程；执行后堆占用超出 maxMemoryMb 的工作进程会被淘汰替换。
+        工作进程以 --max-old-space-size 启动（取 max_memory_mb 参数，未指定时取各组件
+        声明的最大值），失控的内存分配会让进程崩溃而不是无限膨胀。
+        被结束的执行计入 stats()。
+
+    准入控制（overflow 为 None 时关闭）：
+        每个聊天流同时最多执行 stream_concurrency 个请求，其余排队（最多 stream_queue 个）；
+        每个组件排队 + 执行中的请求合计不超过 component_queue。超出时按 overflow 策略
+        drop_newest / drop_oldest / coalesce 处理，未执行的请求返回 (False, 原因, ...)。
+
+    预热：
+        首次执行需要启动 Node.js 并加载 SDK 与插件。prewarm=True 时 get_components()
+        在后台预先启动工作进程（需要在事件循环中调用），也可以显式 await loader.warm()。
+
+    命令注册（command_dispatch）：
+        "separate" - 默认。每个 JS 命令注册为一个 BaseCommand
+        "combined" - 所有命令合并为一个分发命令（正则为各命令正则的命名分支交替式），
+                     宿主每条消息只测试一个正则，由命中的分支名直接找到组件；
+                     含命名分组或反向引用的正则仍单独注册
+
+    插件配置：
+        ctx.config() 读取的配置在配置版本变化时才序列化一次，随后推送给每个工作进程缓存，
+        执行帧只携带版本号。配置来自插件目录下的 config.toml（config_file 可指定其他路径，
+        修改后在下一次执行时推送新版本）；文件不存在时使用组件的 plugin_config。
+
+    注册信息（registration_parser）：
+        "node"  - 默认。由 Node.js 实际加载一次插件并导出注册信息（按内容哈希缓存），
+                  准确处理嵌套对象、模板字符串、注释与打包产物；加载失败或未安装 Node.js
+                  时退回正则解析
+        "regex" - 只在源码上做正则匹配，不执行插件代码
+
+    性能分析：
+        profile="cpu" 时每次执行单独采集 V8 CPU profile，"heap" 时在执行后写出堆快照，
+        文件写在 plugin.js 旁边，可用 `mai profile` 汇总。profile_components 限定只分析
+        哪些组件。未传 profile 时读取环境变量 MAI_JS_PROFILE（如 "cpu:roll,render"）。
+        每次执行都会写出一个文件，只在排查问题时开启。
+
     使用示例（在 plugin.py 中）：
         from mai_js_bridge import JsBridgeLoader
         loader = JsBridgeLoader(
@@ -305,15 +934,107 @@ class JsBridgeLoader:
             plugin_name="my_plugin"
         )
 
+        # 插件卸载时关闭工作进程
+        await loader.close()
+
         # 或使用别名：
         from mai_js_bridge import JsBridgePlugin
         plugin = JsBridgePlugin(js_file=..., plugin_name=...)
     """
 
-    def __init__(self, js_file: str, plugin_name: str = "js_plugin"):
+    def __init__(
+        self,
+        js_file: str,
+        plugin_name: str = "js_plugin",
+        exec_mode: str = "pool",
+        pool_size: int = 2,
+        max_concurrency: int = 32,
+        max_memory_mb: Optional[int] = None,
+        routing: str = "sticky",
+        blob_dir: Optional[str] = None,
+        prewarm: bool = False,
+        overflow: Optional[str] = "drop_newest",
+        stream_concurrency: int = 4,
+        stream_queue: int = 16,
+        component_queue: int = 64,
+        profile: Optional[str] = None,
+        profile_components: Optional[Iterable[str]] = None,
+        registration_parser: str = "node",
+        command_dispatch: str = "separate",
+        config_file: Optional[str] = None,
+    ):
+        if exec_mode not in _EXEC_MODES:
+            raise ValueError(f"未知的执行模式：{exec_mode}（可选：{', '.join(_EXEC_MODES)}）")
+        if routing not in ROUTING_POLICIES:
+            raise ValueError(f"未知的路由策略：{routing}（可选：{', '.join(ROUTING_POLICIES)}）")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency 至少为 1")
+        if max_memory_mb is not None and max_memory_mb < 16:
+            raise ValueError("max_memory_mb 至少为 16")
+        if command_dispatch not in _COMMAND_DISPATCH:
+            raise ValueError(f"未知的命令注册方式：{command_dispatch}（可选：{', '.join(_COMMAND_DISPATCH)}）")
+        if registration_parser not in _REGISTRATION_PARSERS:
+            raise ValueError(
+                f"未知的注册信息解析方式：{registration_parser}（可选：{', '.join(_REGISTRATION_PARSERS)}）"
+            )
+        if profile is not None and profile not in _PROFILE_KINDS:
+            raise ValueError(f"未知的性能分析类型：{profile}（可选：{', '.join(_PROFILE_KINDS)}）")
         self.js_file = str(Path(js_file).resolve())
         self.plugin_name = plugin_name
+        self.exec_mode = exec_mode
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        self.max_memory_mb = max_memory_mb
+        self.routing = routing
+        self.blob_dir = blob_dir
+        self.prewarm = prewarm
+        self.registration_parser = registration_parser
+        self.command_dispatch = command_dispatch
+        self.config_file = str(Path(config_file).resolve()) if config_file else str(Path(self.js_file).parent / "config.toml")
+        self._config_version = 0
+        self._config_json: Optional[str] = None
+        self._config_stamp: Optional[Tuple[int, int]] = None
+        self._config_source: Optional[Dict] = None      # 组件的 plugin_config（没有 config.toml 时使用）
+        self._last_config_check = 0.0
+        self.profile = profile
+        self.profile_components: Optional[FrozenSet[str]] = (
+            frozenset(profile_components) if profile_components is not None else None
+        )
+        if profile is None and os.environ.get(_PROFILE_ENV):
+            try:
+                self.profile, self.profile_components = _parse_profile_spec(os.environ[_PROFILE_ENV])
+            except ValueError as e:
+                logger.warning(f"[JsBridge] 忽略环境变量 {_PROFILE_ENV}：{e}")
+        self._warm_task: Optional[asyncio.Task] = None
+        self._scheduler: Optional[Scheduler] = None
+        self._admission: Optional[AdmissionController] = None
+        if overflow is not None:
+            self._admission = AdmissionController(overflow, stream_concurrency, stream_queue, component_queue)
+        self._stats = {
+            "executions": 0, "failures": 0, "timeouts": 0, "crashes": 0, "aborted": 0, "memory_exceeded": 0,
+            "events_filtered": 0,
+        }
+        self._caches: Dict[str, ResultCache] = {}
+        self._metrics = BridgeMetrics()
+        self._fetch_stats = {"requests": 0, "cached": 0, "coalesced": 0, "reused": 0, "errors": 0}
         self._registrations: Optional[Dict] = None
+        self._registrations_stamp: Optional[Tuple[int, int]] = None
+        self._last_reload_check = 0.0
+        self.registrations_version = 0
+        self._pool: Optional[JsWorkerPool] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._host: Optional[JsHostManager] = None
+        if exec_mode == "shared":
+            self._host = get_host_manager()
+            self._host.register(self.js_file, plugin_name)
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        """plugin.js 的 (mtime_ns, size)，文件不存在时为 None"""
+        try:
+            st = os.stat(self.js_file)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
 
     def _load_registrations(self) -> Dict:
         """加载并解析 JS 文件中的注册信息"""
@@ -323,20 +1044,213 @@ class JsBridgeLoader:
         js_path = Path(self.js_file)
         if not js_path.exists():
             logger.error(f"[JsBridge] JS 文件不存在：{self.js_file}")
-            return {"commands": [], "actions": []}
+            return {"commands": [], "actions": [], "events": [], "schedules": []}
 
         try:
-            js_content = js_path.read_text(encoding="utf-8")
-            self._registrations = _parse_js_registrations(js_content)
-            logger.info(
-                f"[JsBridge] 解析 {js_path.name}："
-                f"{len(self._registrations['commands'])} 个命令，"
-                f"{len(self._registrations['actions'])} 个 Action"
-            )
-            return self._registrations
+            stamp = self._file_stamp()
+            self._registrations_stamp = stamp
+            registrations, js_content, digest = self._cached_registrations(stamp)
+            parsed_by = "缓存"
+            if registrations is None:
+                registrations, parser = self._extract_registrations(js_content)
+                parsed_by = self._store_registrations(stamp, digest, registrations, parser)
+            return self._use_registrations(registrations, parsed_by)
         except Exception as e:
             logger.error(f"[JsBridge] 解析 JS 文件失败：{e}")
-            return {"commands": [], "actions": []}
+            return {"commands": [], "actions": [], "events": [], "schedules": []}
+
+    async def _reload_registrations(self) -> Optional[Dict]:
+        """
+        热重载时重新解析注册信息，失败时返回 None（保留当前的注册信息）。
+
+        与 _load_registrations 相同，但 Node.js 导出以异步子进程运行，不阻塞事件循环；
+        解析完成前其他执行继续使用旧的注册信息。
+        """
+        try:
+            stamp = self._file_stamp()
+            self._registrations_stamp = stamp
+            registrations, js_content, digest = self._cached_registrations(stamp)
+            parsed_by = "缓存"
+            if registrations is None:
+                registrations, parser = await self._extract_registrations_async(js_content)
+                parsed_by = self._store_registrations(stamp, digest, registrations, parser)
+            return self._use_registrations(registrations, parsed_by)
+        except Exception as e:
+            logger.error(f"[JsBridge] 解析 JS 文件失败：{e}")
+            return None
+
+    def _cached_registrations(self, stamp) -> Tuple[Optional[Dict], Optional[str], Optional[str]]:
+        """
+        查磁盘缓存，返回 (注册信息或 None, 文件内容, 内容哈希)。
+
+        stat 未变时不读取文件（内容与哈希为 None）；stat 变了再按内容哈希确认。
+        """
+        cache = get_registration_cache()
+        registrations = cache.get(self.js_file, stamp, self.registration_parser)
+        if registrations is not None:
+            return registrations, None, None
+        js_content = Path(self.js_file).read_text(encoding="utf-8")
+        digest = content_digest(js_content)
+        return cache.get(self.js_file, stamp, self.registration_parser, digest), js_content, digest
+
+    def _store_registrations(self, stamp, digest: str, registrations: Dict, parser: str) -> str:
+        """写入磁盘缓存，返回日志中的解析方式"""
+        # 以请求的方式为键：退回正则解析的结果同样命中，不必每次启动都重新尝试 Node.js
+        get_registration_cache().put(self.js_file, stamp, digest, self.registration_parser, registrations)
+        return "Node.js" if parser == "node" else "正则"
+
+    def _use_registrations(self, registrations: Dict, parsed_by: str) -> Dict:
+        self._registrations = registrations
+        self.registrations_version += 1
+        logger.info(
+            f"[JsBridge] 解析 {Path(self.js_file).name}（{parsed_by}）："
+            f"{len(registrations['commands'])} 个命令，"
+            f"{len(registrations['actions'])} 个 Action"
+            + (f"，{len(registrations['events'])} 个事件" if registrations.get("events") else "")
+            + (f"，{len(registrations['schedules'])} 个定时任务" if registrations.get("schedules") else "")
+        )
+        return registrations
+
+    def _extract_registrations(self, js_content: str) -> Tuple[Dict, str]:
+        """按 registration_parser 提取注册信息，返回 (注册信息, 实际使用的方式)"""
+        if self.registration_parser == "node" and _has_node():
+            registrations = _describe_js_registrations(self.js_file, js_content)
+            if registrations is not None:
+                return registrations, "node"
+        return _parse_js_registrations(js_content), "regex"
+
+    async def _extract_registrations_async(self, js_content: str) -> Tuple[Dict, str]:
+        """_extract_registrations 的异步版本（热重载使用）"""
+        if self.registration_parser == "node" and _has_node():
+            registrations = await _describe_js_registrations_async(self.js_file, js_content)
+            if registrations is not None:
+                return registrations, "node"
+        return _parse_js_registrations(js_content), "regex"
+
+    async def _check_reload(self) -> None:
+        """
+        节流地检查 plugin.js 是否变化，变化时重新解析注册信息。
+
+        工作进程会自行热重载 JS 代码；这里只更新 Python 侧的注册表
+        （例如 mai.reply() 的固定文本）。新增的组件需要重启 MaiBot 才能注册到宿主。
+        """
+        now = time.monotonic()
+        if self._registrations is None or now - self._last_reload_check < _RELOAD_CHECK_INTERVAL:
+            return
+        self._last_reload_check = now
+        if self._file_stamp() == self._registrations_stamp:
+            return
+
+        old_names = self._component_names(self._registrations)
+        # 代码变了，缓存的输出可能已过时
+        for cache in self._caches.values():
+            cache.clear()
+        registrations = await self._reload_registrations()
+        if registrations is None:
+            return
+        # 解析期间写入的结果可能来自旧版本
+        for cache in self._caches.values():
+            cache.clear()
+        added = sorted(self._component_names(registrations) - old_names)
+        if added:
+            logger.warning(f"[JsBridge] {self.plugin_name} 新增组件需重启 MaiBot 才能生效：{', '.join(added)}")
+
+    @staticmethod
+    def _component_names(regs: Dict) -> set:
+        return {c.get("name") for kind in ("commands", "actions", "events", "schedules") for c in regs.get(kind, [])}
+
+    async def _current_reply_text(self, name: str, default: str) -> str:
+        """mai.reply() 组件当前版本的固定文本（热重载后可能已变化）"""
+        await self._check_reload()
+        for cmd in (self._registrations or {}).get("commands", []):
+            if cmd.get("name") == name and cmd.get("_is_simple_reply"):
+                return cmd.get("_reply_text", default)
+        return default
+
+    def _limits(self, name: str) -> Tuple[float, Optional[int]]:
+        """组件声明的 (超时秒数, 堆内存上限 MB)"""
+        regs = self._load_registrations()
+        for kind in ("commands", "actions", "events", "schedules"):
+            for comp in regs.get(kind, []):
+                if comp.get("name") == name:
+                    timeout_ms = comp.get("timeout_ms")
+                    timeout = timeout_ms / 1000 if timeout_ms else _DEFAULT_TIMEOUT
+                    return timeout, comp.get("max_memory_mb")
+        return _DEFAULT_TIMEOUT, None
+
+    def _heap_limit_args(self, component_limit: Optional[int] = None) -> Tuple[str, ...]:
+        """
+        node 的 --max-old-space-size 参数。
+
+        spawn 模式按单个组件的限制启动进程；常驻进程由多个组件共享，
+        取 max_memory_mb 参数，未指定时取各组件声明的最大值。
+        """
+        limit = component_limit or self.max_memory_mb
+        if limit is None:
+            declared = [
+                c["max_memory_mb"]
+                for kind in ("commands", "actions", "events", "schedules")
+                for c in (self._registrations or {}).get(kind, [])
+                if c.get("max_memory_mb")
+            ]
+            limit = max(declared) if declared else None
+        return (f"--max-old-space-size={limit}",) if limit else ()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        执行统计。计数：
+            executions      - 执行次数
+            failures        - 执行失败次数（含下面被结束的执行）
+            timeouts        - 超时被看门狗结束的次数
+            crashes         - 工作进程崩溃的次数（含超出 --max-old-space-size）
+            aborted         - 同一工作进程中其他执行超时、进程被结束而连带中止的次数（不计入 crashes）
+            memory_exceeded - 执行后堆占用超限、工作进程被替换的次数
+            cache_hits      - 结果缓存命中次数（命中时不执行 JS，不计入 executions）
+            cache_misses    - 结果缓存未命中次数
+            steals          - sticky 路由下因目标进程积压而转给其他进程的次数
+            events_filtered - mai.event() 未通过 Python 侧预过滤、没有进入 Node.js 的消息数
+            rejected / evicted / coalesced / queued - 准入控制：拒绝、挤出、合并的累计次数与当前排队数
+
+        fetch（ctx.fetch 的累计次数）：
+            requests  - 实际发出的 HTTP 请求数
+            cached    - 命中响应缓存（cacheTtl）的次数
+            coalesced - 与进行中的相同请求合并的次数
+            reused    - 复用 keep-alive 连接的请求数
+            errors    - 失败（网络错误、超时）的请求数
+
+        timings（各为直方图快照：count / mean / p50 / p95 / p99 / max / buckets，毫秒）：
+            admission_ms  - 在准入队列中等待的时间
+            queue_ms      - 等待并发名额（max_concurrency）的时间
+            spawn_ms      - 启动 Node.js 工作进程到插件加载完成的时间
+            execute_ms    - JS 侧 executeComponent 报告的组件执行时间
+            roundtrip_ms  - 向工作进程发出请求到收到结果的时间（执行 + 通信）
+            send_ms       - 调用 send_api 发送消息的时间
+            total_ms      - 组件从被触发到完成的总时间
+            payload_bytes - 每次执行从 Node.js 收到的字节数（含图片载荷）
+            fetch_ms      - 每次执行中等待 ctx.fetch 的总时间（只统计调用了 ctx.fetch 的执行）
+
+        components：每个组件的 calls / failures 与 total_ms、execute_ms 等直方图。
+
+        schedules：每个 mai.schedule() 任务的 runs / failures / skipped（上一次未结束而跳过的触发）
+        累计次数、last_ms（上次运行耗时）与 running。
+        """
+        return {
+            **self._stats,
+            **(self._admission.stats() if self._admission else {}),
+            "steals": self._pool.steals if self._pool else 0,
+            "cache_hits": sum(c.hits for c in self._caches.values()),
+            "cache_misses": sum(c.misses for c in self._caches.values()),
+            "fetch": dict(self._fetch_stats),
+            "schedules": self._scheduler.stats() if self._scheduler else {},
+            **self._metrics.snapshot(),
+        }
+
+    def _record_kill(self, kind: str, component_name: str, error: Exception) -> None:
+        self._stats[kind] += 1
+        logger.warning(
+            f"[JsBridge] {self.plugin_name}.{component_name} 已被结束：{error}"
+            f"（累计超时 {self._stats['timeouts']} 次，崩溃 {self._stats['crashes']} 次）"
+        )
 
     def get_components(self) -> List[Tuple[Any, Type]]:
         """
@@ -347,7 +1261,9 @@ class JsBridgeLoader:
             from src.plugin_system import (
                 BaseAction,
                 BaseCommand,
+                BaseEventHandler,
                 ActionActivationType,
+                EventType,
             )
         except ImportError:
             logger.error("[JsBridge] 无法导入 src.plugin_system，请确保在 MaiBot 目录内运行")
@@ -356,8 +1272,17 @@ class JsBridgeLoader:
         regs = self._load_registrations()
         components = []
 
-        for cmd_info in regs.get("commands", []):
-            component_class = self._make_command_class(cmd_info, BaseCommand)
+        commands = regs.get("commands", [])
+        if self.command_dispatch == "combined":
+            dispatch_class, commands = self._make_dispatch_command_class(commands, BaseCommand)
+            if dispatch_class:
+                components.append((dispatch_class.get_command_info(), dispatch_class))
+
+        for cmd_info in commands:
+            if cmd_info.get("_is_simple_reply"):
+                component_class = self._make_reply_command_class(cmd_info, BaseCommand)
+            else:
+                component_class = self._make_command_class(cmd_info, BaseCommand)
             if component_class:
                 components.append((component_class.get_command_info(), component_class))
 
@@ -366,21 +1291,429 @@ class JsBridgeLoader:
             if component_class:
                 components.append((component_class.get_action_info(), component_class))
 
+        for evt_info in regs.get("events", []):
+            component_class = self._make_event_class(evt_info, BaseEventHandler, EventType)
+            if component_class:
+                components.append((component_class.get_handler_info(), component_class))
+
+        if self.prewarm:
+            self._schedule_warm()
+        self._ensure_scheduler()
+        if self._scheduler is None and regs.get("schedules"):
+            # 不在事件循环中调用时无法立即启动调度器：注册一个 ON_START 处理器，MaiBot 启动后再启动
+            start_class = self._make_schedule_start_class(BaseEventHandler, EventType)
+            components.append((start_class.get_handler_info(), start_class))
+
         return components
 
+    def _schedule_warm(self) -> None:
+        """在正在运行的事件循环中后台预热；没有事件循环时跳过（首次执行时再启动）"""
+        if self._warm_task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.debug(f"[JsBridge] {self.plugin_name} 不在事件循环中，跳过预热")
+            return
+        self._warm_task = loop.create_task(self.warm())
+
+    async def warm(self) -> int:
+        """
+        预先启动工作进程、加载 SDK 与插件并做健康检查，返回就绪的工作进程数。
+
+        pool / isolated 模式启动全部 pool_size 个进程；shared 模式启动共享宿主进程并
+        把本插件加载进去；spawn 模式每次执行都是新进程，无需预热（返回 0）。
+        """
+        self._ensure_scheduler()
+        if not _has_node() or self.exec_mode == "spawn":
+            return 0
+        self._load_registrations()
+        started = time.monotonic()
+        try:
+            if self._host is not None:
+                ready = await self._host.warm(self.js_file)
+            else:
+                ready = await self._ensure_pool().warm()
+        except JsWorkerError as e:
+            logger.warning(f"[JsBridge] {self.plugin_name} 预热失败：{e}")
+            return 0
+        logger.info(
+            f"[JsBridge] {self.plugin_name} 已预热 {ready} 个工作进程"
+            f"（{(time.monotonic() - started) * 1000:.0f}ms）"
+        )
+        return ready
+
+    def _ensure_pool(self) -> JsWorkerPool:
+        # 进程池在首次使用时创建，确保绑定到正在运行的事件循环
+        if self._pool is None:
+            runner_args = ("--isolate",) if self.exec_mode == "isolated" else ()
+            self._pool = JsWorkerPool(
+                self.js_file, self.plugin_name, size=self.pool_size,
+                runner_args=runner_args, node_args=self._heap_limit_args(), blob_dir=self.blob_dir,
+                routing=self.routing,
+                on_spawn=lambda ms: self._metrics.observe("spawn_ms", ms),
+            )
+        return self._pool
+
+    def _ensure_scheduler(self) -> None:
+        """在正在运行的事件循环中启动 mai.schedule() 任务；没有事件循环时跳过（ON_START 或首次执行时再启动）"""
+        if self._scheduler is not None:
+            return
+        schedules = self._load_registrations().get("schedules", [])
+        if not schedules:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            logger.debug(f"[JsBridge] {self.plugin_name} 不在事件循环中，定时任务将在 MaiBot 启动（ON_START）后启动")
+            return
+        if not _has_node():
+            logger.error(f"[JsBridge] Node.js 未安装，{self.plugin_name} 的定时任务不会运行")
+            return
+        self._scheduler = Scheduler(self._run_schedule, label=self.plugin_name)
+        for info in schedules:
+            self._scheduler.add(
+                info["name"], info["every_ms"] / 1000, (info.get("jitter_ms") or 0) / 1000,
+                immediate=info.get("immediate", True),
+            )
+        self._scheduler.start()
+        logger.info(f"[JsBridge] {self.plugin_name} 已启动 {len(schedules)} 个定时任务")
+
+    def _schedule_info(self, name: str) -> Dict:
+        for info in self._load_registrations().get("schedules", []):
+            if info.get("name") == name:
+                return info
+        return {}
+
+    def _live_workers(self) -> List[JsWorker]:
+        """运行本插件的存活常驻进程（shared 模式为共享宿主中承载本插件的进程）"""
+        if self._host is not None:
+            return self._host.plugin_workers(self.js_file)
+        return self._ensure_pool().workers
+
+    async def _run_schedule(self, name: str) -> bool:
+        """
+        运行一次定时任务，返回是否成功。
+
+        常驻进程模式下默认在每个存活的工作进程中各运行一次（workers: 'one' 时只运行一次），
+        使每个进程内存中的数据都得到刷新；spawn 模式每次都是新进程，只运行一次。
+        定时任务没有聊天流，ctx.send 等发送的消息会被丢弃。
+        """
+        context_data = {"stream_id": None, "plugin_name": self.plugin_name, "matched_groups": [], "action_data": {}}
+        js_ctx = JsContext(
+            stream_id=None,
+            plugin_name=self.plugin_name,
+            loop=asyncio.get_running_loop(),
+            send_api=None,
+            config_getter=None,
+            logger=logger,
+        )
+
+        async def on_message(msg: Dict) -> None:
+            logger.warning(f"[JsBridge] 定时任务 {self.plugin_name}.{name} 没有聊天流，已丢弃 {msg.get('type')} 消息")
+
+        workers: List[Optional[JsWorker]] = [None]
+        if self.exec_mode != "spawn" and self._schedule_info(name).get("workers") != "one":
+            alive = self._live_workers()
+            if not alive:
+                await self.warm()
+                alive = self._live_workers()
+            workers = alive or [None]
+
+        results = await asyncio.gather(*(
+            self._execute(name, context_data, on_message, js_ctx.call, worker=worker) for worker in workers
+        ))
+        for result in results:
+            if not result.get("success", False):
+                logger.warning(f"[JsBridge] 定时任务 {self.plugin_name}.{name} 运行失败：{result.get('log')}")
+        return all(result.get("success", False) for result in results)
+
+    async def _execute(
+        self,
+        component_name: str,
+        context_data: Dict,
+        on_message: Optional[MessageHandler] = None,
+        on_rpc: Optional[RpcHandler] = None,
+        worker: Optional[JsWorker] = None,
+    ) -> Dict:
+        """
+        按执行模式运行指定组件，返回 {success, log, messages}。
+
+        传入 on_message 时消息以流式方式逐条回调，结果中只剩未流式发送的消息；
+        传入 on_rpc 时处理 JS 侧的宿主调用（通常是 JsContext.call）；
+        传入 worker 时在该常驻进程中执行，不经过进程池的路由（定时任务使用）。
+        """
+        if not _has_node():
+            logger.error("[JsBridge] Node.js 未安装，无法执行 JS 插件")
+            return {"success": False, "log": "Node.js 未安装", "messages": []}
+
+        await self._check_reload()
+        self._ensure_scheduler()
+
+        # 信号量在首次执行时创建，确保绑定到 MaiBot 正在运行的事件循环
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        timeout, max_memory_mb = self._limits(component_name)
+        profile = self._profile_for(component_name)
+        config = self._current_config()
+        self._stats["executions"] += 1
+        waiting_since = time.monotonic()
+
+        async with self._semaphore:
+            self._metrics.observe("queue_ms", (time.monotonic() - waiting_since) * 1000)
+            try:
+                if worker is not None and self._host is None:
+                    result = await worker.execute(
+                        component_name, context_data, timeout, on_message, on_rpc,
+                        max_memory_mb, profile=profile, config=config,
+                    )
+                elif self.exec_mode == "spawn":
+                    result = await _run_js_execute_async(
+                        self.js_file, component_name, context_data, timeout,
+                        on_message=on_message, on_rpc=on_rpc,
+                        node_args=self._heap_limit_args(max_memory_mb), blob_dir=self.blob_dir,
+                        profile=profile, config=config,
+                    )
+                elif self._host is not None:
+                    # 指定了进程（定时任务）时同样经过 JsHostManager，占用全局并发名额
+                    result = await self._host.execute(
+                        self.js_file, component_name, context_data, timeout,
+                        on_message=on_message, on_rpc=on_rpc, profile=profile, config=config, worker=worker,
+                    )
+                else:
+                    result = await self._ensure_pool().execute(
+                        component_name, context_data, timeout,
+                        on_message=on_message, on_rpc=on_rpc, max_memory_mb=max_memory_mb,
+                        key=context_data.get("stream_id"), profile=profile, config=config,
+                    )
+            except JsWorkerTimeout as e:
+                self._stats["failures"] += 1
+                self._metrics.count_call(component_name, False)
+                self._record_kill("timeouts", component_name, e)
+                return {"success": False, "log": str(e), "messages": []}
+            except JsWorkerAborted as e:
+                self._stats["failures"] += 1
+                self._stats["aborted"] += 1
+                self._metrics.count_call(component_name, False)
+                logger.warning(f"[JsBridge] {self.plugin_name}.{component_name} {e}")
+                return {"success": False, "log": str(e), "messages": []}
+            except JsWorkerError as e:
+                self._stats["failures"] += 1
+                self._metrics.count_call(component_name, False)
+                self._record_kill("crashes", component_name, e)
+                return {"success": False, "log": str(e), "messages": []}
+
+        if result.get("memory_exceeded"):
+            self._stats["memory_exceeded"] += 1
+        if result.get("profile"):
+            logger.info(f"[JsBridge] {self.plugin_name}.{component_name} 性能分析已写入 {result['profile']}")
+        if not result.get("success", False):
+            self._stats["failures"] += 1
+        self._record_timings(component_name, result)
+        return result
+
+    def _note_plugin_config(self, component) -> None:
+        """记下组件的 plugin_config，作为没有 config.toml 时的配置来源"""
+        plugin_config = getattr(component, "plugin_config", None)
+        if isinstance(plugin_config, dict) and plugin_config:
+            self._config_source = plugin_config
+
+    def _current_config(self) -> Optional[Tuple[int, str]]:
+        """
+        当前插件配置的 (版本, JSON 文本)，没有任何配置时为 None。
+
+        节流地检查 config.toml 的 stat，变化时重新读取；内容变化时才重新序列化并使版本 +1，
+        工作进程据版本号决定是否需要接收新配置。
+        """
+        now = time.monotonic()
+        if self._config_json is not None and now - self._last_config_check < _RELOAD_CHECK_INTERVAL:
+            return self._config_version, self._config_json
+        self._last_config_check = now
+
+        config: Optional[Dict] = None
+        stamp = None
+        if tomllib is not None:
+            try:
+                st = os.stat(self.config_file)
+                stamp = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stamp = None
+        if stamp is not None:
+            if stamp == self._config_stamp:
+                return self._config_version, self._config_json
+            try:
+                config = tomllib.loads(Path(self.config_file).read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"[JsBridge] 读取 {self.config_file} 失败，继续使用当前配置：{e}")
+                self._config_stamp = stamp
+                return (self._config_version, self._config_json) if self._config_json is not None else None
+        elif self._config_source is not None:
+            config = self._config_source
+        else:
+            return None
+
+        self._config_stamp = stamp
+        serialized = json.dumps(config, ensure_ascii=False, default=str, sort_keys=True)
+        if serialized != self._config_json:
+            self._config_json = serialized
+            self._config_version += 1
+            if self._config_version > 1:
+                logger.info(f"[JsBridge] {self.plugin_name} 配置已更新（version={self._config_version}）")
+        return self._config_version, self._config_json
+
+    def _profile_for(self, component_name: str) -> Optional[str]:
+        """本次执行的性能分析类型，未开启或该组件不在 profile_components 中时为 None"""
+        if self.profile is None:
+            return None
+        if self.profile_components is not None and component_name not in self.profile_components:
+            return None
+        return self.profile
+
+    def _record_timings(self, component_name: str, result: Dict) -> None:
+        """把一次执行结果中的耗时与字节数记入指标"""
+        metrics = self._metrics
+        metrics.count_call(component_name, bool(result.get("success", False)))
+        if result.get("spawn_ms") is not None:
+            metrics.observe("spawn_ms", result["spawn_ms"])
+        if result.get("executeMs") is not None:
+            metrics.observe("execute_ms", result["executeMs"], component_name)
+        if result.get("roundtrip_ms") is not None:
+            metrics.observe("roundtrip_ms", result["roundtrip_ms"], component_name)
+        if result.get("rx_bytes") is not None:
+            metrics.observe("payload_bytes", result["rx_bytes"], component_name)
+        fetch = result.get("fetch")
+        if fetch:
+            for key in self._fetch_stats:
+                self._fetch_stats[key] += fetch.get(key, 0)
+            metrics.observe("fetch_ms", fetch.get("totalMs", 0), component_name)
+
+    def _result_cache(self, info: Dict) -> Optional[ResultCache]:
+        """为声明了 cache 的组件创建结果缓存"""
+        cache_cfg = info.get("cache")
+        if not cache_cfg:
+            return None
+        ttl_ms = cache_cfg.get("ttl_ms")
+        cache = ResultCache(ttl_ms / 1000 if ttl_ms else None, cache_cfg.get("max_entries", DEFAULT_MAX_ENTRIES))
+        self._caches[info["name"]] = cache
+        return cache
+
+    async def _run_component(
+        self,
+        component_name: str,
+        context_data: Dict,
+        js_ctx: JsContext,
+        send_api,
+        cache: Optional[ResultCache] = None,
+    ) -> Dict:
+        """
+        执行组件并把消息发送到聊天流，返回 {success, log, messages}。
+
+        消息在产生时流式发送；声明了 cache 的组件命中缓存时直接重放消息，
+        成功的执行结果（全部消息与 log）写入缓存。
+        执行前经过准入控制，未被准入时返回 success=False 与原因（不执行、不发消息）。
+        """
+        stream_id = context_data.get("stream_id")
+        started = time.monotonic()
+        key = ResultCache.make_key(context_data)
+        if cache is not None:
+            # 先检查热重载：plugin.js 变化时清空缓存，命中路径不会重放旧版本的输出
+            await self._check_reload()
+            cached = cache.get(key)
+            if cached is not None:
+                await _send_messages(send_api, cached["messages"], stream_id)
+                self._metrics.observe("total_ms", (time.monotonic() - started) * 1000, component_name)
+                return {"success": True, "log": cached["log"], "messages": []}
+
+        async def run() -> Dict:
+            if self._admission is not None:
+                self._metrics.observe("admission_ms", (time.monotonic() - started) * 1000)
+            return await self._run_admitted(component_name, context_data, js_ctx, send_api, cache, key)
+
+        if self._admission is None:
+            result = await run()
+        else:
+            try:
+                # 只有声明了 cache（输出只取决于输入）的组件可以在溢出时合并
+                coalesce_key = key if cache is not None else None
+                result = await self._admission.run(str(stream_id), component_name, coalesce_key, run)
+            except AdmissionRejected as e:
+                logger.debug(f"[JsBridge] {self.plugin_name}.{component_name} 未执行：{e}")
+                return {"success": False, "log": f"未执行：{e}", "messages": []}
+        self._metrics.observe("total_ms", (time.monotonic() - started) * 1000, component_name)
+        return result
+
+    async def _run_admitted(
+        self,
+        component_name: str,
+        context_data: Dict,
+        js_ctx: JsContext,
+        send_api,
+        cache: Optional[ResultCache],
+        key: str,
+    ) -> Dict:
+        stream_id = context_data.get("stream_id")
+        sent: List[Dict] = []
+        send_time = 0.0
+        outbox: asyncio.Queue = asyncio.Queue()
+
+        async def deliver() -> None:
+            nonlocal send_time
+            while True:
+                msg = await outbox.get()
+                if msg is None:
+                    return
+                t = time.monotonic()
+                await _send_message(send_api, msg, stream_id)
+                send_time += time.monotonic() - t
+
+        async def on_message(msg: Dict) -> None:
+            # 只排队：由 deliver 按顺序发送，聊天后端慢时不占用组件的执行超时
+            sent.append(msg)
+            outbox.put_nowait(msg)
+
+        sender = asyncio.ensure_future(deliver())
+        try:
+            result = await self._execute(component_name, context_data, on_message, js_ctx.call)
+        except BaseException:
+            sender.cancel()
+            raise
+        outbox.put_nowait(None)
+        await sender
+        leftover = result.get("messages", [])
+        t = time.monotonic()
+        await _send_messages(send_api, leftover, stream_id)
+        send_time += time.monotonic() - t
+        if sent or leftover:
+            self._metrics.observe("send_ms", send_time * 1000, component_name)
+
+        if cache is not None and result.get("success", False):
+            cache.put(key, {"messages": sent + leftover, "log": result.get("log", "")})
+        return result
+
+    async def close(self) -> None:
+        """关闭常驻工作进程（插件卸载时调用）；停止定时任务，shared 模式下从共享宿主注销，并写回 ctx.store 的待写数据"""
+        if self._scheduler is not None:
+            scheduler, self._scheduler = self._scheduler, None
+            await scheduler.stop()
+        if self._warm_task is not None:
+            task, self._warm_task = self._warm_task, None
+            await asyncio.gather(task, return_exceptions=True)
+        if self._host is not None:
+            host, self._host = self._host, None
+            await host.unregister(self.js_file)
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+        await get_kv_store().flush()
+
     def _make_command_class(self, cmd_info: Dict, BaseCommand) -> Optional[Type]:
         """动态生成 Command 类"""
-        js_file = self.js_file
-        plugin_name = self.plugin_name
+        loader = self
         name = cmd_info.get("name", "unknown_command")
         description = cmd_info.get("description", "JS Command")
-        pattern = cmd_info.get("pattern", "^$")
-        flags = cmd_info.get("pattern_flags", "")
-
-        import re as _re
-        re_flags = 0
-        if "i" in flags:
-            re_flags |= _re.IGNORECASE
+        pattern = _command_pattern(cmd_info)
+        cache = self._result_cache(cmd_info)
 
         class DynamicJsCommand(BaseCommand):
             command_name = name
@@ -388,50 +1721,129 @@ class JsBridgeLoader:
             command_pattern = pattern
 
             async def execute(self):
-                context_data = {
-                    "stream_id": self.stream_id,
-                    "plugin_name": plugin_name,
-                    "matched_groups": [],
-                    "action_data": {},
-                }
-                if self.matched:
-                    groups = list(self.matched.groups())
-                    context_data["matched_groups"] = groups
+                return await loader._execute_command(self, name, self.matched, cache)
 
-                from src.plugin_system.apis import send_api
+        DynamicJsCommand.__name__ = f"JsCommand_{name}"
+        DynamicJsCommand.__qualname__ = f"JsCommand_{name}"
+        return DynamicJsCommand
 
-                result = await asyncio.get_running_loop().run_in_executor(
-                    None,
-                    lambda: _run_js_execute(js_file, name, context_data),
-                )
+    async def _execute_command(self, command, name: str, matched, cache: Optional[ResultCache]) -> Tuple[bool, str, bool]:
+        """执行 JS 命令，返回 BaseCommand.execute 的 (success, log, intercept)"""
+        self._note_plugin_config(command)
+        context_data = {
+            "stream_id": command.stream_id,
+            "plugin_name": self.plugin_name,
+            "matched_groups": [],
+            "action_data": {},
+        }
+        if matched:
+            groups = list(matched.groups())
+            context_data["matched_groups"] = groups
+
+        from src.plugin_system.apis import send_api
+
+        js_ctx = JsContext(
+            stream_id=command.stream_id,
+            plugin_name=self.plugin_name,
+            loop=asyncio.get_running_loop(),
+            send_api=send_api,
+            config_getter=command.get_config,
+            logger=logger,
+            matched=matched,
+        )
 
-                for msg in result.get("messages", []):
-                    msg_type = msg.get("type", "text")
-                    content = msg.get("content", "")
-                    if msg_type == "text" and content:
-                        await send_api.text_to_stream(content, self.stream_id)
-                    elif msg_type == "image" and content:
-                        await send_api.image_to_stream(content, self.stream_id)
-                    elif msg_type == "emoji" and content:
-                        await send_api.emoji_to_stream(content, self.stream_id)
+        result = await self._run_component(name, context_data, js_ctx, send_api, cache)
 
-                success = result.get("success", False)
-                log_msg = result.get("log", "")
-                return success, log_msg, True
+        success = result.get("success", False)
+        log_msg = result.get("log", "")
+        return success, log_msg, True
 
-        DynamicJsCommand.__name__ = f"JsCommand_{name}"
-        DynamicJsCommand.__qualname__ = f"JsCommand_{name}"
-        return DynamicJsCommand
+    def _make_dispatch_command_class(self, cmd_infos: List[Dict], BaseCommand) -> Tuple[Optional[Type], List[Dict]]:
+        """
+        生成合并所有命令的分发 Command 类，返回 (类, 无法合并、需要单独注册的命令)。
+
+        宿主只需测试一个合并后的正则；匹配后由 Match.lastgroup（命中的分支名）
+        查表得到组件，捕获组按该组件自己的正则重新编号。
+        """
+        loader = self
+        combined, index, leftovers = _combine_command_patterns(cmd_infos)
+        if combined is None:
+            return None, leftovers
+        caches = {
+            info["name"]: self._result_cache(info)
+            for info, _, _ in index.values()
+            if not info.get("_is_simple_reply")
+        }
+
+        class DynamicJsDispatchCommand(BaseCommand):
+            command_name = f"{self.plugin_name}_dispatch"
+            command_description = f"JS 命令分发（{len(index)} 个命令）"
+            command_pattern = combined
+
+            async def execute(self):
+                entry = index.get(self.matched.lastgroup) if self.matched else None
+                if entry is None:
+                    return False, "没有匹配的 JS 命令", False
+                info, base, count = entry
+                name = info["name"]
+                if info.get("_is_simple_reply"):
+                    from src.plugin_system.apis import send_api
+
+                    text = await loader._current_reply_text(name, info.get("_reply_text", ""))
+                    if text:
+                        await send_api.text_to_stream(text, self.stream_id)
+                    return True, "", True
+                return await loader._execute_command(self, name, _SubMatch(self.matched, base, count), caches[name])
+
+        DynamicJsDispatchCommand.__name__ = f"JsDispatch_{self.plugin_name}"
+        DynamicJsDispatchCommand.__qualname__ = f"JsDispatch_{self.plugin_name}"
+        if leftovers:
+            logger.info(
+                f"[JsBridge] {self.plugin_name}：{len(index)} 个命令合并分发，"
+                f"{len(leftovers)} 个命令的正则无法合并，单独注册"
+            )
+        return DynamicJsDispatchCommand, leftovers
+
+    def _make_reply_command_class(self, cmd_info: Dict, BaseCommand) -> Optional[Type]:
+        """
+        为 mai.reply() 生成纯 Python 的 Command 类。
+
+        回复文本已在加载时确认为静态字符串，执行时直接调用 send_api，不启动 Node.js；
+        plugin.js 修改后使用重新解析出的文本。
+        """
+        loader = self
+        name = cmd_info.get("name", "unknown_reply")
+        description = cmd_info.get("description", "JS Reply")
+        pattern = _command_pattern(cmd_info)
+        reply_text = cmd_info.get("_reply_text", "")
+
+        class DynamicJsReplyCommand(BaseCommand):
+            command_name = name
+            command_description = description
+            command_pattern = pattern
+
+            async def execute(self):
+                from src.plugin_system.apis import send_api
+
+                text = await loader._current_reply_text(name, reply_text)
+                if text:
+                    await send_api.text_to_stream(text, self.stream_id)
+                return True, "", True
+
+        DynamicJsReplyCommand.__name__ = f"JsReply_{name}"
+        DynamicJsReplyCommand.__qualname__ = f"JsReply_{name}"
+        return DynamicJsReplyCommand
 
     def _make_action_class(self, act_info: Dict, BaseAction, ActionActivationType) -> Optional[Type]:
         """动态生成 Action 类"""
-        js_file = self.js_file
+        loader = self
         plugin_name = self.plugin_name
         name = act_info.get("name", "unknown_action")
         description = act_info.get("description", "JS Action")
         require = act_info.get("require", ["当需要时"])
         parameters = act_info.get("parameters", {"reason": "执行原因"})
         types = act_info.get("types", ["text"])
+        cache = self._result_cache(act_info)
 
         class DynamicJsAction(BaseAction):
             action_name = name
@@ -442,6 +1854,7 @@ class JsBridgeLoader:
             associated_types = types
 
             async def execute(self):
+                loader._note_plugin_config(self)
                 context_data = {
                     "stream_id": self.stream_id,
                     "plugin_name": plugin_name,
@@ -451,20 +1864,17 @@ class JsBridgeLoader:
 
                 from src.plugin_system.apis import send_api
 
-                result = await asyncio.get_running_loop().run_in_executor(
-                    None,
-                    lambda: _run_js_execute(js_file, name, context_data),
+                js_ctx = JsContext(
+                    stream_id=self.stream_id,
+                    plugin_name=plugin_name,
+                    loop=asyncio.get_running_loop(),
+                    send_api=send_api,
+                    config_getter=self.get_config,
+                    logger=logger,
+                    action_data=self.action_data,
                 )
 
-                for msg in result.get("messages", []):
-                    msg_type = msg.get("type", "text")
-                    content = msg.get("content", "")
-                    if msg_type == "text" and content:
-                        await send_api.text_to_stream(content, self.stream_id)
-                    elif msg_type == "image" and content:
-                        await send_api.image_to_stream(content, self.stream_id)
-                    elif msg_type == "emoji" and content:
-                        await send_api.emoji_to_stream(content, self.stream_id)
+                result = await loader._run_component(name, context_data, js_ctx, send_api, cache)
 
                 success = result.get("success", False)
                 log_msg = result.get("log", "")
@@ -474,6 +1884,106 @@ class JsBridgeLoader:
         DynamicJsAction.__qualname__ = f"JsAction_{name}"
         return DynamicJsAction
 
+    def _make_event_class(self, evt_info: Dict, BaseEventHandler, EventType) -> Optional[Type]:
+        """
+        动态生成 ON_MESSAGE 事件处理器类。
+
+        每条消息先在 Python 中按 streams / keywords / regex 预过滤，未命中时直接放行，
+        不与 Node.js 通信；命中时才执行 JS。
+        """
+        loader = self
+        name = evt_info.get("name", "unknown_event")
+        description = evt_info.get("description", "JS 消息监听")
+        intercept = bool(evt_info.get("intercept", False))
+        try:
+            event_filter = _EventFilter(evt_info)
+        except re.error as e:
+            logger.error(f"[JsBridge] 事件 {name} 的正则无法在 Python 中使用（{e}），该事件未注册")
+            return None
+        cache = self._result_cache(evt_info)
+
+        class DynamicJsEventHandler(BaseEventHandler):
+            event_type = EventType.ON_MESSAGE
+            handler_name = name
+            handler_description = description
+            intercept_message = intercept
+
+            async def execute(self, message):
+                if message is None:
+                    return True, True, None, None, None
+                stream_id = getattr(message, "stream_id", None)
+                hit = event_filter.match(stream_id, getattr(message, "plain_text", None) or "")
+                if hit is None:
+                    loader._stats["events_filtered"] += 1
+                    return True, True, None, None, None
+                return await loader._execute_event(self, name, message, hit, intercept, cache)
+
+        DynamicJsEventHandler.__name__ = f"JsEvent_{name}"
+        DynamicJsEventHandler.__qualname__ = f"JsEvent_{name}"
+        return DynamicJsEventHandler
+
+    def _make_schedule_start_class(self, BaseEventHandler, EventType) -> Type:
+        """动态生成 ON_START 事件处理器类：在 MaiBot 的事件循环中启动 mai.schedule() 任务"""
+        loader = self
+
+        class JsScheduleStarter(BaseEventHandler):
+            event_type = EventType.ON_START
+            handler_name = f"{self.plugin_name}_schedules"
+            handler_description = "启动 JS 定时任务"
+
+            async def execute(self, message):
+                loader._ensure_scheduler()
+                return True, True, None, None, None
+
+        JsScheduleStarter.__name__ = f"JsScheduleStarter_{self.plugin_name}"
+        JsScheduleStarter.__qualname__ = f"JsScheduleStarter_{self.plugin_name}"
+        return JsScheduleStarter
+
+    async def _execute_event(
+        self,
+        handler,
+        name: str,
+        message,
+        hit: Tuple[Optional[str], Optional["re.Match"]],
+        intercept: bool,
+        cache: Optional[ResultCache],
+    ) -> Tuple[bool, bool, Optional[str], None, None]:
+        """执行命中预过滤的 JS 事件，返回 BaseEventHandler.execute 的 (success, 继续传递, log, None, None)"""
+        self._note_plugin_config(handler)
+        keyword, matched = hit
+        stream_id = getattr(message, "stream_id", None)
+        base_info = getattr(message, "message_base_info", None)
+        context_data = {
+            "stream_id": stream_id,
+            "plugin_name": self.plugin_name,
+            "matched_groups": list(matched.groups()) if matched else [],
+            "action_data": {},
+            "message": {
+                "text": getattr(message, "plain_text", None) or "",
+                "keyword": keyword,
+                "info": base_info if isinstance(base_info, dict) else {},
+            },
+        }
+
+        from src.plugin_system.apis import send_api
+
+        js_ctx = JsContext(
+            stream_id=stream_id,
+            plugin_name=self.plugin_name,
+            loop=asyncio.get_running_loop(),
+            send_api=send_api,
+            config_getter=handler.get_config,
+            logger=logger,
+            matched=matched,
+        )
+
+        result = await self._run_component(name, context_data, js_ctx, send_api, cache)
+
+        success = result.get("success", False)
+        # intercept 声明的事件命中后拦截消息；JS 可以返回 { intercept: true/false } 逐条决定
+        blocked = intercept and success and result.get("intercept", True)
+        return success, not blocked, result.get("log") or None, None, None
+
 
 # ─── 公开别名 ─────────────────────────────────────────────────────────────────
 # JsBridgePlugin 和 JsBridgeLoader 完全等价，可按喜好选用
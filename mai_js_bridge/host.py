@@ -0,0 +1,209 @@
+"""
+JsHostManager - 多个 JS 插件共享的 Node.js 宿主
+
+exec_mode="shared" 的 JsBridgeLoader 不再各自启动工作进程，而是注册到
+进程内唯一的 JsHostManager。管理器维护固定数量的 `mai-runner.js --host`
+进程，每个插件在进程内拥有自己的 vm 上下文（全局变量互不可见），
+插件数量增加时 Node.js 进程数与内存占用保持不变。
+
+同一插件同一聊天流的调用按一致性哈希固定到同一宿主进程（粘滞路由），
+插件在该进程内的缓存保持热；进程积压时转给最空闲的进程。
+
+并发限制分两级：
+1. 全局：所有共享插件同时进行中的执行数不超过 max_concurrency
+2. 插件：每个 JsBridgeLoader 自身的 max_concurrency
+
+故障隔离：死循环只能通过结束整个进程停下，此时同一宿主进程中其他插件进行中的
+执行也会被中止（JsWorkerAborted，不计为崩溃）。执行超时过的插件随即移出共享宿主，
+之后在自己的独立宿主进程中运行，不再连累其他插件。
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from .worker_pool import JsWorker, JsWorkerError, JsWorkerPool, JsWorkerTimeout, MessageHandler, RpcHandler
+
+logger = logging.getLogger("mai_js_bridge")
+
+
+class JsHostManager:
+    """
+    共享 Node.js 宿主进程管理器。
+
+    Args:
+        max_processes:   共享宿主进程数上限
+        max_concurrency: 所有插件合计的同时执行数上限
+        max_memory_mb:   每个宿主进程的 --max-old-space-size（None 表示不限制）
+        blob_dir:        大载荷中转目录（见 JsWorkerPool）
+    """
+
+    def __init__(
+        self,
+        max_processes: int = 2,
+        max_concurrency: int = 64,
+        max_memory_mb: Optional[int] = None,
+        blob_dir: Optional[str] = None,
+    ):
+        if max_processes < 1:
+            raise ValueError("max_processes 至少为 1")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency 至少为 1")
+        self.max_processes = max_processes
+        self.max_concurrency = max_concurrency
+        self.max_memory_mb = max_memory_mb
+        self.blob_dir = blob_dir
+        self._plugins: Dict[str, str] = {}    # 插件路径 → 插件名
+        self._pool: Optional[JsWorkerPool] = None
+        self._isolated: Dict[str, JsWorkerPool] = {}   # 执行超时过的插件 → 它独占的宿主进程
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight = 0
+
+    @property
+    def plugins(self) -> Dict[str, str]:
+        """已注册的插件（路径 → 插件名）"""
+        return dict(self._plugins)
+
+    def register(self, js_file: str, plugin_name: str) -> None:
+        """注册插件；进程在第一次执行时才启动"""
+        self._plugins[js_file] = plugin_name
+        logger.debug(f"[JsHost] 注册插件 {plugin_name}（共 {len(self._plugins)} 个）")
+
+    async def unregister(self, js_file: str) -> None:
+        """注销插件；最后一个插件注销后关闭宿主进程"""
+        self._plugins.pop(js_file, None)
+        isolated = self._isolated.pop(js_file, None)
+        if isolated is not None:
+            await isolated.close()
+        if not self._plugins:
+            await self.close()
+
+    async def execute(
+        self,
+        js_file: str,
+        component: str,
+        context: Dict[str, Any],
+        timeout: float = 30.0,
+        on_message: Optional[MessageHandler] = None,
+        on_rpc: Optional[RpcHandler] = None,
+        profile: Optional[str] = None,
+        config: Optional[Tuple[int, str]] = None,
+        worker: Optional[JsWorker] = None,
+    ) -> Dict:
+        """
+        在共享宿主中执行某个插件的组件，参数同 JsWorker.execute。
+
+        宿主进程的堆由所有插件共用，单个组件的 maxMemoryMb 无法归属到某个插件，
+        因此这里不按组件限制淘汰进程，只由宿主的 max_memory_mb（--max-old-space-size）限制。
+        传入 worker（plugin_workers 中的进程）时在该进程中执行，不经过路由，
+        但同样占用全局并发名额（定时任务使用）。
+        """
+        if js_file not in self._plugins:
+            raise JsWorkerError("插件未注册到共享宿主")
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        pool = self._pool_for(js_file)
+
+        async with self._semaphore:
+            self._inflight += 1
+            try:
+                if worker is not None:
+                    return await worker.execute(
+                        component, context, timeout, on_message, on_rpc,
+                        plugin=js_file, profile=profile, config=config,
+                    )
+                return await pool.execute(
+                    component, context, timeout, on_message, on_rpc,
+                    plugin=js_file, key=f"{js_file}\0{context.get('stream_id')}", profile=profile, config=config,
+                )
+            except JsWorkerTimeout:
+                if pool is self._pool:
+                    self.isolate(js_file)
+                raise
+            finally:
+                self._inflight -= 1
+
+    async def warm(self, js_file: str) -> int:
+        """启动全部宿主进程，并把插件预先加载到每个进程中，返回就绪的进程数"""
+        if js_file not in self._plugins:
+            raise JsWorkerError("插件未注册到共享宿主")
+        return await self._pool_for(js_file).warm(plugin=js_file)
+
+    def plugin_workers(self, js_file: str) -> List[JsWorker]:
+        """运行该插件的存活宿主进程"""
+        pool = self._isolated.get(js_file) or self._pool
+        return pool.workers if pool else []
+
+    def _pool_for(self, js_file: str) -> JsWorkerPool:
+        return self._isolated.get(js_file) or self._ensure_pool()
+
+    def _new_pool(self, name: str, size: int) -> JsWorkerPool:
+        node_args = (f"--max-old-space-size={self.max_memory_mb}",) if self.max_memory_mb else ()
+        return JsWorkerPool(
+            None, name, size=size,
+            runner_args=("--host",), node_args=node_args, blob_dir=self.blob_dir,
+        )
+
+    def _ensure_pool(self) -> JsWorkerPool:
+        # 进程池在首次使用时创建，确保绑定到正在运行的事件循环
+        if self._pool is None:
+            self._pool = self._new_pool("js-host", self.max_processes)
+        return self._pool
+
+    def isolate(self, js_file: str) -> None:
+        """把执行超时过的插件移到它独占的宿主进程中，之后的失控只影响它自己"""
+        if js_file in self._isolated or js_file not in self._plugins:
+            return
+        name = self._plugins[js_file]
+        self._isolated[js_file] = self._new_pool(f"js-host:{name}", 1)
+        logger.warning(f"[JsHost] 插件 {name} 执行超时，已移出共享宿主，之后在独立进程中运行")
+
+    def stats(self) -> Dict[str, int]:
+        """plugins / processes / isolated / inflight 当前值，steals 为积压转移的累计次数"""
+        return {
+            "plugins": len(self._plugins),
+            "processes": (len(self._pool.workers) if self._pool else 0)
+                         + sum(len(p.workers) for p in self._isolated.values()),
+            "isolated": len(self._isolated),
+            "inflight": self._inflight,
+            "steals": self._pool.steals if self._pool else 0,
+        }
+
+    async def close(self) -> None:
+        """关闭所有宿主进程（之后的执行会重新启动进程）"""
+        pools = [self._pool, *self._isolated.values()]
+        self._pool = None
+        self._isolated = {}
+        self._semaphore = None
+        await asyncio.gather(*(pool.close() for pool in pools if pool is not None))
+
+
+# ─── 进程内唯一实例 ───────────────────────────────────────────────────────────
+
+_shared_host: Optional[JsHostManager] = None
+
+
+def get_host_manager() -> JsHostManager:
+    """返回进程内共享的 JsHostManager（首次调用时按默认参数创建）"""
+    global _shared_host
+    if _shared_host is None:
+        _shared_host = JsHostManager()
+    return _shared_host
+
+
+def configure_host_manager(
+    max_processes: int = 2,
+    max_concurrency: int = 64,
+    max_memory_mb: Optional[int] = None,
+    blob_dir: Optional[str] = None,
+) -> JsHostManager:
+    """
+    设置共享宿主的参数，必须在任何 shared 模式插件注册之前调用
+    （例如在最先加载的插件的 plugin.py 顶部）。
+    """
+    global _shared_host
+    if _shared_host is not None and _shared_host.plugins:
+        raise RuntimeError("已有插件注册到共享宿主，无法再修改参数")
+    _shared_host = JsHostManager(max_processes, max_concurrency, max_memory_mb, blob_dir)
+    return _shared_host
@@ -2,22 +2,44 @@
 JsContext - 执行 JS 插件时传入的上下文对象
 
 在 JavaScript 代码中以 ctx.xxx() 的方式调用。
+JS 侧通过 ctx.call(method, ...args) 发起的宿主调用（RPC）由 JsContext.call() 处理，
+只有 RPC_METHODS 白名单内的方法可被调用。
 """
 import asyncio
 import logging
 from typing import Any, Optional, Dict, List
 
+from .kv_store import get_kv_store
+
 
 class JsContext:
     """
     JS 插件执行上下文。
     在执行 JS 的 execute(ctx) 时传入。
     
-    所有 async 方法由 JS 通过回调调用。
-    由于 JS 桥接是同步的（使用 Node.js 子进程），
-    实际 async 操作会在 Python 侧被 asyncio.run_coroutine_threadsafe 处理。
+    同步的 send_* 方法供其他线程调用，内部通过 asyncio.run_coroutine_threadsafe 调度。
+    JS 侧的 RPC 请求则由 call() 直接在事件循环中 await 处理，不占用线程。
     """
 
+    # 允许 JS 通过 ctx.call() 调用的方法
+    RPC_METHODS = frozenset({
+        "get_param",
+        "get_match",
+        "get_config",
+        "log",
+        "log_error",
+        "llm_generate",
+        "person_get_id",
+        "person_get_value",
+        "person_is_known",
+        "db_get",
+        "store_get",
+        "store_set",
+        "store_delete",
+        "store_incr",
+        "store_keys",
+    })
+
     def __init__(
         self,
         stream_id: str,
@@ -120,6 +142,98 @@ class JsContext:
         """输出错误日志"""
         self.logger.error(f"[JS:{self.plugin_name}] {message}")
 
+    # =========================================================================
+    # 宿主 API（供 JS 通过 RPC 调用）
+    # =========================================================================
+
+    async def call(self, method: str, args: List[Any]) -> Any:
+        """处理一次来自 JS 的 RPC 调用，只允许白名单内的方法"""
+        if method not in self.RPC_METHODS:
+            raise PermissionError(f"不允许调用的宿主方法：{method}")
+        result = getattr(self, method)(*args)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    async def llm_generate(self, prompt: str, options: Optional[Dict] = None) -> Dict:
+        """调用 LLM 生成内容（options: model / temperature / max_tokens）"""
+        from src.plugin_system.apis import llm_api
+
+        options = options or {}
+        models = llm_api.get_available_models()
+        model_name = options.get("model") or next(iter(models), None)
+        if model_name not in models:
+            return {"success": False, "content": "", "reasoning": "", "model": ""}
+
+        kwargs = {k: options[k] for k in ("temperature", "max_tokens") if k in options}
+        success, content, reasoning, used_model = await llm_api.generate_with_model(
+            prompt=str(prompt),
+            model_config=models[model_name],
+            request_type=f"plugin.{self.plugin_name}",
+            **kwargs,
+        )
+        return {"success": success, "content": content, "reasoning": reasoning, "model": used_model}
+
+    def person_get_id(self, platform: str, user_id: Any) -> str:
+        """获取 person_id"""
+        from src.plugin_system.apis import person_api
+
+        return person_api.get_person_id(platform, int(user_id))
+
+    async def person_get_value(self, person_id: str, field_name: str, default: Any = None) -> Any:
+        """查询用户信息的单个字段"""
+        from src.plugin_system.apis import person_api
+
+        return await person_api.get_person_value(person_id, field_name, default)
+
+    async def person_is_known(self, platform: str, user_id: Any) -> bool:
+        """判断用户是否已知"""
+        from src.plugin_system.apis import person_api
+
+        return await person_api.is_person_known(platform, int(user_id))
+
+    async def db_get(self, model_name: str, filters: Optional[Dict] = None, options: Optional[Dict] = None) -> Any:
+        """只读查询数据库（model_name 为 database_model 中的模型类名，如 "Messages"）"""
+        from src.plugin_system.apis import database_api
+        from src.common.database import database_model
+
+        model_class = getattr(database_model, str(model_name), None)
+        if not isinstance(model_class, type):
+            raise ValueError(f"未知的数据模型：{model_name}")
+
+        options = options or {}
+        return await database_api.db_get(
+            model_class=model_class,
+            filters=filters or {},
+            limit=options.get("limit"),
+            order_by=options.get("order_by"),
+            single_result=bool(options.get("single_result", False)),
+        )
+
+    # =========================================================================
+    # 持久化存储（ctx.store，按插件名分隔命名空间）
+    # =========================================================================
+
+    async def store_get(self, key: str, default: Any = None) -> Any:
+        """读取 ctx.store 中的值"""
+        return await get_kv_store().get(self.plugin_name, key, default)
+
+    def store_set(self, key: str, value: Any) -> None:
+        """写入 ctx.store（批量写回数据库，之后的读取立即可见）"""
+        get_kv_store().set(self.plugin_name, key, value)
+
+    def store_delete(self, key: str) -> None:
+        """删除 ctx.store 中的键"""
+        get_kv_store().delete(self.plugin_name, key)
+
+    async def store_incr(self, key: str, by: float = 1) -> float:
+        """把 ctx.store 中的数值加上 by 并返回新值"""
+        return await get_kv_store().incr(self.plugin_name, key, by)
+
+    async def store_keys(self, prefix: str = "") -> List[str]:
+        """列出 ctx.store 中以 prefix 开头的键"""
+        return await get_kv_store().keys(self.plugin_name, prefix)
+
     def to_dict(self) -> Dict:
         """导出为可序列化的字典（供 JS 侧读取上下文信息）"""
         return {
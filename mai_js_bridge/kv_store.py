@@ -0,0 +1,276 @@
+"""
+KvStore - JS 插件的持久化键值存储（ctx.store）
+
+数据保存在 SQLite 数据库（WAL 模式）中，按插件名分隔命名空间，MaiBot 重启后仍然保留。
+写入先进入内存中的待写队列，由后台批量写回（write-behind）：
+
+1. set / delete 立即对后续读取可见，但不立即写盘
+2. 首次写入后 FLUSH_DELAY 秒，或待写条目达到 FLUSH_BATCH 条时，在一个事务中批量写入
+3. 插件卸载（loader.close()）与进程退出时写回剩余条目
+
+最近读写的值缓存在内存中，重复读取不访问数据库。所有数据库操作在一个专用线程中执行，
+不阻塞事件循环。数据库路径默认为 data/js_store.db，可用环境变量 MAI_JS_STORE 修改。
+"""
+
+import asyncio
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("mai_js_bridge")
+
+# 数据库路径的环境变量
+STORE_PATH_ENV = "MAI_JS_STORE"
+
+_DEFAULT_PATH = Path("data") / "js_store.db"
+
+# 首次写入后多久批量写回（秒）
+FLUSH_DELAY = 0.5
+
+# 待写条目达到该数量时立即写回
+FLUSH_BATCH = 256
+
+# 内存中缓存的值的数量上限
+_MEMORY_ENTRIES = 4096
+
+# 单个值序列化后的大小上限（字节）
+MAX_VALUE_BYTES = 1024 * 1024
+
+# keys() 最多返回的键数
+MAX_KEYS = 1000
+
+_Key = Tuple[str, str]
+
+
+class KvStore:
+    """
+    持久化键值存储（进程内共享一个实例，只在事件循环线程中调用异步方法）。
+
+    值以 JSON 文本保存，读取时重新解析，调用方修改返回值不会影响存储的内容。
+
+    Args:
+        path: SQLite 数据库文件路径
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mai-js-store")
+        self._dirty: Dict[_Key, Optional[str]] = {}       # 待写条目，None 表示删除
+        self._flushing: Dict[_Key, Optional[str]] = {}    # 正在写入数据库的条目
+        self._memory: "OrderedDict[_Key, Optional[str]]" = OrderedDict()   # 读缓存，None 表示不存在
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self.reads = 0
+        self.writes = 0
+        self.flushes = 0
+
+    # ── 读写 ──────────────────────────────────────────────────────────────────
+
+    async def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        text = await self._read(namespace, str(key))
+        return json.loads(text) if text is not None else default
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        text = json.dumps(value, ensure_ascii=False)
+        if len(text.encode("utf-8")) > MAX_VALUE_BYTES:
+            raise ValueError(f"值超过 {MAX_VALUE_BYTES // 1024}KB：{key}")
+        self._write((namespace, str(key)), text)
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._write((namespace, str(key)), None)
+
+    async def incr(self, namespace: str, key: str, by: float = 1) -> float:
+        """把数值加上 by 并返回新值（不存在时从 0 开始）；读取与写入之间没有 await，不会丢失并发的累加"""
+        current = await self.get(namespace, key, 0)
+        if not isinstance(current, (int, float)) or isinstance(current, bool):
+            raise TypeError(f"{key} 的值不是数字，无法累加")
+        value = current + by
+        self.set(namespace, key, value)
+        return value
+
+    async def keys(self, namespace: str, prefix: str = "") -> List[str]:
+        """命名空间中以 prefix 开头的键（按字典序，最多 MAX_KEYS 个）"""
+        prefix = str(prefix)
+        stored = await self._run(self._db_keys, namespace, prefix)
+        found = set(stored)
+        for pending in (self._flushing, self._dirty):   # 后者覆盖前者
+            for (ns, key), text in pending.items():
+                if ns == namespace and key.startswith(prefix):
+                    if text is None:
+                        found.discard(key)
+                    else:
+                        found.add(key)
+        return sorted(found)[:MAX_KEYS]
+
+    async def flush(self) -> None:
+        """立即写回所有待写条目（写入失败时保留在待写队列中，稍后重试）"""
+        self._drop_stale()
+        if self._flush_task is not None:
+            await asyncio.shield(self._flush_task)
+        self._start_flush()
+        if self._flush_task is not None:
+            await asyncio.shield(self._flush_task)
+
+    def flush_sync(self) -> None:
+        """进程退出时同步写回（此时事件循环可能已经关闭）"""
+        pending = {**self._flushing, **self._dirty}
+        if not pending:
+            return
+        try:
+            self._db_write(list(pending.items()))
+            self._dirty.clear()
+            self._flushing = {}
+        except Exception as e:
+            logger.error(f"[JsBridge] 退出时写入 ctx.store 失败，丢失 {len(pending)} 条数据：{e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "reads": self.reads,
+            "writes": self.writes,
+            "flushes": self.flushes,
+            "pending": len(self._dirty) + len(self._flushing),
+        }
+
+    # ── 内部 ──────────────────────────────────────────────────────────────────
+
+    async def _read(self, namespace: str, key: str) -> Optional[str]:
+        k = (namespace, key)
+        for pending in (self._dirty, self._flushing):
+            if k in pending:
+                return pending[k]
+        if k in self._memory:
+            self._memory.move_to_end(k)
+            return self._memory[k]
+        self.reads += 1
+        text = await self._run(self._db_get, namespace, key)
+        # 读取期间可能有新的写入，以写入为准
+        for pending in (self._dirty, self._flushing):
+            if k in pending:
+                return pending[k]
+        self._remember(k, text)
+        return text
+
+    def _write(self, k: _Key, text: Optional[str]) -> None:
+        self._drop_stale()
+        self.writes += 1
+        self._dirty[k] = text
+        self._remember(k, text)
+        if len(self._dirty) >= FLUSH_BATCH:
+            self._start_flush()
+        elif self._flush_handle is None and self._flush_task is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(FLUSH_DELAY, self._start_flush)
+            self._flush_loop = asyncio.get_running_loop()
+
+    def _drop_stale(self) -> None:
+        """上一个事件循环已经结束（例如测试中多次 asyncio.run）时，丢弃它的定时器与任务，待写条目保留"""
+        loop = asyncio.get_running_loop()
+        if self._flush_task is not None and self._flush_task.get_loop() is not loop:
+            self._dirty = {**self._flushing, **self._dirty}
+            self._flushing = {}
+            self._flush_task = None
+        if self._flush_handle is not None and self._flush_loop is not loop:
+            self._flush_handle = None
+
+    def _remember(self, k: _Key, text: Optional[str]) -> None:
+        self._memory[k] = text
+        self._memory.move_to_end(k)
+        if len(self._memory) > _MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    def _start_flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is not None or not self._dirty:
+            return
+        self._flushing, self._dirty = self._dirty, {}
+        self._flush_task = asyncio.get_running_loop().create_task(self._flush_batch())
+
+    async def _flush_batch(self) -> None:
+        batch = self._flushing
+        try:
+            await self._run(self._db_write, list(batch.items()))
+            self.flushes += 1
+        except Exception as e:
+            logger.error(f"[JsBridge] ctx.store 写入 {self.path} 失败，{len(batch)} 条数据将在下次写回时重试：{e}")
+            for k, text in batch.items():
+                self._dirty.setdefault(k, text)
+        finally:
+            self._flushing = {}
+            self._flush_task = None
+        if self._dirty and self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(FLUSH_DELAY, self._start_flush)
+            self._flush_loop = asyncio.get_running_loop()
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # ── SQLite（只在专用线程或退出时调用）─────────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _db_get(self, namespace: str, key: str) -> Optional[str]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _db_keys(self, namespace: str, prefix: str) -> List[str]:
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT key FROM kv WHERE namespace = ? AND substr(key, 1, ?) = ? ORDER BY key LIMIT ?",
+                (namespace, len(prefix), prefix, MAX_KEYS),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _db_write(self, items: List[Tuple[_Key, Optional[str]]]) -> None:
+        upserts = [(ns, key, text) for (ns, key), text in items if text is not None]
+        deletes = [(ns, key) for (ns, key), text in items if text is None]
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                if upserts:
+                    conn.executemany("INSERT OR REPLACE INTO kv (namespace, key, value) VALUES (?, ?, ?)", upserts)
+                if deletes:
+                    conn.executemany("DELETE FROM kv WHERE namespace = ? AND key = ?", deletes)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+
+_kv_store: Optional[KvStore] = None
+
+
+def get_kv_store() -> KvStore:
+    """返回进程内共享的 KvStore（首次调用时按 MAI_JS_STORE 确定数据库路径）"""
+    global _kv_store
+    if _kv_store is None:
+        path = Path(os.environ.get(STORE_PATH_ENV) or _DEFAULT_PATH).resolve()
+        _kv_store = KvStore(path)
+        atexit.register(_kv_store.flush_sync)
+    return _kv_store
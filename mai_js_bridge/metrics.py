@@ -0,0 +1,104 @@
+"""
+JS 桥接的延迟与吞吐指标
+
+Histogram 用固定桶统计分布（总数、均值、最大值、各桶计数），并保留最近
+一段样本计算 p50 / p95 / p99；BridgeMetrics 按指标名与组件名归集多个直方图，
+JsBridgeLoader.stats() 通过它输出快照。
+"""
+
+from collections import deque
+from typing import Deque, Dict, Optional, Sequence
+
+# 毫秒类指标的桶上界
+MS_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+# 字节类指标的桶上界
+BYTE_BOUNDS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# 计算分位数时保留的最近样本数
+_RECENT_SAMPLES = 1024
+
+
+class Histogram:
+    """单个指标的分布（只在事件循环线程中更新，无需加锁）"""
+
+    def __init__(self, bounds: Sequence[float] = MS_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)   # 最后一个桶为 > 最大上界
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent: Deque[float] = deque(maxlen=_RECENT_SAMPLES)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self._recent.append(value)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """最近样本的 q 分位数（0 < q < 1），没有样本时为 None"""
+        if not self._recent:
+            return None
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> Dict:
+        labels = [f"<={b:g}" for b in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max if self.count else None,
+            "buckets": {label: n for label, n in zip(labels, self.buckets) if n},
+        }
+
+
+class BridgeMetrics:
+    """按名称归集的直方图：全局指标与每个组件各自的指标"""
+
+    def __init__(self):
+        self._timings: Dict[str, Histogram] = {}
+        self._components: Dict[str, Dict[str, Histogram]] = {}
+        self._component_calls: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _bounds_for(name: str) -> Sequence[float]:
+        return BYTE_BOUNDS if name.endswith("_bytes") else MS_BOUNDS
+
+    def observe(self, name: str, value: float, component: Optional[str] = None) -> None:
+        """记录一个样本；传入 component 时同时记入该组件的同名直方图"""
+        hist = self._timings.get(name)
+        if hist is None:
+            hist = self._timings[name] = Histogram(self._bounds_for(name))
+        hist.observe(value)
+        if component is not None:
+            per = self._components.setdefault(component, {})
+            if name not in per:
+                per[name] = Histogram(self._bounds_for(name))
+            per[name].observe(value)
+
+    def count_call(self, component: str, success: bool) -> None:
+        calls = self._component_calls.setdefault(component, {"calls": 0, "failures": 0})
+        calls["calls"] += 1
+        if not success:
+            calls["failures"] += 1
+
+    def snapshot(self) -> Dict:
+        components = {}
+        for name in sorted(set(self._components) | set(self._component_calls)):
+            components[name] = {
+                **self._component_calls.get(name, {"calls": 0, "failures": 0}),
+                **{k: h.snapshot() for k, h in self._components.get(name, {}).items()},
+            }
+        return {
+            "timings": {k: h.snapshot() for k, h in self._timings.items()},
+            "components": components,
+        }
@@ -0,0 +1,154 @@
+"""
+RegistrationCache - JS 插件注册信息的磁盘缓存
+
+MaiBot 每次启动都要为每个 JS 插件提取注册信息（启动 Node.js 导出，或对源码做正则匹配）。
+提取结果按插件路径保存在 .mai_cache/registrations.json 中，下次启动时：
+
+1. plugin.js 的大小与 mtime 都没变 → 直接使用缓存，只需一次 stat
+2. 大小或 mtime 变了但内容哈希相同（git checkout、touch 等）→ 使用缓存并更新 stat
+3. 内容变了 → 重新提取并写回缓存
+
+缓存目录默认为当前工作目录（MaiBot 根目录）下的 .mai_cache，可用环境变量
+MAI_JS_CACHE_DIR 修改；设为空字符串时不使用磁盘缓存。SDK 或桥接代码更新后整个缓存失效。
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("mai_js_bridge")
+
+# 缓存目录的环境变量
+CACHE_DIR_ENV = "MAI_JS_CACHE_DIR"
+
+_CACHE_FILE = "registrations.json"
+
+# 缓存文件格式版本
+_FORMAT_VERSION = 1
+
+# 提取结果取决于这些文件：任何一个变化都使整个缓存失效
+_CODE_FILES = (
+    Path(__file__).parent / "bridge.py",
+    Path(__file__).parent / "sdk" / "mai-sdk.js",
+    Path(__file__).parent / "sdk" / "mai-runner.js",
+)
+
+
+def content_digest(content: str) -> str:
+    """插件源码的 SHA-256（十六进制）"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _code_stamp() -> str:
+    digest = hashlib.sha256()
+    for file in _CODE_FILES:
+        try:
+            digest.update(file.read_bytes())
+        except OSError:
+            pass
+    return digest.hexdigest()[:16]
+
+
+class RegistrationCache:
+    """
+    注册信息缓存（进程内共享一个实例，只在加载插件时使用）。
+
+    Args:
+        path: 缓存文件路径，None 表示只在内存中缓存
+    """
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self._code = _code_stamp()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self._read()
+
+    def get(
+        self,
+        js_file: str,
+        stamp: Tuple[int, int],
+        parser: str,
+        digest: Optional[str] = None,
+    ) -> Optional[Dict]:
+        """
+        查找 js_file 的注册信息；stamp 为 (mtime_ns, size)。
+
+        不传 digest 时只按 stat 匹配；传入 digest 时 stat 不同但内容相同也算命中
+        （并更新缓存中的 stat）。parser 为请求的提取方式（registration_parser），与 put 时一致；
+        Node.js 不可用或插件加载失败而退回正则解析的结果也以请求的方式保存。
+        """
+        entry = self._entries.get(js_file)
+        if entry is None or entry.get("parser") != parser:
+            if digest is not None:
+                self.misses += 1
+            return None
+        if [entry.get("mtime_ns"), entry.get("size")] == list(stamp):
+            self.hits += 1
+            return entry["registrations"]
+        if digest is None:
+            return None
+        if entry.get("sha256") != digest:
+            self.misses += 1
+            return None
+        entry["mtime_ns"], entry["size"] = stamp
+        self._write()
+        self.hits += 1
+        return entry["registrations"]
+
+    def put(self, js_file: str, stamp: Tuple[int, int], digest: str, parser: str, registrations: Dict) -> None:
+        """保存提取结果并写回磁盘（parser 为请求的提取方式，见 get）"""
+        self._entries[js_file] = {
+            "mtime_ns": stamp[0],
+            "size": stamp[1],
+            "sha256": digest,
+            "parser": parser,
+            "registrations": registrations,
+        }
+        self._write()
+
+    # ── 内部 ──────────────────────────────────────────────────────────────────
+
+    def _read(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"[JsBridge] 注册信息缓存无法读取，将重新生成：{e}")
+            return
+        if data.get("version") == _FORMAT_VERSION and data.get("code") == self._code:
+            self._entries = data.get("entries") or {}
+
+    def _write(self) -> None:
+        if self.path is None:
+            return
+        data = {"version": _FORMAT_VERSION, "code": self._code, "entries": self._entries}
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)   # 原子替换，多个 MaiBot 进程同时写也不会得到半个文件
+        except OSError as e:
+            logger.warning(f"[JsBridge] 无法写入注册信息缓存 {self.path}，本次只在内存中缓存：{e}")
+            self.path = None
+
+
+_registration_cache: Optional[RegistrationCache] = None
+
+
+def get_registration_cache() -> RegistrationCache:
+    """返回进程内共享的 RegistrationCache（首次调用时按 MAI_JS_CACHE_DIR 读取缓存文件）"""
+    global _registration_cache
+    if _registration_cache is None:
+        cache_dir = os.environ.get(CACHE_DIR_ENV, ".mai_cache")
+        path = Path(cache_dir).resolve() / _CACHE_FILE if cache_dir else None
+        _registration_cache = RegistrationCache(path)
+    return _registration_cache
@@ -0,0 +1,70 @@
+"""
+ResultCache - 确定性 JS 组件的执行结果缓存
+
+组件在配置对象中声明 cache: { ttl, maxEntries } 后，Python 侧按
+组件名 + 规范化后的上下文（matched_groups / action_data）缓存执行产生的消息，
+命中时直接重放，不经过 Node.js。
+
+只适合输出只取决于输入的组件（单位换算、查表等）；
+依赖时间、随机数或外部数据的组件不要开启。
+"""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# maxEntries 未声明时的默认容量
+DEFAULT_MAX_ENTRIES = 256
+
+
+class ResultCache:
+    """
+    带 TTL 的 LRU 缓存（单个组件独享，只在事件循环线程中使用，无需加锁）。
+
+    Args:
+        ttl:         过期时间（秒），None 或 0 表示不过期
+        max_entries: 最多缓存的条目数，超出时淘汰最久未使用的条目
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl or None
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(context_data: Dict[str, Any]) -> str:
+        """只取决定输出的输入：正则捕获组与 Action 参数（键排序，与字典顺序无关）"""
+        return json.dumps(
+            [context_data.get("matched_groups") or [], context_data.get("action_data") or {}],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if expires is None or expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,120 @@
+"""
+Scheduler - mai.schedule() 定时任务的调度
+
+每个定时任务对应一个 asyncio 任务，按固定频率（every）触发，不随执行耗时漂移；
+每次触发前额外等待 0~jitter 的随机时间，避免多个插件的任务在同一时刻一起运行。
+
+重叠保护：上一次运行尚未结束时跳过本次触发（不排队、不并发），计入 skipped。
+事件循环被长时间阻塞后也不会补跑错过的触发。
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger("mai_js_bridge")
+
+
+class _ScheduledTask:
+    __slots__ = ("name", "every", "jitter", "immediate", "running", "runs", "failures", "skipped", "last_ms")
+
+    def __init__(self, name: str, every: float, jitter: float, immediate: bool):
+        self.name = name
+        self.every = every
+        self.jitter = jitter
+        self.immediate = immediate
+        self.running: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_ms: Optional[float] = None
+
+
+class Scheduler:
+    """
+    单个插件的定时任务调度器（只在事件循环线程中使用）。
+
+    Args:
+        run:   以任务名调用，执行一次任务并返回是否成功
+        label: 日志中使用的名称（通常是插件名）
+    """
+
+    def __init__(self, run: Callable[[str], Awaitable[bool]], label: str = ""):
+        self._run = run
+        self.label = label
+        self._tasks: Dict[str, _ScheduledTask] = {}
+        self._loops: List[asyncio.Task] = []
+
+    def add(self, name: str, every: float, jitter: float = 0.0, immediate: bool = True) -> None:
+        """添加任务（秒）；必须在 start() 之前调用"""
+        if every <= 0:
+            raise ValueError(f"定时任务 {name} 的间隔必须大于 0")
+        self._tasks[name] = _ScheduledTask(name, every, max(0.0, jitter), immediate)
+
+    @property
+    def started(self) -> bool:
+        return bool(self._loops)
+
+    def start(self) -> None:
+        """在正在运行的事件循环中启动所有任务"""
+        if self._loops:
+            return
+        loop = asyncio.get_running_loop()
+        self._loops = [loop.create_task(self._loop(task)) for task in self._tasks.values()]
+
+    async def stop(self) -> None:
+        """停止调度，并取消正在运行的任务"""
+        loops, self._loops = self._loops, []
+        pending = loops + [t.running for t in self._tasks.values() if t.running is not None]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Dict]:
+        """每个任务的 runs / failures / skipped 累计次数、last_ms（上次耗时）与 running"""
+        return {
+            task.name: {
+                "runs": task.runs,
+                "failures": task.failures,
+                "skipped": task.skipped,
+                "last_ms": task.last_ms,
+                "running": task.running is not None,
+            }
+            for task in self._tasks.values()
+        }
+
+    # ── 内部 ──────────────────────────────────────────────────────────────────
+
+    async def _loop(self, task: _ScheduledTask) -> None:
+        loop = asyncio.get_running_loop()
+        due = loop.time() + (0.0 if task.immediate else task.every)
+        while True:
+            delay = due - loop.time() + (random.uniform(0, task.jitter) if task.jitter else 0.0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            due += task.every
+            if due < loop.time():
+                due = loop.time() + task.every
+            if task.running is not None:
+                task.skipped += 1
+                logger.debug(f"[JsBridge] {self.label}.{task.name} 上一次运行尚未结束，跳过本次触发")
+                continue
+            task.running = loop.create_task(self._fire(task))
+
+    async def _fire(self, task: _ScheduledTask) -> None:
+        started = time.monotonic()
+        success = False
+        try:
+            success = await self._run(task.name)
+        except asyncio.CancelledError:
+            task.running = None
+            raise
+        except Exception as e:
+            logger.error(f"[JsBridge] 定时任务 {self.label}.{task.name} 运行失败：{e}")
+        task.running = None
+        task.runs += 1
+        task.last_ms = round((time.monotonic() - started) * 1000, 3)
+        if not success:
+            task.failures += 1
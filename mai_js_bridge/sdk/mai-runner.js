@@ -0,0 +1,486 @@
+/**
+ * mai-runner.js - Node.js 执行进程入口（固定脚本，不随请求生成）
+ *
+ * 由 Python 侧的 JsWorker / _run_js_execute 启动：
+ *   node mai-runner.js <plugin.js> [--isolate] [--blob-dir=<dir>]
+ *   node mai-runner.js --host            （共享宿主：不预先加载插件）
+ *   node mai-runner.js <plugin.js> --describe   （只输出注册信息后退出）
+ *
+ * 启动时只加载一次 SDK 与插件，之后通过 stdin/stdout 上的 JSON Lines
+ * 协议（每行一个 JSON 帧）接收执行请求。常驻工作进程会反复接收请求；
+ * 一次性执行（spawn 模式）则写入一个请求帧后立即关闭 stdin。
+ *
+ *   Python → Node
+ *     { id, type: 'execute', component, context, plugin?, profile? }
+ *                                                   执行指定组件（plugin 仅 --host；profile 见下）
+ *     { id, type: 'ping', plugin? }                 健康检查（--host 时顺便加载 plugin）
+ *     { type: 'config', version, config, plugin? }  插件配置（缓存在进程内，执行帧只带 config_version）
+ *     { type: 'rpc_result', call, ok, value, error } 宿主调用的应答
+ *
+ *   Node → Python
+ *     { type: 'ready', pid, version }               插件加载完成
+ *     { type: 'fatal', error }                      插件加载失败（随后退出）
+ *     { id, type: 'message', message }              执行中产生的一条消息（按产生顺序流式发送）
+ *     { id, type: 'message', message, blob: n }     图片 / 表情包：帧头之后紧跟 n 个原始字节
+ *     { id, type: 'message', message, blob, blob_file }  同上，载荷在 --blob-dir 下的文件中
+ *     { id, type: 'result', result }                执行结果 {success, log, messages, version, heapMb, executeMs, profile?}
+ *     { id, type: 'rpc', call, method, args }       执行中向 Python 宿主发起调用（按 call 对应应答）
+ *     { id, type: 'pong' }                          健康检查应答
+ *     { id, type: 'error', error }                  请求无法处理
+ *
+ * --host（shared 模式）：多个插件共用同一进程，execute 帧额外携带 plugin 字段
+ * （插件绝对路径）。每个插件首次使用时加载到自己的 vm 上下文中并常驻，
+ * 插件之间的全局变量互不可见，同一插件跨调用保留状态。
+ *
+ * --isolate（isolated 模式）：进程作为预热好的"母体"，启动时只编译一次插件，
+ * 每次执行都在全新的 vm 上下文中运行插件顶层代码并执行组件，调用之间不共享
+ * 全局变量与插件目录内模块的状态（内置模块与 node_modules 依赖仍在进程内共享）。
+ * vm 上下文只隔离状态，不是安全沙箱。
+ *
+ * 热重载：每次执行前检查 plugin.js 的 mtime/大小，变化时清除 require.cache
+ * 并重新注册，版本号 +1。进行中的调用继续使用旧版本的注册表，
+ * 新调用使用新版本；重载失败时保留旧版本。result 帧附带所用的 version。
+ *
+ * --describe：加载插件后输出一帧 { type: 'describe', registrations } 并退出，
+ * registrations 的格式与 Python 侧 _parse_js_registrations 相同。Python 侧据此
+ * 生成组件类，比在源码上做正则匹配更准确（嵌套对象、模板字符串、注释、打包产物）。
+ *
+ * 性能分析：execute 帧带 profile: 'cpu' 时，通过 inspector 只对这一次执行采集
+ * V8 CPU profile；'heap' 时在执行结束后写出堆快照。文件写在插件旁边
+ * （<插件名>.<组件名>.<时间>.<pid>.cpuprofile / .heapsnapshot），路径放在 result.profile。
+ * 同一进程内 CPU profiler 只有一个，已在采集时其他执行不再分析。
+ *
+ * stdin 关闭后，等所有进行中的请求完成再自然退出。
+ */
+
+'use strict';
+
+const Module = require('module');
+
+// Node.js 22.1+：启用 V8 磁盘编译缓存，SDK 与插件的编译结果可跨进程复用
+if (typeof Module.enableCompileCache === 'function') {
+  Module.enableCompileCache();
+}
+
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+const util = require('util');
+const vm = require('vm');
+const sdk = require('./mai-sdk.js');
+
+// stdout 专用于协议帧，console 输出一律转到 stderr，避免污染协议
+for (const level of ['log', 'info', 'debug', 'warn']) {
+  console[level] = (...args) => process.stderr.write(util.format(...args) + '\n');
+}
+
+function send(frame) {
+  process.stdout.write(JSON.stringify(frame) + '\n');
+}
+
+
+// ─── 二进制载荷（图片 / 表情包）───────────────────────────────────────────────
+
+// 不小于该长度的 base64 字符串、以及所有 Buffer / TypedArray 以二进制帧传输
+const BLOB_MIN_BYTES = 64 * 1024;
+// 指定 --blob-dir 时，不小于该长度的载荷改为写入该目录（如 /dev/shm）下的文件
+const BLOB_FILE_MIN_BYTES = 1024 * 1024;
+
+const blobDirArg = process.argv.find((a) => a.startsWith('--blob-dir='));
+const blobDir = blobDirArg ? blobDirArg.slice('--blob-dir='.length) : null;
+let blobSeq = 0;
+
+/**
+ * 发送一条消息帧。图片 / 表情包载荷不进 JSON：帧头带 blob（字节数）与 encoding
+ * （'base64' = 载荷是 base64 文本，'binary' = 原始字节），紧跟其后写出 blob 个字节；
+ * 写入文件时帧头改带 blob_file，不再跟随字节。
+ */
+function sendMessage(id, message) {
+  const content = message.content;
+  const binary = ArrayBuffer.isView(content);
+  if (message.type === 'text' || !(binary || (typeof content === 'string' && content.length >= BLOB_MIN_BYTES))) {
+    send({ id, type: 'message', message });
+    return;
+  }
+
+  // base64 只含 ASCII，latin1 按字节一一对应，省去 UTF-8 编码
+  const data = binary
+    ? Buffer.from(content.buffer, content.byteOffset, content.byteLength)
+    : Buffer.from(content, 'latin1');
+  const header = { id, type: 'message', message: { type: message.type, encoding: binary ? 'binary' : 'base64' }, blob: data.length };
+
+  if (blobDir && data.length >= BLOB_FILE_MIN_BYTES) {
+    const file = path.join(blobDir, `mai-blob-${process.pid}-${++blobSeq}.bin`);
+    fs.writeFileSync(file, data);
+    send({ ...header, blob_file: file });
+    return;
+  }
+  process.stdout.write(JSON.stringify(header) + '\n');
+  process.stdout.write(data);
+}
+
+
+// ─── 加载插件（带版本的注册表）──────────────────────────────────────────────
+
+const args = process.argv.slice(2);
+const isolate = args.includes('--isolate');
+const host = args.includes('--host');
+const describe = args.includes('--describe');
+const pluginArg = args.find((a) => !a.startsWith('--'));
+const pluginPath = pluginArg ? path.resolve(pluginArg) : null;
+
+function statStamp(file) {
+  const st = fs.statSync(file);
+  return `${st.mtimeMs}:${st.size}`;
+}
+
+/** 插件所在目录（带结尾分隔符），目录内的模块随插件一起重载 / 隔离 */
+function pluginDirOf(file) {
+  return path.dirname(file) + path.sep;
+}
+
+/** 清除插件目录下（node_modules 除外）的模块缓存，再重新 require 插件 */
+function loadPlugin(file) {
+  const dir = pluginDirOf(file);
+  for (const key of Object.keys(require.cache)) {
+    if (key.startsWith(dir) && !key.includes(`${path.sep}node_modules${path.sep}`)) {
+      delete require.cache[key];
+    }
+  }
+  const stamp = statStamp(file);
+  const registrations = sdk.createRegistrar();
+  global.mai = registrations.mai;
+  require(file);
+  return { stamp, registrations };
+}
+
+
+// ─── vm 上下文（--isolate / --host）──────────────────────────────────────────
+
+// 编译结果按文件缓存（vm.Script 与上下文无关，可在任意上下文中运行）
+const scriptCache = new Map();
+
+// 复制到每个 vm 上下文中的宿主全局对象
+const SANDBOX_GLOBALS = [
+  'console', 'process', 'Buffer', 'URL', 'URLSearchParams', 'TextEncoder', 'TextDecoder',
+  'setTimeout', 'clearTimeout', 'setInterval', 'clearInterval', 'setImmediate', 'clearImmediate',
+  'queueMicrotask', 'structuredClone', 'AbortController', 'AbortSignal',
+  'fetch', 'Headers', 'Request', 'Response', 'FormData', 'Blob',
+];
+
+function compileFile(filename) {
+  const stamp = statStamp(filename);
+  const hit = scriptCache.get(filename);
+  if (hit && hit.stamp === stamp) return hit.script;
+  const script = new vm.Script(Module.wrap(fs.readFileSync(filename, 'utf8')), { filename });
+  scriptCache.set(filename, { stamp, script });
+  return script;
+}
+
+/** 在给定上下文中以 CommonJS 方式运行已编译的脚本，modules 为该上下文私有的模块缓存 */
+function runModule(script, filename, scope) {
+  const module = { exports: {}, filename, id: filename, loaded: false };
+  scope.modules.set(filename, module);
+  const dirname = path.dirname(filename);
+  const fn = script.runInContext(scope.context);
+  fn.call(module.exports, module.exports, makeRequire(dirname, scope), module, filename, dirname);
+  module.loaded = true;
+  return module.exports;
+}
+
+/** 插件目录内的相对路径模块在当前上下文中执行；其余模块交给宿主 require */
+function makeRequire(dirname, scope) {
+  const hostRequire = Module.createRequire(path.join(dirname, '__mai_vm__.js'));
+  const scopedRequire = (id) => {
+    if (id.startsWith('.') || path.isAbsolute(id)) {
+      const resolved = hostRequire.resolve(id);
+      if (resolved.endsWith('.json')) return JSON.parse(fs.readFileSync(resolved, 'utf8'));
+      if (resolved.startsWith(scope.dir) && /\.c?js$/.test(resolved)) {
+        const cached = scope.modules.get(resolved);
+        return cached ? cached.exports : runModule(compileFile(resolved), resolved, scope);
+      }
+    }
+    return hostRequire(id);
+  };
+  scopedRequire.resolve = hostRequire.resolve;
+  return scopedRequire;
+}
+
+/** 创建全新的 vm 上下文并运行插件顶层代码，返回该上下文的注册表 */
+function instantiate(script, file) {
+  const sandbox = {};
+  for (const name of SANDBOX_GLOBALS) {
+    if (globalThis[name] !== undefined) sandbox[name] = globalThis[name];
+  }
+  // --isolate 每次执行都重新实例化：ctx.cache 等进程内状态也随之新建，调用间不共享
+  const registrations = sdk.createRegistrar({ isolated: isolate });
+  sandbox.mai = registrations.mai;
+  sandbox.global = sandbox;
+  const scope = { context: vm.createContext(sandbox), modules: new Map(), dir: pluginDirOf(file) };
+  runModule(script, file, scope);
+  return registrations;
+}
+
+/** --isolate：编译插件并试运行一次，确认顶层代码可以正常加载；每次执行再单独实例化 */
+function compilePlugin(file) {
+  const stamp = statStamp(file);
+  const script = compileFile(file);
+  instantiate(script, file);
+  return { stamp, script };
+}
+
+/** --host：每个插件常驻在自己的 vm 上下文中，插件之间互不可见，同一插件跨调用保留状态 */
+function contextPlugin(file) {
+  const stamp = statStamp(file);
+  return { stamp, registrations: instantiate(compileFile(file), file) };
+}
+
+const load = host ? contextPlugin : isolate ? compilePlugin : loadPlugin;
+
+// 插件路径 → { version, stamp, failedStamp, registrations | script }
+const plugins = new Map();
+
+if (pluginPath) {
+  try {
+    plugins.set(pluginPath, { version: 1, failedStamp: null, ...load(pluginPath) });
+  } catch (err) {
+    send({ type: 'fatal', error: String((err && err.stack) || err) });
+    process.exit(1);
+  }
+} else if (!host) {
+  send({ type: 'fatal', error: '缺少插件路径（共享宿主需使用 --host）' });
+  process.exit(1);
+}
+
+/** 返回插件当前版本的注册表；首次使用时加载，文件变化时先热重载 */
+function currentPlugin(file) {
+  let entry = plugins.get(file);
+  if (!entry) {
+    // 仅 --host：按需加载，失败时抛出，由本次请求报告
+    entry = { version: 1, failedStamp: null, ...load(file) };
+    plugins.set(file, entry);
+    return entry;
+  }
+
+  let stamp;
+  try {
+    stamp = statStamp(file);
+  } catch (err) {
+    return entry;   // 文件暂时不可读（例如编辑器正在保存），沿用当前版本
+  }
+  if (stamp === entry.stamp || stamp === entry.failedStamp) return entry;
+
+  try {
+    const loaded = load(file);
+    entry = { version: entry.version + 1, failedStamp: null, ...loaded };
+    plugins.set(file, entry);
+    process.stderr.write(`[mai-runner] ${path.basename(file)} 已热重载（version=${entry.version}）\n`);
+  } catch (err) {
+    entry.failedStamp = stamp;
+    if (load === loadPlugin) global.mai = entry.registrations.mai;
+    process.stderr.write(`[mai-runner] 热重载失败，继续使用 version=${entry.version}：${(err && err.stack) || err}\n`);
+  }
+  return entry;
+}
+
+
+if (describe) {
+  // 写完再退出：Windows 上写入管道是异步的，直接 exit 可能丢失输出
+  const registrations = sdk.describeRegistrations(plugins.get(pluginPath).registrations);
+  process.stdout.write(JSON.stringify({ type: 'describe', registrations }) + '\n', () => process.exit(0));
+}
+
+
+// ─── 宿主调用（RPC）──────────────────────────────────────────────────────────
+
+const rpcCalls = new Map();
+let rpcSeq = 0;
+let stdinClosed = false;
+
+/** 为某个请求创建 rpc(method, args) 函数，应答按 call 编号对应 */
+function makeRpc(reqId) {
+  return (method, args) => new Promise((resolve, reject) => {
+    if (stdinClosed) {
+      reject(new Error('宿主连接已关闭，无法调用宿主 API'));
+      return;
+    }
+    const call = ++rpcSeq;
+    rpcCalls.set(call, { resolve, reject });
+    send({ id: reqId, type: 'rpc', call, method, args });
+  });
+}
+
+function settleRpc(frame) {
+  const pending = rpcCalls.get(frame.call);
+  if (!pending) return;
+  rpcCalls.delete(frame.call);
+  if (frame.ok) pending.resolve(frame.value);
+  else pending.reject(new Error(frame.error || '宿主调用失败'));
+}
+
+
+// ─── 插件配置 ─────────────────────────────────────────────────────────────────
+
+// 插件路径 → 冻结后的配置对象（Python 侧只在版本变化时发送 config 帧）
+const configs = new Map();
+
+function deepFreeze(value) {
+  if (value && typeof value === 'object' && !Object.isFrozen(value)) {
+    Object.freeze(value);
+    for (const child of Object.values(value)) deepFreeze(child);
+  }
+  return value;
+}
+
+
+// ─── 按需性能分析 ─────────────────────────────────────────────────────────────
+
+let inspectorSession = null;
+let cpuProfiling = false;
+
+function inspectorPost(method, params) {
+  return new Promise((resolve, reject) => {
+    inspectorSession.post(method, params || {}, (err, res) => (err ? reject(err) : resolve(res)));
+  });
+}
+
+function profileFile(file, component, ext) {
+  const stamp = new Date().toISOString().replace(/[-:.]/g, '').replace('T', '-').slice(0, 18);
+  const base = path.basename(file, path.extname(file));
+  const safe = String(component).replace(/[^\w.-]/g, '_');
+  return path.join(path.dirname(file), `${base}.${safe}.${stamp}.${process.pid}.${ext}`);
+}
+
+/** 执行 run()，按 kind 采集 CPU profile 或堆快照；返回 [结果, 文件路径或 null] */
+async function profiled(kind, file, component, run) {
+  if (kind === 'heap') {
+    const result = await run();
+    try {
+      return [result, require('v8').writeHeapSnapshot(profileFile(file, component, 'heapsnapshot'))];
+    } catch (err) {
+      process.stderr.write(`[mai-runner] 写出堆快照失败：${err}\n`);
+      return [result, null];
+    }
+  }
+  if (kind !== 'cpu' || cpuProfiling) return [await run(), null];
+
+  cpuProfiling = true;
+  try {
+    if (!inspectorSession) {
+      const inspector = require('inspector');
+      inspectorSession = new inspector.Session();
+      inspectorSession.connect();
+      await inspectorPost('Profiler.enable');
+      // 组件执行通常只有几毫秒，默认 1ms 的采样间隔太粗
+      await inspectorPost('Profiler.setSamplingInterval', { interval: 100 });
+    }
+    await inspectorPost('Profiler.start');
+  } catch (err) {
+    cpuProfiling = false;
+    process.stderr.write(`[mai-runner] 无法启动 CPU profiler：${err}\n`);
+    return [await run(), null];
+  }
+  let result;
+  let error = null;
+  try {
+    result = await run();
+  } catch (err) {
+    error = err;
+  }
+  let out = null;
+  try {
+    const { profile } = await inspectorPost('Profiler.stop');
+    out = profileFile(file, component, 'cpuprofile');
+    fs.writeFileSync(out, JSON.stringify(profile));
+  } catch (err) {
+    out = null;
+    process.stderr.write(`[mai-runner] 写出 CPU profile 失败：${err}\n`);
+  } finally {
+    cpuProfiling = false;
+  }
+  if (error) throw error;
+  return [result, out];
+}
+
+
+// ─── 请求处理 ─────────────────────────────────────────────────────────────────
+
+async function handle(frame) {
+  switch (frame.type) {
+    case 'execute': {
+      const emit = (message) => sendMessage(frame.id, message);
+      const rpc = makeRpc(frame.id);
+      const file = host && frame.plugin ? path.resolve(frame.plugin) : pluginPath;
+      let plugin;
+      let registrations;
+      try {
+        if (!file) throw new Error('请求未指定插件路径');
+        plugin = currentPlugin(file);
+        registrations = isolate ? instantiate(plugin.script, file) : plugin.registrations;
+      } catch (err) {
+        send({ id: frame.id, type: 'result', result: { success: false, log: `插件加载失败：${err}`, messages: [] } });
+        break;
+      }
+      const context = frame.context || {};
+      // 配置在所有调用间共享，已冻结，组件无法修改
+      if (frame.config_version !== undefined && configs.has(file)) context.config = configs.get(file);
+      const run = () => sdk.executeComponent(registrations, frame.component, context, emit, rpc);
+      const [result, profile] = frame.profile ? await profiled(frame.profile, file, frame.component, run) : [await run(), null];
+      if (profile) result.profile = profile;
+      result.version = plugin.version;
+      // 执行后的堆占用（MB），Python 侧据此淘汰超出 maxMemoryMb 的工作进程
+      result.heapMb = Math.round(process.memoryUsage().heapUsed / 1048576);
+      send({ id: frame.id, type: 'result', result });
+      break;
+    }
+    case 'rpc_result':
+      settleRpc(frame);
+      break;
+    case 'config': {
+      const file = host && frame.plugin ? path.resolve(frame.plugin) : pluginPath;
+      configs.set(file, deepFreeze(frame.config || {}));
+      break;
+    }
+    case 'ping':
+      // 共享宿主的 ping 可以携带 plugin，顺便把该插件加载到上下文中（预热）
+      if (host && frame.plugin) {
+        try {
+          currentPlugin(path.resolve(frame.plugin));
+        } catch (err) {
+          send({ id: frame.id, type: 'error', error: `插件加载失败：${err}` });
+          break;
+        }
+      }
+      send({ id: frame.id, type: 'pong' });
+      break;
+    default:
+      send({ id: frame.id, type: 'error', error: `未知帧类型：${frame.type}` });
+  }
+}
+
+const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+
+rl.on('line', (line) => {
+  if (!line.trim()) return;
+  let frame;
+  try {
+    frame = JSON.parse(line);
+  } catch (err) {
+    process.stderr.write(`[mai-runner] 无法解析请求帧：${err.message}\n`);
+    return;
+  }
+  handle(frame).catch((err) => {
+    send({ id: frame.id, type: 'error', error: String(err) });
+  });
+});
+
+rl.on('close', () => {
+  // 没有宿主应答了：让等待中的调用立即失败，避免进程挂起
+  stdinClosed = true;
+  for (const pending of rpcCalls.values()) pending.reject(new Error('宿主连接已关闭'));
+  rpcCalls.clear();
+});
+
+if (!describe) {
+  send({ type: 'ready', pid: process.pid, version: pluginPath ? plugins.get(pluginPath).version : 0 });
+}
@@ -16,6 +16,12 @@
  *     await ctx.send(`🎲 ${Math.floor(Math.random() * max) + 1}`);
  *   });
  *
+ *   // 消息监听：只有命中关键词 / 正则的消息才会进入 JS
+ *   mai.event({ keywords: ['早安', '晚安'], execute: async (ctx) => { ... } });
+ *
+ *   // 定时任务：在常驻工作进程中定期刷新数据，命令直接读内存
+ *   mai.schedule({ every: '10m', execute: async (ctx) => { ... } });
+ *
  *   // 完整配置风格（推荐进阶用户）
  *   mai.command({
  *     name: 'ping',
@@ -34,10 +40,29 @@
 let _idCounter = 0;
 function uid() { return `auto_${++_idCounter}`; }
 
+/** 判断是否为正则（插件可能运行在独立的 vm 上下文中，不能用 instanceof） */
+function isRegExp(p) {
+  return Object.prototype.toString.call(p) === '[object RegExp]';
+}
+
+/** Buffer / TypedArray 原样保留（由运行脚本以二进制帧传输），其余转为字符串 */
+function binaryOrString(data) {
+  return ArrayBuffer.isView(data) ? data : String(data);
+}
+
+const DURATION_UNITS = { ms: 1, s: 1000, m: 60000, h: 3600000, d: 86400000 };
+
+/** 时长：毫秒数，或 "500ms" / "30s" / "10m" / "1h" / "1d" 形式的字符串；无效时返回 null */
+function parseDuration(value) {
+  if (typeof value === 'number') return Number.isFinite(value) && value >= 0 ? value : null;
+  const m = /^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h|d)?\s*$/.exec(String(value));
+  return m ? Number(m[1]) * DURATION_UNITS[m[2] || 'ms'] : null;
+}
+
 /** 将 string/RegExp/pattern 标准化为可存储的格式 */
 function normalizePattern(p) {
   if (!p) return null;
-  if (p instanceof RegExp) return p;
+  if (isRegExp(p)) return p;
   if (typeof p === 'string') {
     // 如果以 ^ 或 / 开头，当作正则字符串处理
     if (p.startsWith('/') || p.startsWith('^')) {
@@ -53,9 +78,24 @@ function normalizePattern(p) {
 
 // ─── 注册器 ──────────────────────────────────────────────────────────────────
 
-function createRegistrar() {
+/**
+ * @param options.isolated  为 true 时注册表自带一份全新的进程内状态（ctx.cache、ctx.fetch 响应缓存），
+ *                          不与其他执行共享；isolated 模式每次执行都新建注册表，因此调用间互不可见
+ */
+function createRegistrar(options = {}) {
   const commands = new Map();
   const actions  = new Map();
+  const events   = new Map();
+  const schedules = new Map();
+  // 未显式命名的对象配置（名字由 uid() 生成，每个进程不同，Python 侧无法注册）
+  const anonymous = new Set();
+
+  // 自动命名与 Python 侧 _parse_js_registrations 保持一致：
+  // mai.reply() → auto_reply_N，mai.command(pattern, fn) / mai.command(fn) → auto_cmd_N
+  let autoReplyIdx = 0;
+  let autoCmdIdx   = 0;
+  let autoEventIdx = 0;
+  let autoScheduleIdx = 0;
 
   const mai = {
 
@@ -74,7 +114,7 @@ function createRegistrar() {
       if (typeof patternOrConfig === 'function') {
         // mai.command(handler) - 无 pattern，匹配所有
         cfg = { execute: patternOrConfig };
-      } else if (typeof patternOrConfig === 'string' || patternOrConfig instanceof RegExp) {
+      } else if (typeof patternOrConfig === 'string' || isRegExp(patternOrConfig)) {
         // mai.command(pattern, handler)
         if (typeof handler !== 'function') throw new TypeError('mai.command(pattern, handler) 的第二个参数必须是函数');
         cfg = { pattern: patternOrConfig, execute: handler };
@@ -86,7 +126,11 @@ function createRegistrar() {
       }
 
       if (typeof cfg.execute !== 'function') throw new TypeError(`命令 ${cfg.name || '?'} 必须有 execute 函数`);
-      cfg.name = cfg.name || uid();
+      if (!cfg.name && cfg === patternOrConfig) {
+        cfg.name = uid();
+        anonymous.add(cfg.name);
+      }
+      cfg.name = cfg.name || `auto_cmd_${autoCmdIdx++}`;
       cfg.pattern = normalizePattern(cfg.pattern);
       commands.set(cfg.name, cfg);
     },
@@ -100,8 +144,9 @@ function createRegistrar() {
     reply(pattern, text, name) {
       if (typeof text !== 'string') throw new TypeError('mai.reply() 第二个参数必须是字符串');
       this.command({
-        name: name || uid(),
+        name: name || `auto_reply_${autoReplyIdx++}`,
         pattern: normalizePattern(pattern),
+        replyText: text,
         execute: async (ctx) => {
           await ctx.sendText(text);
           return { success: true };
@@ -127,30 +172,456 @@ function createRegistrar() {
       }
 
       if (typeof cfg.execute !== 'function') throw new TypeError(`action ${cfg.name || '?'} 必须有 execute 函数`);
-      cfg.name = cfg.name || uid();
+      if (!cfg.name) {
+        cfg.name = uid();
+        anonymous.add(cfg.name);
+      }
       actions.set(cfg.name, cfg);
     },
+
+    // ── mai.event() ───────────────────────────────────────────────────────
+    //
+    //  消息监听：mai.event({ name?, description?, keywords?, regex?, streams?, intercept?, execute })
+    //    keywords  - 关键词（字符串或数组），消息包含任意一个即命中，不区分大小写
+    //    regex     - 正则（或正则字符串），在消息中搜索
+    //    streams   - 只监听这些聊天流（stream_id 数组），省略时监听全部
+    //    intercept - 命中后阻止消息继续传递（execute 返回 { intercept: false } 时放行）
+    //  keywords / regex 至少提供一个：由 Python 侧预先过滤，命中时才启动 JS
+    //
+    event(cfg) {
+      if (!cfg || typeof cfg !== 'object') throw new TypeError('mai.event() 参数错误');
+      if (typeof cfg.execute !== 'function') throw new TypeError(`事件 ${cfg.name || '?'} 必须有 execute 函数`);
+      const keywords = cfg.keywords == null ? [] : [].concat(cfg.keywords).map(String).filter(Boolean);
+      if (!keywords.length && !cfg.regex) {
+        throw new TypeError(`事件 ${cfg.name || '?'} 必须声明 keywords 或 regex，否则每条消息都要进入 JS`);
+      }
+      cfg.name = cfg.name || `auto_event_${autoEventIdx++}`;
+      cfg.keywords = keywords;
+      cfg.regex = cfg.regex ? (isRegExp(cfg.regex) ? cfg.regex : new RegExp(String(cfg.regex))) : null;
+      cfg.streams = cfg.streams == null ? null : [].concat(cfg.streams).map(String);
+      events.set(cfg.name, cfg);
+    },
+
+    // ── mai.schedule() ────────────────────────────────────────────────────
+    //
+    //  定时任务：mai.schedule({ name?, every, jitter?, immediate?, workers?, execute })
+    //    every     - 间隔（毫秒数或 '30s' / '10m' / '1h'），至少 1 秒
+    //    jitter    - 每次触发额外随机延迟 0~jitter，避免多个任务同时运行
+    //    immediate - 启动后立即运行一次（默认 true）
+    //    workers   - 'all'（默认）在每个常驻工作进程中各运行一次，保证各进程内存中的数据都是新的；
+    //                'one' 只在一个工作进程中运行（适合只需执行一次的任务）
+    //  上一次运行尚未结束时跳过本次触发
+    //
+    schedule(cfg) {
+      if (!cfg || typeof cfg !== 'object') throw new TypeError('mai.schedule() 参数错误');
+      if (typeof cfg.execute !== 'function') throw new TypeError(`定时任务 ${cfg.name || '?'} 必须有 execute 函数`);
+      const every = parseDuration(cfg.every);
+      if (every === null || every < 1000) throw new TypeError(`定时任务 ${cfg.name || '?'} 的 every 无效或小于 1 秒`);
+      const jitter = cfg.jitter == null ? 0 : parseDuration(cfg.jitter);
+      if (jitter === null) throw new TypeError(`定时任务 ${cfg.name || '?'} 的 jitter 无效`);
+      if (cfg.workers != null && cfg.workers !== 'all' && cfg.workers !== 'one') {
+        throw new TypeError(`定时任务 ${cfg.name || '?'} 的 workers 只能是 'all' 或 'one'`);
+      }
+      cfg.name = cfg.name || `auto_schedule_${autoScheduleIdx++}`;
+      cfg.everyMs = every;
+      cfg.jitterMs = jitter;
+      schedules.set(cfg.name, cfg);
+    },
+  };
+
+  const state = options.isolated ? createState() : _sharedState;
+  return { mai, commands, actions, events, schedules, anonymous, state };
+}
+
+
+// ─── 注册信息导出（--describe）──────────────────────────────────────────────
+
+/** 组件的资源限制与缓存声明，字段名与 Python 侧 _extract_object_fields 一致 */
+function describeLimits(cfg, info) {
+  if (typeof cfg.timeout === 'number') info.timeout_ms = cfg.timeout;
+  if (typeof cfg.maxMemoryMb === 'number') info.max_memory_mb = cfg.maxMemoryMb;
+  if (cfg.cache === true || (cfg.cache && typeof cfg.cache === 'object')) {
+    const c = cfg.cache === true ? {} : cfg.cache;
+    info.cache = {
+      ttl_ms: typeof c.ttl === 'number' ? c.ttl : null,
+      max_entries: typeof c.maxEntries === 'number' ? c.maxEntries : null,
+    };
+  }
+  return info;
+}
+
+/**
+ * 把注册表转换为可 JSON 序列化的描述，格式与 Python 侧 _parse_js_registrations 相同：
+ * { commands: [{name, description, pattern, pattern_flags, ...}], actions: [...], events: [...], schedules: [...] }
+ */
+function describeRegistrations({ commands, actions, events = new Map(), schedules = new Map(), anonymous }) {
+  const described = { commands: [], actions: [], events: [], schedules: [] };
+
+  for (const cfg of commands.values()) {
+    if (anonymous.has(cfg.name)) continue;
+    const info = { name: cfg.name };
+    if (cfg.pattern) {
+      info.pattern = cfg.pattern.source;
+      info.pattern_flags = cfg.pattern.flags;
+    } else {
+      info.pattern = '^.*$';
+    }
+    if (typeof cfg.replyText === 'string') {
+      info.description = cfg.description || `固定回复：${cfg.replyText.slice(0, 30)}`;
+      // 是否由 Python 直接回复由 Python 侧对照源码决定：只有字面量文本才能在加载时固定下来
+      info._reply_text = cfg.replyText;
+    } else if (cfg.description) {
+      info.description = String(cfg.description);
+    } else if (/^auto_cmd_\d+$/.test(cfg.name)) {
+      info.description = cfg.pattern ? `命令：${cfg.pattern.source.slice(0, 40)}` : 'catch-all 命令';
+    }
+    described.commands.push(describeLimits(cfg, info));
+  }
+
+  for (const cfg of actions.values()) {
+    if (anonymous.has(cfg.name)) continue;
+    const info = { name: cfg.name };
+    if (cfg.description) info.description = String(cfg.description);
+    if (Array.isArray(cfg.require)) info.require = cfg.require.map(String);
+    if (Array.isArray(cfg.types)) info.types = cfg.types.map(String);
+    if (cfg.parameters && typeof cfg.parameters === 'object') {
+      info.parameters = {};
+      for (const [key, value] of Object.entries(cfg.parameters)) {
+        info.parameters[key] = typeof value === 'string' ? value : String((value && value.description) || '');
+      }
+    }
+    described.actions.push(describeLimits(cfg, info));
+  }
+
+  for (const cfg of events.values()) {
+    const info = { name: cfg.name, keywords: cfg.keywords };
+    if (cfg.description) info.description = String(cfg.description);
+    if (cfg.regex) {
+      info.regex = cfg.regex.source;
+      info.regex_flags = cfg.regex.flags;
+    }
+    if (cfg.streams) info.streams = cfg.streams;
+    if (cfg.intercept) info.intercept = true;
+    described.events.push(describeLimits(cfg, info));
+  }
+
+  for (const cfg of schedules.values()) {
+    const info = { name: cfg.name, every_ms: cfg.everyMs, jitter_ms: cfg.jitterMs };
+    if (cfg.description) info.description = String(cfg.description);
+    if (cfg.immediate === false) info.immediate = false;
+    if (cfg.workers === 'one') info.workers = 'one';
+    described.schedules.push(describeLimits(cfg, info));
+  }
+
+  return described;
+}
+
+
+// ─── HTTP 请求（ctx.fetch）──────────────────────────────────────────────────
+//
+// 同一工作进程内的所有执行共用一组 keep-alive 连接，TCP/TLS 握手只在第一次请求时发生。
+// GET/HEAD 请求可以按 cacheTtl 缓存响应；同一插件同时发出的相同 GET/HEAD 请求只发送一次。
+
+const FETCH_TIMEOUT_MS = 10000;
+const FETCH_MAX_BYTES = 16 * 1024 * 1024;
+const FETCH_MAX_REDIRECTS = 5;
+const FETCH_CACHE_MAX = 256;
+
+let _fetchAgents = null;
+
+function fetchAgents() {
+  if (!_fetchAgents) {
+    const http = require('http');
+    const https = require('https');
+    _fetchAgents = {
+      'http:':  { mod: http,  agent: new http.Agent({ keepAlive: true, maxSockets: 16 }) },
+      'https:': { mod: https, agent: new https.Agent({ keepAlive: true, maxSockets: 16 }) },
+    };
+  }
+  return _fetchAgents;
+}
+
+/** 把原始响应包装为与 fetch Response 相近的只读对象（缓存的响应每次返回新的包装） */
+function wrapResponse(raw) {
+  return {
+    url: raw.url,
+    status: raw.status,
+    statusText: raw.statusText,
+    ok: raw.status >= 200 && raw.status < 300,
+    headers: { ...raw.headers },
+    async text() { return raw.body.toString('utf8'); },
+    async json() { return JSON.parse(raw.body.toString('utf8')); },
+    async buffer() { return Buffer.from(raw.body); },
   };
+}
 
-  return { mai, commands, actions };
+// 重定向改为 GET 时不再发送请求体，描述请求体的头一并去掉
+const BODY_HEADERS = new Set(['content-length', 'content-type', 'transfer-encoding']);
+// 跳转到其他源（协议或主机不同）时不转发的凭据
+const CREDENTIAL_HEADERS = new Set(['authorization', 'cookie', 'proxy-authorization']);
+
+/** 重定向后的请求头（新对象，不修改原请求的 headers） */
+function redirectHeaders(headers, toGet, from, to) {
+  const crossOrigin = from.protocol !== to.protocol || from.host !== to.host;
+  const next = {};
+  for (const [name, value] of Object.entries(headers)) {
+    const lower = name.toLowerCase();
+    if (toGet && BODY_HEADERS.has(lower)) continue;
+    if (crossOrigin && CREDENTIAL_HEADERS.has(lower)) continue;
+    next[name] = value;
+  }
+  return next;
+}
+
+/** 发出一次请求（跟随重定向），返回 { url, status, statusText, headers, body, reused } */
+function requestOnce(url, method, headers, body, timeoutMs, redirects = 0) {
+  return new Promise((resolve, reject) => {
+    let target;
+    try {
+      target = new URL(url);
+    } catch (err) {
+      reject(new Error(`无效的 URL：${url}`));
+      return;
+    }
+    const transport = fetchAgents()[target.protocol];
+    if (!transport) {
+      reject(new Error(`不支持的协议：${target.protocol}`));
+      return;
+    }
+    const req = transport.mod.request(target, { method, headers, agent: transport.agent }, (res) => {
+      const location = res.headers.location;
+      if (location && [301, 302, 303, 307, 308].includes(res.statusCode) && redirects < FETCH_MAX_REDIRECTS) {
+        res.resume();
+        const next = new URL(location, target);
+        // 303 与 POST 的 301/302 按浏览器行为改为 GET
+        const toGet = res.statusCode === 303 || (res.statusCode <= 302 && method === 'POST');
+        const nextHeaders = redirectHeaders(headers, toGet, target, next);
+        requestOnce(next.toString(), toGet ? 'GET' : method, nextHeaders, toGet ? null : body, timeoutMs, redirects + 1)
+          .then(resolve, reject);
+        return;
+      }
+      const chunks = [];
+      let size = 0;
+      res.on('data', (chunk) => {
+        size += chunk.length;
+        if (size > FETCH_MAX_BYTES) {
+          req.destroy(new Error(`响应超过 ${FETCH_MAX_BYTES / 1048576}MB`));
+          return;
+        }
+        chunks.push(chunk);
+      });
+      res.on('end', () => resolve({
+        url: target.toString(),
+        status: res.statusCode,
+        statusText: res.statusMessage || '',
+        headers: res.headers,
+        body: Buffer.concat(chunks),
+        reused: req.reusedSocket,
+      }));
+      res.on('error', reject);
+    });
+    req.setTimeout(timeoutMs, () => req.destroy(new Error(`请求超时（${timeoutMs}ms）：${url}`)));
+    req.on('error', reject);
+    if (body != null) req.write(body);
+    req.end();
+  });
+}
+
+/**
+ * ctx.fetch 的实现。stats 为本次执行的统计，执行结束后随结果返回给 Python。
+ *
+ * @param owner  缓存与合并的作用域（插件名），不同插件互不共享响应
+ * @param state  响应缓存与进行中请求所在的进程内状态，见 createState()
+ */
+async function pooledFetch(owner, url, opts, stats, state) {
+  const { fetchCache, fetchInflight } = state;
+  const method = String(opts.method || 'GET').toUpperCase();
+  const headers = { ...(opts.headers || {}) };
+  const hasHeader = (name) => Object.keys(headers).some((h) => h.toLowerCase() === name);
+  let body = opts.body;
+  if (body != null) {
+    if (typeof body === 'object' && !ArrayBuffer.isView(body)) {
+      body = JSON.stringify(body);
+      if (!hasHeader('content-type')) headers['Content-Type'] = 'application/json';
+    }
+    // 与 fetch 一致地发送 Content-Length，而不是分块编码
+    body = ArrayBuffer.isView(body) ? Buffer.from(body.buffer, body.byteOffset, body.byteLength) : Buffer.from(String(body));
+    if (!hasHeader('content-length')) headers['Content-Length'] = String(body.length);
+  }
+  const timeoutMs = opts.timeout || FETCH_TIMEOUT_MS;
+  const idempotent = method === 'GET' || method === 'HEAD';
+  const key = idempotent ? JSON.stringify([owner, method, String(url), headers]) : null;
+
+  if (key && opts.cacheTtl > 0) {
+    const hit = fetchCache.get(key);
+    if (hit && hit.expires > Date.now()) {
+      stats.cached += 1;
+      return wrapResponse(hit.response);
+    }
+    fetchCache.delete(key);
+  }
+
+  const started = performance.now();
+  let pending = key && opts.coalesce !== false ? fetchInflight.get(key) : undefined;
+  const issued = !pending;
+  if (!issued) {
+    stats.coalesced += 1;
+  } else {
+    pending = requestOnce(String(url), method, headers, body, timeoutMs);
+    stats.requests += 1;
+    if (key && opts.coalesce !== false) {
+      fetchInflight.set(key, pending);
+      const clear = () => { if (fetchInflight.get(key) === pending) fetchInflight.delete(key); };
+      pending.then(clear, clear);
+    }
+  }
+
+  let raw;
+  try {
+    raw = await pending;
+  } catch (err) {
+    stats.errors += 1;
+    throw err;
+  } finally {
+    const ms = performance.now() - started;
+    stats.totalMs += ms;
+    stats.maxMs = Math.max(stats.maxMs, ms);
+  }
+  if (issued && raw.reused) stats.reused += 1;
+
+  if (key && opts.cacheTtl > 0 && raw.status >= 200 && raw.status < 300) {
+    fetchCache.delete(key);
+    fetchCache.set(key, { expires: Date.now() + opts.cacheTtl, response: raw });
+    if (fetchCache.size > FETCH_CACHE_MAX) fetchCache.delete(fetchCache.keys().next().value);
+  }
+  return wrapResponse(raw);
+}
+
+/** 本次执行的 fetch 统计（没有调用 ctx.fetch 时为 null） */
+function fetchSummary(stats) {
+  if (stats.requests + stats.cached + stats.coalesced === 0) return null;
+  const round = (ms) => Math.round(ms * 1000) / 1000;
+  return { ...stats, totalMs: round(stats.totalMs), maxMs: round(stats.maxMs) };
+}
+
+
+// ─── 工作进程内缓存（ctx.cache）─────────────────────────────────────────────
+//
+// 每个插件一个 LRU，保存在工作进程内存中：同一工作进程的后续执行可以直接读取，
+// 进程重启（或 spawn 模式下每次执行）后清空。需要持久保存的数据用 ctx.store。
+// isolated 模式的注册表自带一份全新的状态（createRegistrar({ isolated: true })），
+// 缓存只在本次执行内有效。
+
+const CACHE_MAX_ENTRIES = 1000;
+
+/** 跨执行保留的进程内状态：ctx.cache 与 ctx.fetch 的响应缓存、进行中请求 */
+function createState() {
+  return {
+    caches: new Map(),          // plugin_name → { entries: Map(key → { value, expires }), inflight }
+    fetchCache: new Map(),      // key → { expires, response }（Map 按插入顺序，最早的先淘汰）
+    fetchInflight: new Map(),   // key → Promise<response>
+  };
+}
+
+// pool / shared 模式下所有执行共用的状态
+const _sharedState = createState();
+
+function createCache(owner, caches) {
+  let state = caches.get(owner);
+  if (!state) caches.set(owner, state = { entries: new Map(), inflight: new Map() });
+  const { entries, inflight } = state;
+
+  function lookup(key) {
+    const entry = entries.get(key);
+    if (!entry) return undefined;
+    if (entry.expires && entry.expires <= Date.now()) {
+      entries.delete(key);
+      return undefined;
+    }
+    // 重新插入，使 Map 的插入顺序即最近使用顺序
+    entries.delete(key);
+    entries.set(key, entry);
+    return entry;
+  }
+
+  const cache = {
+    /** 读取缓存值，不存在或已过期时返回 defaultValue */
+    get(key, defaultValue = null) {
+      const entry = lookup(String(key));
+      return entry ? entry.value : defaultValue;
+    },
+
+    /** 写入缓存值；ttlMs 为有效期毫秒数，省略时只受容量限制 */
+    set(key, value, ttlMs) {
+      key = String(key);
+      entries.delete(key);
+      entries.set(key, { value, expires: ttlMs > 0 ? Date.now() + ttlMs : 0 });
+      if (entries.size > CACHE_MAX_ENTRIES) entries.delete(entries.keys().next().value);
+      return value;
+    },
+
+    has(key) { return lookup(String(key)) !== undefined; },
+
+    delete(key) { return entries.delete(String(key)); },
+
+    clear() { entries.clear(); },
+
+    /**
+     * 读取缓存值，不存在时调用 compute() 计算并缓存；同时发生的相同 key 只计算一次
+     *   const rank = await ctx.cache.remember('rank', 60000, () => buildRank());
+     */
+    async remember(key, ttlMs, compute) {
+      key = String(key);
+      const entry = lookup(key);
+      if (entry) return entry.value;
+      if (inflight.has(key)) return inflight.get(key);
+      const pending = Promise.resolve().then(compute);
+      inflight.set(key, pending);
+      try {
+        return cache.set(key, await pending, ttlMs);
+      } finally {
+        inflight.delete(key);
+      }
+    },
+  };
+  return cache;
 }
 
 
 // ─── 执行上下文 ctx ───────────────────────────────────────────────────────────
 
-function createContext(contextData) {
+/**
+ * 创建执行上下文。
+ *
+ * @param contextData  Python 侧传入的上下文数据
+ * @param emit         可选。传入时每条消息产生后立即交给 emit（流式发送），
+ *                     不再缓存到结果的 messages 中
+ * @param rpc          可选。(method, args) => Promise，向 Python 宿主发起调用
+ * @param state        可选。ctx.cache / ctx.fetch 使用的进程内状态，默认为所有执行共用的一份
+ */
+function createContext(contextData, emit, rpc, state = _sharedState) {
   const msgs = [];
   const { stream_id, plugin_name, action_data = {}, matched_groups = [] } = contextData;
+  const fetchStats = { requests: 0, cached: 0, coalesced: 0, reused: 0, errors: 0, totalMs: 0, maxMs: 0 };
+  let cache = null;
+
+  function push(msg) {
+    if (typeof emit === 'function') emit(msg);
+    else msgs.push(msg);
+  }
 
   const ctx = {
     stream_id,
     plugin_name,
 
+    /** mai.event() 触发时的消息：{ text, keyword（命中的关键词）, info（发送者、平台等）}，其余组件为 null */
+    message: contextData.message || null,
+
     // ── 发送消息 ──────────────────────────────────────────────────────────
 
     /** 发送文本消息 */
     async sendText(text) {
-      if (text != null) msgs.push({ type: 'text', content: String(text) });
+      if (text != null) push({ type: 'text', content: String(text) });
     },
 
     /** sendText 的简写别名 */
@@ -158,14 +629,17 @@ function createContext(contextData) {
       return this.sendText(text);
     },
 
-    /** 发送图片（base64 编码，不含 data:image/...;base64, 前缀）*/
-    async sendImage(base64) {
-      if (base64) msgs.push({ type: 'image', content: String(base64) });
+    /**
+     * 发送图片：base64 字符串（不含 data:image/...;base64, 前缀），
+     * 或 Buffer / Uint8Array 原始字节（无需自行编码，传输量更小）
+     */
+    async sendImage(data) {
+      if (data) push({ type: 'image', content: binaryOrString(data) });
     },
 
-    /** 发送表情包（base64 编码）*/
-    async sendEmoji(base64) {
-      if (base64) msgs.push({ type: 'emoji', content: String(base64) });
+    /** 发送表情包，格式同 sendImage */
+    async sendEmoji(data) {
+      if (data) push({ type: 'emoji', content: binaryOrString(data) });
     },
 
     // ── 读取参数 ──────────────────────────────────────────────────────────
@@ -219,6 +693,67 @@ function createContext(contextData) {
     /** getConfig() - config() 的完整名称别名 */
     getConfig(key, defaultValue = null) { return this.config(key, defaultValue); },
 
+    // ── 宿主 API（RPC）────────────────────────────────────────────────────
+
+    /**
+     * 调用 Python 侧 JsContext 白名单中的方法
+     *   await ctx.call('get_config', 'section.key', '默认值')
+     */
+    call(method, ...args) {
+      if (typeof rpc !== 'function') {
+        return Promise.reject(new Error('当前执行方式不支持调用宿主 API'));
+      }
+      return rpc(String(method), args);
+    },
+
+    /** LLM：await ctx.llm.generate('提示词', { model, temperature, max_tokens }) */
+    llm: {
+      generate: (prompt, options = {}) => ctx.call('llm_generate', prompt, options),
+    },
+
+    /** 用户信息 */
+    person: {
+      getId:    (platform, userId) => ctx.call('person_get_id', platform, userId),
+      getValue: (personId, field, defaultValue = null) => ctx.call('person_get_value', personId, field, defaultValue),
+      isKnown:  (platform, userId) => ctx.call('person_is_known', platform, userId),
+    },
+
+    /** 数据库（只读）：await ctx.db.get('Messages', { chat_id }, { limit: 10, order_by: '-time' }) */
+    db: {
+      get: (model, filters = {}, options = {}) => ctx.call('db_get', model, filters, options),
+    },
+
+    /**
+     * 持久化键值存储（按插件名隔离，MaiBot 重启后保留），值须可 JSON 序列化
+     *   const days = await ctx.store.incr(`signin:${userId}`);
+     */
+    store: {
+      get:    (key, defaultValue = null) => ctx.call('store_get', key, defaultValue),
+      set:    (key, value) => ctx.call('store_set', key, value),
+      delete: (key) => ctx.call('store_delete', key),
+      incr:   (key, by = 1) => ctx.call('store_incr', key, by),
+      keys:   (prefix = '') => ctx.call('store_keys', prefix),
+    },
+
+    // ── 缓存 ──────────────────────────────────────────────────────────────
+
+    /** 工作进程内的 LRU 缓存（按插件名隔离，不持久化）：ctx.cache.get / set / has / delete / clear / remember */
+    get cache() { return cache || (cache = createCache(plugin_name, state.caches)); },
+
+    // ── HTTP ──────────────────────────────────────────────────────────────
+
+    /**
+     * 发送 HTTP 请求（同一工作进程内复用 keep-alive 连接）
+     *   const res = await ctx.fetch('https://api.example.com/x', { cacheTtl: 60000 });
+     *   const data = await res.json();
+     *
+     * opts：method、headers、body（对象自动转为 JSON）、timeout（毫秒，默认 10000）、
+     *       cacheTtl（GET/HEAD 的 2xx 响应缓存毫秒数）、coalesce（默认 true，合并相同的进行中请求）
+     */
+    fetch(url, opts = {}) {
+      return pooledFetch(plugin_name, url, opts || {}, fetchStats, state);
+    },
+
     // ── 日志 ──────────────────────────────────────────────────────────────
 
     /** 输出普通日志到 stderr */
@@ -233,6 +768,7 @@ function createContext(contextData) {
 
     // ── 内部 ──────────────────────────────────────────────────────────────
     _getMessages() { return msgs; },
+    _getFetchStats() { return fetchSummary(fetchStats); },
   };
 
   return ctx;
@@ -241,15 +777,19 @@ function createContext(contextData) {
 
 // ─── 组件执行 ─────────────────────────────────────────────────────────────────
 
-async function executeComponent(registrations, componentName, contextData) {
-  const { commands, actions } = registrations;
-  const component = commands.get(componentName) || actions.get(componentName);
+async function executeComponent(registrations, componentName, contextData, emit, rpc) {
+  const { commands, actions, events, schedules } = registrations;
+  const component = commands.get(componentName) || actions.get(componentName)
+    || (events && events.get(componentName)) || (schedules && schedules.get(componentName));
 
   if (!component) {
     return { success: false, log: `未找到组件：${componentName}`, messages: [] };
   }
 
-  const ctx = createContext(contextData);
+  const ctx = createContext(contextData, emit, rpc, registrations.state);
+  const started = performance.now();
+  // 组件自身的执行耗时（毫秒，含等待宿主调用的时间），供 Python 侧统计
+  const elapsed = () => Math.round((performance.now() - started) * 1000) / 1000;
 
   try {
     const result = await component.execute(ctx);
@@ -257,6 +797,9 @@ async function executeComponent(registrations, componentName, contextData) {
       success: result?.success !== false,
       log:     result?.log || '',
       messages: ctx._getMessages(),
+      executeMs: elapsed(),
+      fetch: ctx._getFetchStats(),
+      ...(typeof result?.intercept === 'boolean' ? { intercept: result.intercept } : {}),
     };
   } catch (err) {
     ctx.logError(`执行失败：${err.message || err}`);
@@ -264,9 +807,11 @@ async function executeComponent(registrations, componentName, contextData) {
       success:  false,
       log:      String(err),
       messages: ctx._getMessages(),
+      executeMs: elapsed(),
+      fetch: ctx._getFetchStats(),
     };
   }
 }
 
 
-module.exports = { createRegistrar, createContext, executeComponent };
+module.exports = { createRegistrar, describeRegistrations, createContext, executeComponent };
@@ -0,0 +1,625 @@
+"""
+JsWorkerPool - 常驻 Node.js 工作进程池
+
+每个 JsWorker 对应一个长期运行的 `node sdk/mai-runner.js <plugin.js>` 进程，
+启动时只加载一次 SDK 与插件，之后通过 stdin/stdout 上的 JSON Lines 协议
+接收执行请求，省去每次执行都要冷启动 Node.js 的开销。
+
+JsWorkerPool 负责：
+1. 按需启动工作进程（最多 size 个）
+2. 派发请求：同一聊天流固定到同一工作进程（粘滞路由），该进程积压时转给最空闲的进程
+3. 工作进程崩溃、超时或内存超限后自动替换
+4. 插件卸载时干净地关闭所有进程
+"""
+
+import asyncio
+import atexit
+import hashlib
+import itertools
+import json
+import logging
+import os
+import signal
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("mai_js_bridge")
+
+# 常驻工作进程入口脚本
+_RUNNER_PATH = Path(__file__).parent / "sdk" / "mai-runner.js"
+
+# 单行协议帧的最大长度（图片等 base64 内容可能很大）
+_STREAM_LIMIT = 64 * 1024 * 1024
+
+# 流式消息回调：收到 JS 侧的一条消息后立即调用
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# 宿主调用（RPC）处理器：(method, args) -> 返回值，通常是 JsContext.call
+RpcHandler = Callable[[str, List[Any]], Awaitable[Any]]
+
+# 路由策略：sticky = 按路由键（stream_id）一致性哈希到固定工作进程；
+# least_loaded = 总是选最空闲的工作进程
+ROUTING_POLICIES = ("sticky", "least_loaded")
+
+# 所有存活的工作进程，解释器退出时兜底清理
+_LIVE_WORKERS: "weakref.WeakSet[JsWorker]" = weakref.WeakSet()
+
+
+def _take_blob_file(blob_file: str, size: int, blob_dir: Optional[str]) -> bytes:
+    """读取并删除 runner 写入 blob_dir 的载荷文件；只接受 blob_dir 下由 runner 命名的文件"""
+    path = Path(blob_file)
+    if (
+        not blob_dir
+        or path.parent.resolve() != Path(blob_dir).resolve()
+        or not path.name.startswith("mai-blob-")
+    ):
+        logger.warning(f"[JsWorker] 忽略 blob_dir 之外的载荷文件：{blob_file}")
+        return b""
+    try:
+        data = path.read_bytes()
+    finally:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+    if len(data) != size:
+        logger.warning(f"[JsWorker] 载荷文件长度不符：{len(data)} != {size}")
+    return data
+
+
+class JsWorkerError(Exception):
+    """工作进程启动失败、崩溃或通信出错"""
+
+
+class JsWorkerTimeout(JsWorkerError):
+    """执行超时，工作进程已被看门狗结束"""
+
+
+class JsWorkerAborted(JsWorkerError):
+    """同一工作进程中的其他请求超时，进程被看门狗结束，本请求被连带中止"""
+
+
+class JsWorker:
+    """
+    单个常驻 Node.js 工作进程。
+
+    同一进程可以同时处理多个请求（JS 侧是异步的），
+    请求与应答通过帧中的 id 字段对应。每个请求有自己的帧队列，
+    执行中产生的 message 帧按顺序先于 result 帧到达。
+
+    JS 侧在执行中发起的 rpc 帧按 call 编号多路复用：每个调用在独立的 Task 中
+    await 处理器，再把 rpc_result 帧写回 stdin，不阻塞读取，也不占用线程。
+    """
+
+    def __init__(
+        self,
+        js_file: Optional[str],
+        plugin_name: str,
+        start_timeout: float = 10.0,
+        runner_args: Sequence[str] = (),
+        node_args: Sequence[str] = (),
+        blob_dir: Optional[str] = None,
+    ):
+        self.js_file = js_file
+        self.plugin_name = plugin_name
+        self.start_timeout = start_timeout
+        self.runner_args = tuple(runner_args)
+        self.node_args = tuple(node_args)
+        self.blob_dir = blob_dir
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._pending: Dict[int, asyncio.Queue] = {}
+        self._rpc_handlers: Dict[int, RpcHandler] = {}
+        self._write_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+        self._reader_task: Optional[asyncio.Task] = None
+        self._stderr_task: Optional[asyncio.Task] = None
+        self._alive = False
+        self.retiring = False
+        self.start_ms: Optional[float] = None        # 启动到就绪的耗时
+        self._rx_bytes: Dict[int, int] = {}          # 每个请求收到的应答字节数
+        self._config_versions: Dict[Optional[str], int] = {}   # 插件 → 已推送的配置版本
+        self._abort_reason: Optional[str] = None     # 看门狗结束进程的原因（连带中止其他请求时报告）
+
+    # =========================================================================
+    # 生命周期
+    # =========================================================================
+
+    @property
+    def alive(self) -> bool:
+        return self._alive
+
+    @property
+    def inflight(self) -> int:
+        """当前进行中的请求数"""
+        return len(self._pending)
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._proc.pid if self._proc else None
+
+    async def start(self) -> None:
+        """启动 Node.js 进程，并等待插件加载完成（js_file 为 None 时是不预先加载插件的共享宿主）"""
+        started = time.monotonic()
+        plugin_args = (self.js_file,) if self.js_file else ()
+        blob_args = (f"--blob-dir={self.blob_dir}",) if self.blob_dir else ()
+        self._proc = await asyncio.create_subprocess_exec(
+            "node", *self.node_args, str(_RUNNER_PATH), *plugin_args, *self.runner_args, *blob_args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=_STREAM_LIMIT,
+        )
+        _LIVE_WORKERS.add(self)
+        self._stderr_task = asyncio.ensure_future(self._drain_stderr())
+
+        try:
+            line = await asyncio.wait_for(self._proc.stdout.readline(), self.start_timeout)
+            frame = json.loads(line) if line else {}
+        except (asyncio.TimeoutError, ValueError) as e:
+            self.kill()
+            raise JsWorkerError(f"工作进程启动失败：{e or '等待就绪超时'}") from e
+
+        if frame.get("type") != "ready":
+            self.kill()
+            raise JsWorkerError(f"工作进程启动失败：{frame.get('error') or '进程已退出'}")
+
+        self._alive = True
+        self.start_ms = (time.monotonic() - started) * 1000
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+        logger.debug(f"[JsWorker] {self.plugin_name} 工作进程已启动（pid={self.pid}）")
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """关闭 stdin，等待进行中的请求完成后进程自然退出；超时则强制结束"""
+        if self._proc is None:
+            return
+        self._alive = False
+        try:
+            if self._proc.stdin and not self._proc.stdin.is_closing():
+                self._proc.stdin.close()
+            await asyncio.wait_for(self._proc.wait(), timeout)
+        except (asyncio.TimeoutError, ProcessLookupError):
+            self.kill()
+            await self._proc.wait()
+        if self._reader_task:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+
+    def retire(self) -> None:
+        """不再接收新请求，进行中的请求完成后进程退出（后台关闭）"""
+        if self.retiring:
+            return
+        self.retiring = True
+        self._alive = False
+        asyncio.ensure_future(self.close())
+
+    def kill(self) -> None:
+        """立即结束进程（不等待）"""
+        self._alive = False
+        if self._proc and self._proc.returncode is None:
+            try:
+                self._proc.kill()
+            except ProcessLookupError:
+                pass
+
+    # =========================================================================
+    # 请求
+    # =========================================================================
+
+    async def execute(
+        self,
+        component: str,
+        context: Dict[str, Any],
+        timeout: float = 30.0,
+        on_message: Optional[MessageHandler] = None,
+        on_rpc: Optional[RpcHandler] = None,
+        max_memory_mb: Optional[float] = None,
+        plugin: Optional[str] = None,
+        profile: Optional[str] = None,
+        config: Optional[Tuple[int, str]] = None,
+    ) -> Dict:
+        """
+        执行指定组件，返回 {success, log, messages}。
+
+        传入 on_message 时，JS 侧每产生一条消息就立即回调（结果中的 messages 为空）；
+        否则消息按顺序收集到结果的 messages 中。
+        传入 on_rpc 时，JS 侧的 ctx.call() 由它处理；否则宿主调用一律失败。
+        传入 max_memory_mb 时，执行后堆占用超出限制的工作进程会被淘汰，
+        结果中带 memory_exceeded=True。
+        plugin 为插件路径，仅共享宿主（--host）需要。
+        profile 为 "cpu" / "heap" 时对这次执行做性能分析，结果中的 profile 为写出的文件路径。
+        config 为插件配置的 (版本, JSON 文本)：工作进程缓存配置，同一版本只发送一次，
+        执行帧只携带版本号。
+
+        结果附带 roundtrip_ms（发出请求到收到结果的耗时）与 rx_bytes（本次收到的字节数）。
+        """
+        streamed: List[Dict[str, Any]] = []
+
+        async def _collect(message: Dict[str, Any]) -> None:
+            streamed.append(message)
+
+        request: Dict[str, Any] = {"type": "execute", "component": component, "context": context}
+        if plugin is not None:
+            request["plugin"] = plugin
+        if profile is not None:
+            request["profile"] = profile
+        if config is not None:
+            await self._push_config(config, plugin)
+            request["config_version"] = config[0]
+        started = time.monotonic()
+        frame = await self._request(
+            request,
+            timeout,
+            on_message or _collect,
+            on_rpc,
+        )
+        if frame.get("type") != "result":
+            raise JsWorkerError(frame.get("error") or f"意外的应答帧：{frame.get('type')}")
+        result = frame.get("result") or {}
+        result["roundtrip_ms"] = (time.monotonic() - started) * 1000
+        result["rx_bytes"] = frame.get("_rx_bytes", 0)
+        if on_message is None:
+            result["messages"] = streamed + result.get("messages", [])
+        if max_memory_mb and result.get("heapMb", 0) > max_memory_mb:
+            logger.warning(
+                f"[JsWorker] {self.plugin_name} 执行 {component} 后堆占用 {result.get('heapMb')}MB，"
+                f"超出限制 {max_memory_mb}MB，替换工作进程 pid={self.pid}"
+            )
+            result["memory_exceeded"] = True
+            self.retire()
+        return result
+
+    async def ping(self, timeout: float = 5.0, plugin: Optional[str] = None) -> bool:
+        """健康检查；共享宿主传入 plugin 时顺便加载该插件"""
+        request: Dict[str, Any] = {"type": "ping"}
+        if plugin is not None:
+            request["plugin"] = plugin
+        frame = await self._request(request, timeout)
+        if frame.get("type") == "error":
+            raise JsWorkerError(frame.get("error") or "健康检查失败")
+        return frame.get("type") == "pong"
+
+    async def _request(
+        self,
+        frame: Dict[str, Any],
+        timeout: float,
+        on_message: Optional[MessageHandler] = None,
+        on_rpc: Optional[RpcHandler] = None,
+    ) -> Dict:
+        if not self._alive:
+            raise JsWorkerError("工作进程未运行")
+
+        req_id = next(self._ids)
+        queue: asyncio.Queue = asyncio.Queue()
+        self._pending[req_id] = queue
+        if on_rpc is not None:
+            self._rpc_handlers[req_id] = on_rpc
+        try:
+            await self._send({"id": req_id, **frame})
+            reply = await asyncio.wait_for(self._collect(queue, on_message), timeout)
+            reply["_rx_bytes"] = self._rx_bytes.get(req_id, 0)
+            return reply
+        except asyncio.TimeoutError:
+            # 卡死的进程无法回收，直接结束，由进程池按需替换
+            culprit = frame.get("component") or frame.get("type")
+            if frame.get("plugin"):
+                culprit = f"{Path(frame['plugin']).parent.name}/{culprit}"
+            logger.error(f"[JsWorker] {self.plugin_name} {culprit} 执行超时（{timeout}s），结束工作进程 pid={self.pid}")
+            self._abort_reason = f"{culprit} 执行超时"
+            self.kill()
+            raise JsWorkerTimeout(f"执行超时（{timeout}s）")
+        except (BrokenPipeError, ConnectionResetError) as e:
+            self.kill()
+            raise JsWorkerError(f"工作进程通信失败：{e}") from e
+        finally:
+            self._pending.pop(req_id, None)
+            self._rx_bytes.pop(req_id, None)
+            self._rpc_handlers.pop(req_id, None)
+
+    async def _push_config(self, config: Tuple[int, str], plugin: Optional[str]) -> None:
+        """工作进程还没有这一版配置时发送 config 帧（JSON 已由调用方序列化，这里原样拼接）"""
+        version, config_json = config
+        if self._config_versions.get(plugin) == version:
+            return
+        if not self._alive:
+            raise JsWorkerError("工作进程未运行")
+        self._config_versions[plugin] = version
+        plugin_field = f', "plugin": {json.dumps(plugin, ensure_ascii=False)}' if plugin is not None else ""
+        line = f'{{"type": "config", "version": {version}{plugin_field}, "config": {config_json}}}\n'
+        try:
+            await self._write(line.encode("utf-8"))
+        except (BrokenPipeError, ConnectionResetError) as e:
+            self._config_versions.pop(plugin, None)
+            self.kill()
+            raise JsWorkerError(f"工作进程通信失败：{e}") from e
+
+    async def _send(self, frame: Dict[str, Any]) -> None:
+        """向 stdin 写入一帧"""
+        await self._write((json.dumps(frame, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+
+    async def _write(self, data: bytes) -> None:
+        """写入 stdin（多个 Task 可能同时写，串行化 drain）"""
+        async with self._write_lock:
+            self._proc.stdin.write(data)
+            await self._proc.stdin.drain()
+
+    async def _collect(self, queue: asyncio.Queue, on_message: Optional[MessageHandler]) -> Dict:
+        """按顺序消费某个请求的帧：message 帧交给回调，遇到最终应答帧返回"""
+        while True:
+            frame = await queue.get()
+            if frame is None:
+                if self._abort_reason is not None:
+                    raise JsWorkerAborted(f"工作进程已被结束（{self._abort_reason}），本次执行被中止")
+                raise JsWorkerError("工作进程意外退出")
+            if frame.get("type") == "message":
+                if on_message is not None:
+                    await on_message(frame.get("message") or {})
+                continue
+            return frame
+
+    # =========================================================================
+    # 后台读取
+    # =========================================================================
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                line = await self._proc.stdout.readline()
+                if not line:
+                    break
+                try:
+                    frame = json.loads(line)
+                except ValueError:
+                    logger.warning(f"[JsWorker] {self.plugin_name} 输出了无法解析的帧：{line[:200]!r}")
+                    continue
+                size = len(line)
+                if "blob" in frame:
+                    # 图片等载荷以原始字节紧跟在帧头之后，不经过 JSON 解析
+                    frame.setdefault("message", {})["content"] = await self._read_blob(frame)
+                    size += int(frame["blob"])
+                req_id = frame.get("id")
+                if req_id in self._pending:
+                    self._rx_bytes[req_id] = self._rx_bytes.get(req_id, 0) + size
+                if frame.get("type") == "rpc":
+                    asyncio.ensure_future(self._serve_rpc(frame))
+                    continue
+                queue = self._pending.get(req_id)
+                if queue is not None:
+                    queue.put_nowait(frame)
+        except Exception as e:
+            logger.error(f"[JsWorker] {self.plugin_name} 读取应答失败：{e}")
+        finally:
+            self._alive = False
+            for queue in self._pending.values():
+                queue.put_nowait(None)
+
+    async def _read_blob(self, frame: Dict[str, Any]) -> bytes:
+        size = int(frame["blob"])
+        if frame.get("blob_file"):
+            return _take_blob_file(frame["blob_file"], size, self.blob_dir)
+        return await self._proc.stdout.readexactly(size)
+
+    async def _serve_rpc(self, frame: Dict[str, Any]) -> None:
+        """处理一次 JS 侧发起的宿主调用，并把结果写回"""
+        reply: Dict[str, Any] = {"type": "rpc_result", "call": frame.get("call")}
+        handler = self._rpc_handlers.get(frame.get("id"))
+        try:
+            if handler is None:
+                raise JsWorkerError("该请求不支持宿主调用")
+            reply["value"] = await handler(str(frame.get("method")), list(frame.get("args") or []))
+            reply["ok"] = True
+        except Exception as e:
+            reply["ok"] = False
+            reply["error"] = f"{type(e).__name__}: {e}"
+
+        try:
+            await self._send(reply)
+        except (BrokenPipeError, ConnectionResetError, RuntimeError):
+            # 进程已退出或 stdin 已关闭，应答无处可送
+            pass
+
+    async def _drain_stderr(self) -> None:
+        """持续读取 stderr（JS 侧的 ctx.log / console 输出），避免管道写满阻塞进程"""
+        while True:
+            line = await self._proc.stderr.readline()
+            if not line:
+                break
+            text = line.decode("utf-8", errors="replace").rstrip()
+            if text:
+                logger.info(text)
+
+
+class JsWorkerPool:
+    """
+    JsWorker 进程池（单个插件共享）。
+
+    Args:
+        js_file:     JS 插件路径（None 表示共享宿主进程，由请求指定插件）
+        plugin_name: 插件名（用于日志）
+        size:        最多同时存在的工作进程数
+        runner_args: 传给 mai-runner.js 的额外参数（如 "--isolate"）
+        node_args:   传给 node 的参数（如 "--max-old-space-size=256"）
+        blob_dir:    大载荷（≥1MB 的图片等）经由该目录（建议 tmpfs，如 /dev/shm）中转
+        on_spawn:    工作进程启动成功后以启动耗时（毫秒）回调，用于统计
+        routing:     路由策略，见 ROUTING_POLICIES
+        steal_threshold: sticky 路由下，目标进程进行中的请求数达到该值且有更空闲的
+                     进程时，请求转给最空闲的进程（此时同一聊天流内不再保证顺序）
+
+    sticky 路由使用最高随机权重（rendezvous）哈希：路由键与每个槽位一起哈希，
+    取权重最大的槽位。进程崩溃重启后仍在同一槽位，聊天流的归属不变。
+    """
+
+    def __init__(
+        self,
+        js_file: Optional[str],
+        plugin_name: str,
+        size: int = 2,
+        runner_args: Sequence[str] = (),
+        node_args: Sequence[str] = (),
+        blob_dir: Optional[str] = None,
+        routing: str = "sticky",
+        steal_threshold: int = 4,
+        on_spawn: Optional[Callable[[float], None]] = None,
+    ):
+        if size < 1:
+            raise ValueError("进程池大小至少为 1")
+        if routing not in ROUTING_POLICIES:
+            raise ValueError(f"未知的路由策略：{routing}（可选：{', '.join(ROUTING_POLICIES)}）")
+        self.js_file = js_file
+        self.plugin_name = plugin_name
+        self.size = size
+        self.runner_args = tuple(runner_args)
+        self.node_args = tuple(node_args)
+        self.blob_dir = blob_dir
+        self.routing = routing
+        self.on_spawn = on_spawn
+        self.steal_threshold = max(1, steal_threshold)
+        self.steals = 0
+        self._workers: List[Optional[JsWorker]] = [None] * size
+        self._starting: Dict[int, asyncio.Task] = {}
+        self._closed = False
+
+    @property
+    def workers(self) -> List[JsWorker]:
+        """当前存活的工作进程"""
+        return [w for w in self._workers if w is not None and w.alive]
+
+    async def execute(
+        self,
+        component: str,
+        context: Dict[str, Any],
+        timeout: float = 30.0,
+        on_message: Optional[MessageHandler] = None,
+        on_rpc: Optional[RpcHandler] = None,
+        max_memory_mb: Optional[float] = None,
+        plugin: Optional[str] = None,
+        key: Optional[str] = None,
+        profile: Optional[str] = None,
+        config: Optional[Tuple[int, str]] = None,
+    ) -> Dict:
+        """key 为路由键（通常是 stream_id），为 None 或 least_loaded 路由时选最空闲的进程"""
+        if key is not None and self.routing == "sticky":
+            worker = await self._acquire_sticky(key)
+        else:
+            worker = await self._acquire()
+        return await worker.execute(
+            component, context, timeout, on_message, on_rpc, max_memory_mb, plugin, profile, config,
+        )
+
+    def _slot_for(self, key: str) -> int:
+        """rendezvous 哈希：路由键固定映射到某个槽位"""
+        return max(
+            range(self.size),
+            key=lambda i: hashlib.blake2b(f"{key}\0{i}".encode("utf-8"), digest_size=8).digest(),
+        )
+
+    async def _acquire_sticky(self, key: str) -> JsWorker:
+        """选出路由键对应的工作进程（必要时启动）；它积压时转给最空闲的进程"""
+        slot = self._slot_for(key)
+        while True:
+            if self._closed:
+                raise JsWorkerError("进程池已关闭")
+            worker = self._workers[slot]
+            if worker is not None and worker.alive:
+                break
+            task = self._starting.get(slot)
+            if task is None:
+                worker = await self._spawn(slot)
+                break
+            await asyncio.wait([task])
+
+        if worker.inflight < self.steal_threshold:
+            return worker
+        other = await self._acquire()
+        if other.inflight < worker.inflight:
+            self.steals += 1
+            return other
+        return worker
+
+    async def _acquire(self) -> JsWorker:
+        """选出最空闲的工作进程；全部忙碌且还有空位时启动新进程"""
+        while True:
+            if self._closed:
+                raise JsWorkerError("进程池已关闭")
+
+            alive = self.workers
+            best = min(alive, key=lambda w: w.inflight) if alive else None
+            if best is not None and best.inflight == 0:
+                return best
+
+            free = [
+                i for i, w in enumerate(self._workers)
+                if (w is None or not w.alive) and i not in self._starting
+            ]
+            if free:
+                return await self._spawn(free[0])
+            if best is not None:
+                return best
+            # 所有空位都在启动中，等其中一个就绪
+            await asyncio.wait(list(self._starting.values()), return_when=asyncio.FIRST_COMPLETED)
+
+    async def _spawn(self, slot: int) -> JsWorker:
+        old = self._workers[slot]
+        if old is not None and not old.retiring:
+            logger.warning(f"[JsWorker] {self.plugin_name} 工作进程 #{slot} 已退出，正在重启")
+            old.kill()
+
+        worker = JsWorker(
+            self.js_file, self.plugin_name,
+            runner_args=self.runner_args, node_args=self.node_args, blob_dir=self.blob_dir,
+        )
+        task = asyncio.ensure_future(worker.start())
+        self._starting[slot] = task
+        try:
+            await task
+        finally:
+            self._starting.pop(slot, None)
+        if self._closed:
+            await worker.close()
+            raise JsWorkerError("进程池已关闭")
+        self._workers[slot] = worker
+        if self.on_spawn is not None and worker.start_ms is not None:
+            self.on_spawn(worker.start_ms)
+        return worker
+
+    async def warm(self, plugin: Optional[str] = None) -> int:
+        """
+        启动所有空闲槽位的工作进程并逐个健康检查，返回通过检查的进程数。
+
+        plugin 仅共享宿主需要：检查时把该插件加载到每个宿主进程中。
+        """
+        free = [
+            i for i, w in enumerate(self._workers)
+            if (w is None or not w.alive) and i not in self._starting
+        ]
+        results = await asyncio.gather(*(self._spawn(i) for i in free), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"[JsWorker] {self.plugin_name} 预热时启动工作进程失败：{result}")
+
+        checks = await asyncio.gather(*(w.ping(plugin=plugin) for w in self.workers), return_exceptions=True)
+        for check in checks:
+            if isinstance(check, Exception):
+                logger.warning(f"[JsWorker] {self.plugin_name} 预热健康检查失败：{check}")
+        return sum(1 for check in checks if check is True)
+
+    async def close(self) -> None:
+        """关闭所有工作进程"""
+        self._closed = True
+        if self._starting:
+            await asyncio.gather(*self._starting.values(), return_exceptions=True)
+        workers = [w for w in self._workers if w is not None]
+        self._workers = [None] * self.size
+        await asyncio.gather(*(w.close() for w in workers), return_exceptions=True)
+
+
+@atexit.register
+def _kill_live_workers() -> None:
+    """解释器退出时结束残留的 Node.js 进程（事件循环可能已关闭，直接发信号）"""
+    for worker in list(_LIVE_WORKERS):
+        pid = worker.pid
+        if pid and worker._proc.returncode is None:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
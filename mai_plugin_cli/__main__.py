@@ -6,6 +6,7 @@ mai-plugin-cli 入口
   python -m mai_plugin_cli pack <path>            打包插件
   python -m mai_plugin_cli list-templates         列出可用模板
   python -m mai_plugin_cli run-maiscript <file>   运行MaiScript文件
+  python -m mai_plugin_cli profile <path>         汇总 JS 插件的 CPU profile
 """
 import sys
 import io
@@ -9,6 +9,7 @@ from .validate import cmd_validate
 from .pack import cmd_pack
 from .list_templates import cmd_list_templates
 from .run_maiscript import cmd_run_maiscript
+from .profile import cmd_profile
 
 BANNER = r"""
   __  __       _   ____        _       _____ _      _____ 
@@ -35,6 +36,7 @@ def cli():
   pack            打包插件为 zip 文件
   list-templates  列出所有可用的插件模板
   run-maiscript   将 MaiScript (.mai) 文件编译为 Python 插件
+  profile         汇总 JS 插件的 CPU profile（.cpuprofile）
 
 示例:
   mai create my_plugin                  # 交互式创建插件
@@ -43,6 +45,7 @@ def cli():
   mai validate ./my_plugin              # 验证插件结构
   mai pack ./my_plugin                  # 打包插件
   mai run-maiscript ./my_plugin.mai     # 编译 MaiScript 文件
+  mai profile ./my_plugin               # 汇总插件目录下的 CPU profile
         """,
     )
 
@@ -114,6 +117,23 @@ def cli():
         help="输出目录（默认为 .mai 文件所在目录）",
     )
 
+    # profile 子命令
+    p_profile = subparsers.add_parser("profile", help="汇总 JS 插件的 CPU profile，列出自身耗时最多的函数")
+    p_profile.add_argument("path", help=".cpuprofile 文件，或包含这些文件的插件目录")
+    p_profile.add_argument(
+        "-n",
+        "--top",
+        type=int,
+        default=20,
+        help="显示的函数数量（默认 20）",
+    )
+    p_profile.add_argument(
+        "-c",
+        "--component",
+        default=None,
+        help="只汇总指定组件的 profile",
+    )
+
     args = parser.parse_args()
 
     if args.command == "create":
@@ -126,6 +146,8 @@ def cli():
         cmd_list_templates(args)
     elif args.command == "run-maiscript":
         cmd_run_maiscript(args)
+    elif args.command == "profile":
+        cmd_profile(args)
     else:
         parser.print_help()
         sys.exit(0)
@@ -16,7 +16,10 @@ IGNORE_PATTERNS = [
     "*.pyo",
     ".env",
     "node_modules",
+    ".mai_cache",
     "*.log",
+    "*.cpuprofile",
+    "*.heapsnapshot",
 ]
 
 
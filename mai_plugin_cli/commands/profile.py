@@ -0,0 +1,107 @@
+"""
+mai profile 命令实现
+汇总 JS 插件的 V8 CPU profile（.cpuprofile），列出自身耗时最多的函数
+"""
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# 不属于任何 JS 函数的特殊节点
+IDLE_NODE = "(idle)"
+
+
+def _location(call_frame: Dict) -> str:
+    """callFrame → "文件名:行号"（行号从 1 开始）"""
+    url = call_frame.get("url") or ""
+    if not url:
+        return ""
+    if url.startswith("file://"):
+        url = url[len("file://"):]
+    name = url.rsplit("/", 1)[-1] if not url.startswith("node:") else url
+    line = call_frame.get("lineNumber", -1)
+    return f"{name}:{line + 1}" if line >= 0 else name
+
+
+def self_times(profile: Dict) -> Tuple[Dict[Tuple[str, str], float], float]:
+    """
+    计算每个函数的自身耗时（毫秒），返回 ({(函数名, 位置): 毫秒}, 采样总时长毫秒)。
+
+    采样 i 的时长取到下一个采样的间隔；旧格式没有 samples 时按 hitCount 平均分摊。
+    """
+    nodes = {node["id"]: node for node in profile.get("nodes", [])}
+    samples = profile.get("samples") or []
+    deltas = profile.get("timeDeltas") or []
+    duration = (profile.get("endTime", 0) - profile.get("startTime", 0)) / 1000
+
+    per_node: Dict[int, float] = {}
+    if samples and len(deltas) == len(samples):
+        for i, node_id in enumerate(samples):
+            us = deltas[i + 1] if i + 1 < len(deltas) else 0
+            per_node[node_id] = per_node.get(node_id, 0.0) + us / 1000
+    else:
+        hits = sum(node.get("hitCount", 0) for node in nodes.values())
+        for node_id, node in nodes.items():
+            if node.get("hitCount"):
+                per_node[node_id] = duration * node["hitCount"] / hits
+
+    times: Dict[Tuple[str, str], float] = {}
+    for node_id, ms in per_node.items():
+        frame = nodes.get(node_id, {}).get("callFrame", {})
+        key = (frame.get("functionName") or "(anonymous)", _location(frame))
+        times[key] = times.get(key, 0.0) + ms
+    return times, duration
+
+
+def collect_profiles(path: Path) -> List[Path]:
+    """path 为文件时只取它；为目录时取其中所有 .cpuprofile"""
+    if path.is_dir():
+        return sorted(path.glob("*.cpuprofile"))
+    return [path]
+
+
+def cmd_profile(args):
+    """汇总 CPU profile"""
+    path = Path(args.path)
+    if not path.exists():
+        print(f"❌ 路径不存在：{path}")
+        return
+
+    files = collect_profiles(path)
+    if args.component:
+        # 文件名格式：<插件名>.<组件名>.<时间>.<pid>.cpuprofile
+        files = [f for f in files if f".{args.component}." in f.name]
+    if not files:
+        print(f"❌ 没有找到 .cpuprofile 文件：{path}")
+        return
+
+    totals: Dict[Tuple[str, str], float] = {}
+    duration = 0.0
+    for file in files:
+        try:
+            with open(file, "r", encoding="utf-8") as f:
+                profile = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  跳过无法读取的文件 {file.name}：{e}")
+            continue
+        times, file_duration = self_times(profile)
+        duration += file_duration
+        for key, ms in times.items():
+            totals[key] = totals.get(key, 0.0) + ms
+
+    idle = sum(ms for (name, _), ms in totals.items() if name == IDLE_NODE)
+    busy = {key: ms for key, ms in totals.items() if key[0] != IDLE_NODE}
+    busy_total = sum(busy.values())
+
+    print(f"\n🔥 CPU profile 汇总：{len(files)} 个文件，采样 {duration:.1f} ms")
+    print(f"   其中执行 {busy_total:.1f} ms，空闲（等待 await / 宿主调用）{idle:.1f} ms\n")
+    if not busy:
+        print("  （没有执行中的采样，执行时间可能短于采样间隔）\n")
+        return
+
+    print(f"  {'自身耗时':>10}  {'占比':>6}  函数")
+    ranked = sorted(busy.items(), key=lambda item: item[1], reverse=True)[: args.top]
+    for (name, location), ms in ranked:
+        share = ms / busy_total * 100 if busy_total else 0.0
+        where = f"  {location}" if location else ""
+        print(f"  {ms:>8.2f}ms  {share:>5.1f}%  {name}{where}")
+    print()